@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark de tipos de índice FAISS: recall@k frente a latencia, tomando
+IndexFlatIP (búsqueda exacta) como referencia.
+
+Construye cada índice con VectorStoreServiceImpl.build_faiss_index, igual que la
+aplicación, y recorre distintos valores de nprobe / efSearch.
+
+Uso:
+    python benchmark_faiss_index.py --size 100000 --dim 1536
+    python benchmark_faiss_index.py --from-db --types flat hnsw ivf_flat
+"""
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append('src')
+
+from src.infrastructure.services.vector_store_service_impl import VectorStoreServiceImpl
+
+
+def synthetic_vectors(size: int, dim: int, clusters: int = 256, seed: int = 42) -> np.ndarray:
+    """Vectores normalizados agrupados en clusters (más realista que ruido uniforme)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size)
+    vectors = centers[assignments] + 0.3 * rng.standard_normal((size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def vectors_from_db() -> np.ndarray:
+    """Carga los embeddings reales de la tabla vector_embeddings"""
+    from src.database import SessionLocal
+    from src.infrastructure.repositories.vector_embedding_repository import VectorEmbeddingRepository
+
+    db = SessionLocal()
+    try:
+        embeddings = VectorEmbeddingRepository(db).get_all()
+        return np.array([e.embedding for e in embeddings], dtype=np.float32)
+    finally:
+        db.close()
+
+
+def measure(index, queries: np.ndarray, k: int):
+    """Busca query a query (como en producción) y devuelve (ids, latencias en ms)"""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids[i] = found[0]
+    return ids, np.array(latencies)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run_benchmark(vectors: np.ndarray, queries: np.ndarray, k: int, index_types):
+    import faiss
+
+    service = VectorStoreServiceImpl()
+    dim = vectors.shape[1]
+    rows = []
+
+    # Referencia exacta
+    flat = faiss.IndexFlatIP(dim)
+    flat.add(vectors)
+    truth, flat_latencies = measure(flat, queries, k)
+    rows.append(('flat', '-', 0.0, 1.0, np.median(flat_latencies), np.percentile(flat_latencies, 95)))
+
+    sweeps = {
+        'hnsw': ('efSearch', [16, 32, 64, 128, 256]),
+        'ivf_flat': ('nprobe', [1, 4, 16, 64]),
+        'ivf_pq': ('nprobe', [1, 4, 16, 64]),
+        'sq8': (None, [None]),
+    }
+
+    for index_type in index_types:
+        if index_type == 'flat':
+            continue
+
+        settings = service._resolve_faiss_settings({'indexType': index_type})
+        start = time.perf_counter()
+        index = service.build_faiss_index(dim, settings, expected_size=len(vectors))
+        if not index.is_trained:
+            index.train(vectors)
+        index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+        build_seconds = time.perf_counter() - start
+
+        param_name, values = sweeps[index_type]
+        for value in values:
+            if param_name:
+                faiss.ParameterSpace().set_index_parameter(index, param_name, value)
+            found, latencies = measure(index, queries, k)
+            rows.append((
+                index_type,
+                f"{param_name}={value}" if param_name else '-',
+                build_seconds,
+                recall_at_k(found, truth),
+                np.median(latencies),
+                np.percentile(latencies, 95)
+            ))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall/latencia de índices FAISS")
+    parser.add_argument('--size', type=int, default=50000, help="Número de vectores sintéticos")
+    parser.add_argument('--dim', type=int, default=1536, help="Dimensión de los vectores sintéticos")
+    parser.add_argument('--queries', type=int, default=200, help="Número de consultas")
+    parser.add_argument('--k', type=int, default=10, help="Resultados por consulta (recall@k)")
+    parser.add_argument('--types', nargs='+', default=list(VectorStoreServiceImpl.FAISS_INDEX_TYPES),
+                        choices=VectorStoreServiceImpl.FAISS_INDEX_TYPES)
+    parser.add_argument('--from-db', action='store_true', help="Usar los embeddings de la BD")
+    args = parser.parse_args()
+
+    if args.from_db:
+        vectors = vectors_from_db()
+        if len(vectors) == 0:
+            print("❌ No hay embeddings en la BD")
+            return
+    else:
+        vectors = synthetic_vectors(args.size, args.dim)
+
+    # Consultas: vectores del corpus con ruido, como búsquedas de código similar
+    rng = np.random.default_rng(7)
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = sample + 0.05 * rng.standard_normal(sample.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"📊 Corpus: {len(vectors)} vectores de dimensión {vectors.shape[1]}, "
+          f"{len(queries)} consultas, k={args.k}")
+    print(f"   Tipo automático para este tamaño: {VectorStoreServiceImpl.choose_faiss_index_type(len(vectors))}")
+    print()
+    print(f"{'índice':<10} {'parámetro':<14} {'build (s)':>10} {'recall@k':>9} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for index_type, param, build_seconds, recall, p50, p95 in run_benchmark(vectors, queries, args.k, args.types):
+        print(f"{index_type:<10} {param:<14} {build_seconds:>10.2f} {recall:>9.3f} {p50:>9.3f} {p95:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
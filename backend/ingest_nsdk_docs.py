@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script para indexar la documentación NSDK (PDFs de NSDK-DOCS) en un solo trabajo.
+
+La extracción de páginas se reparte en un pool de procesos y los chunks se
+vectorizan e insertan por lotes. Los PDFs que no han cambiado (mismo SHA-256)
+se omiten salvo con --force.
+
+Uso:
+    python ingest_nsdk_docs.py
+    python ingest_nsdk_docs.py --path ../NSDK-DOCS --workers 8
+    python ingest_nsdk_docs.py --force
+"""
+import os
+import sys
+import asyncio
+import argparse
+
+sys.path.append('src')
+
+from src.database import SessionLocal
+from src.main import llm_service, initialize_llm_service
+from src.application.services.nsdk_pdf_processor import NSDKPDFProcessor, EXTRACTION_WORKERS
+
+
+async def ingest(path: str, force: bool, workers: int) -> bool:
+    if not await initialize_llm_service():
+        print('❌ No hay configuración LLM activa para generar los embeddings')
+        return False
+
+    db = SessionLocal()
+    try:
+        summary = await NSDKPDFProcessor(db, llm_service).ingest_directory(path, force=force, workers=workers)
+    finally:
+        db.close()
+
+    for failed in summary['failed']:
+        print(f"❌ {failed['name']}: {failed['error']}")
+    print(f"✅ {len(summary['processed'])} procesados ({summary['total_chunks']} chunks), "
+          f"{len(summary['skipped'])} sin cambios, {len(summary['failed'])} fallidos en {summary['duration']}s")
+    return not summary['failed']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa los PDFs de documentación NSDK")
+    parser.add_argument('--path', default='../NSDK-DOCS', help="Carpeta con los PDFs")
+    parser.add_argument('--workers', type=int, default=EXTRACTION_WORKERS, help="Procesos de extracción de páginas")
+    parser.add_argument('--force', action='store_true', help="Reprocesar también los PDFs sin cambios")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.path):
+        print(f'❌ Carpeta {args.path} no encontrada')
+        return False
+
+    return asyncio.run(ingest(args.path, args.force, args.workers))
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
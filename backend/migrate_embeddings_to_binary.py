@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script para migrar los embeddings guardados como JSON / ARRAY(Float) a la columna
+binaria empaquetada (float32, o float16 con EMBEDDING_STORAGE_DTYPE=float16).
+
+Tablas migradas: vector_embeddings y nsdk_document_chunks. La conversión se hace
+por lotes sobre una columna temporal que después sustituye a la original, así que
+el script puede relanzarse si se interrumpe.
+
+Uso:
+    python migrate_embeddings_to_binary.py
+    python migrate_embeddings_to_binary.py --batch-size 2000
+"""
+import sys
+import json
+import argparse
+
+sys.path.append('src')
+
+from sqlalchemy import inspect, text, bindparam, LargeBinary
+
+from src.database import engine
+from src.database_types import pack_embedding
+
+TABLES = {
+    'vector_embeddings': {'not_null': True},
+    'nsdk_document_chunks': {'not_null': False},
+}
+TMP_COLUMN = 'embedding_packed'
+
+
+def decode_legacy(value):
+    """Convierte el valor antiguo (JSON, ARRAY o texto de pgvector) a lista de floats"""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value).decode('utf-8')
+    if isinstance(value, str):
+        value = json.loads(value)
+    return [float(x) for x in value]
+
+
+def is_migrated(inspector, table: str) -> bool:
+    columns = {c['name']: c for c in inspector.get_columns(table)}
+    if 'embedding' not in columns:
+        return False
+    return TMP_COLUMN not in columns and isinstance(columns['embedding']['type'], LargeBinary)
+
+
+def migrate_table(table: str, batch_size: int, not_null: bool) -> int:
+    inspector = inspect(engine)
+    if table not in inspector.get_table_names():
+        print(f'⚠️  Tabla {table} no encontrada, se omite')
+        return 0
+    if is_migrated(inspector, table):
+        print(f'✅ {table} ya usa embeddings binarios')
+        return 0
+
+    binary_type = 'BYTEA' if engine.dialect.name == 'postgresql' else 'BLOB'
+    columns = [c['name'] for c in inspector.get_columns(table)]
+
+    with engine.begin() as conn:
+        if TMP_COLUMN not in columns:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {TMP_COLUMN} {binary_type}'))
+
+    update = text(f'UPDATE {table} SET {TMP_COLUMN} = :packed WHERE id = :id').bindparams(
+        bindparam('packed', type_=LargeBinary)
+    )
+    migrated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                f'SELECT id, embedding FROM {table} '
+                f'WHERE {TMP_COLUMN} IS NULL AND embedding IS NOT NULL LIMIT :limit'
+            ), {'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            conn.execute(update, [
+                {'id': row_id, 'packed': pack_embedding(decode_legacy(embedding))}
+                for row_id, embedding in rows
+            ])
+        migrated += len(rows)
+        print(f'🔄 {table}: {migrated} embeddings convertidos')
+
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table} DROP COLUMN embedding'))
+        conn.execute(text(f'ALTER TABLE {table} RENAME COLUMN {TMP_COLUMN} TO embedding'))
+        if not_null and engine.dialect.name == 'postgresql':
+            conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN embedding SET NOT NULL'))
+
+    print(f'✅ {table}: {migrated} embeddings migrados a formato binario')
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra los embeddings a columnas binarias empaquetadas")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Filas convertidas por transacción")
+    args = parser.parse_args()
+
+    try:
+        for table, options in TABLES.items():
+            migrate_table(table, args.batch_size, options['not_null'])
+        print('✅ Migración ejecutada exitosamente')
+        return True
+    except Exception as e:
+        print(f'❌ Error ejecutando migración: {str(e)}')
+        return False
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+-- Migración para crear la caché de embeddings direccionada por contenido
+-- Descripción: Reutiliza embeddings del mismo texto entre configuraciones, ramas, rutas y documentos
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    cache_key VARCHAR(64) PRIMARY KEY,
+    text_hash VARCHAR(64) NOT NULL,
+    provider VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    dimension INTEGER NOT NULL,
+    embedding JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Crear índices para optimizar búsquedas
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_text_hash ON embedding_cache (text_hash);
+
+-- Comentarios sobre la tabla
+COMMENT ON TABLE embedding_cache IS 'Caché de embeddings por contenido, independiente de ruta, configuración y rama';
+COMMENT ON COLUMN embedding_cache.cache_key IS 'sha256 de (text_hash, provider, model, dimension)';
+COMMENT ON COLUMN embedding_cache.text_hash IS 'sha256 del texto vectorizado';
+COMMENT ON COLUMN embedding_cache.provider IS 'Proveedor de embeddings (openai, mistral, ollama)';
+COMMENT ON COLUMN embedding_cache.model IS 'Modelo de embeddings';
+COMMENT ON COLUMN embedding_cache.dimension IS 'Dimensión del embedding';
+COMMENT ON COLUMN embedding_cache.embedding IS 'Vector de embedding (JSONB array de floats)';
@@ -0,0 +1,19 @@
+-- Migración para crear la tabla del último commit vectorizado por repositorio
+-- Descripción: Permite la re-vectorización incremental a partir de git diff
+
+CREATE TABLE IF NOT EXISTS vectorization_states (
+    id VARCHAR(36) PRIMARY KEY,
+    config_id VARCHAR(36) NOT NULL,
+    repo_type VARCHAR(50) NOT NULL,
+    repo_branch VARCHAR(100) NOT NULL DEFAULT 'main',
+    last_commit_sha VARCHAR(40) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_vectorization_state UNIQUE (config_id, repo_type, repo_branch)
+);
+
+-- Crear índices para optimizar búsquedas
+CREATE INDEX IF NOT EXISTS idx_vectorization_states_config_id ON vectorization_states (config_id);
+
+-- Comentarios sobre la tabla
+COMMENT ON TABLE vectorization_states IS 'Último commit vectorizado por configuración, tipo de repositorio y rama';
+COMMENT ON COLUMN vectorization_states.last_commit_sha IS 'SHA del commit con el que se completó la última vectorización';
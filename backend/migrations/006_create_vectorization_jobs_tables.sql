@@ -0,0 +1,44 @@
+-- Migración para crear las tablas de trabajos de vectorización en segundo plano
+-- Descripción: Estado de los lotes y progreso por archivo para consultar, cancelar y reanudar trabajos
+
+CREATE TABLE IF NOT EXISTS vectorization_jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    batch_type VARCHAR(50) NOT NULL,
+    config_id VARCHAR(36) NOT NULL,
+    repo_type VARCHAR(50) NOT NULL,
+    repo_branch VARCHAR(100) NOT NULL DEFAULT 'main',
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    params JSONB,
+    total_files INTEGER DEFAULT 0,
+    processed_files INTEGER DEFAULT 0,
+    successful_files INTEGER DEFAULT 0,
+    failed_files INTEGER DEFAULT 0,
+    error_files JSONB,
+    job_metadata JSONB,
+    cancel_requested BOOLEAN DEFAULT FALSE,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS vectorization_job_files (
+    id SERIAL PRIMARY KEY,
+    job_id VARCHAR(36) NOT NULL REFERENCES vectorization_jobs(id) ON DELETE CASCADE,
+    file_path VARCHAR(500) NOT NULL,
+    success BOOLEAN NOT NULL,
+    error TEXT,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Crear índices para optimizar búsquedas
+CREATE INDEX IF NOT EXISTS idx_vectorization_jobs_config_id ON vectorization_jobs (config_id);
+CREATE INDEX IF NOT EXISTS idx_vectorization_jobs_status ON vectorization_jobs (status);
+CREATE INDEX IF NOT EXISTS idx_vectorization_job_files_job_id ON vectorization_job_files (job_id);
+
+-- Comentarios sobre las tablas
+COMMENT ON TABLE vectorization_jobs IS 'Lotes de vectorización ejecutados en segundo plano';
+COMMENT ON COLUMN vectorization_jobs.params IS 'Parámetros de la vectorización para poder reanudarla';
+COMMENT ON COLUMN vectorization_jobs.cancel_requested IS 'Cancelación cooperativa solicitada';
+COMMENT ON TABLE vectorization_job_files IS 'Archivos ya procesados de cada trabajo (permite reanudar tras una caída)';
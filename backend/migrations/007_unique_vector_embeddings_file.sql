@@ -0,0 +1,16 @@
+-- Migración para garantizar un embedding por archivo y configuración
+-- Descripción: Elimina duplicados (conserva el más reciente) y crea el índice único que usan
+-- los upserts en bloque (INSERT ... ON CONFLICT (config_id, file_path)). Válida en PostgreSQL y SQLite.
+
+DELETE FROM vector_embeddings
+WHERE id NOT IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY config_id, file_path ORDER BY updated_at DESC
+        ) AS rn
+        FROM vector_embeddings
+    ) ranked
+    WHERE rn = 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_vector_embeddings_config_file ON vector_embeddings (config_id, file_path);
@@ -0,0 +1,12 @@
+-- Migración para crear los índices compuestos de las consultas de estadísticas
+-- Descripción: Cada endpoint de estadísticas es una única consulta GROUP BY que se resuelve
+-- recorriendo solo estos índices. Válida en PostgreSQL y SQLite.
+
+CREATE INDEX IF NOT EXISTS idx_nsdk_file_analyses_repo_status_type
+    ON nsdk_file_analyses (repository_name, analysis_status, file_type);
+
+CREATE INDEX IF NOT EXISTS idx_ai_analysis_results_complexity_type
+    ON ai_analysis_results (complexity, file_type);
+
+CREATE INDEX IF NOT EXISTS idx_vector_embeddings_config_type
+    ON vector_embeddings (config_id, file_type);
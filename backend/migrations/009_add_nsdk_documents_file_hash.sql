@@ -0,0 +1,8 @@
+-- Migración para añadir el hash de contenido a los documentos NSDK
+-- Descripción: La ingesta masiva de NSDK-DOCS omite los PDFs cuyo hash no ha cambiado
+
+ALTER TABLE nsdk_documents ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_nsdk_documents_file_hash ON nsdk_documents(file_hash);
+
+COMMENT ON COLUMN nsdk_documents.file_hash IS 'SHA-256 del PDF procesado';
@@ -0,0 +1,6 @@
+-- Migración para añadir el hash de contenido a los documentos NSDK (SQLite compatible)
+-- 009_add_nsdk_documents_file_hash_sqlite.sql
+
+ALTER TABLE nsdk_documents ADD COLUMN file_hash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_nsdk_documents_file_hash ON nsdk_documents(file_hash);
@@ -0,0 +1,10 @@
+-- Migración para la caché de análisis IA
+-- Descripción: Un análisis se reutiliza si coinciden el hash del contenido del fichero,
+-- el modelo, la versión del prompt y el contexto recuperado (cache_key). Válida en PostgreSQL y SQLite.
+
+ALTER TABLE ai_analysis_results ADD COLUMN cache_key VARCHAR(64);
+ALTER TABLE ai_analysis_results ADD COLUMN content_hash VARCHAR(64);
+ALTER TABLE ai_analysis_results ADD COLUMN model_name VARCHAR(100);
+ALTER TABLE ai_analysis_results ADD COLUMN prompt_version VARCHAR(20);
+
+CREATE INDEX IF NOT EXISTS idx_ai_analysis_results_cache_key ON ai_analysis_results (cache_key);
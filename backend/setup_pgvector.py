@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Script para activar el modo pgvector en PostgreSQL.
+
+- Crea la extensión vector.
+- Convierte la columna embedding de vector_embeddings y nsdk_document_chunks
+  (JSON, ARRAY o binaria) a vector(PGVECTOR_DIMENSION), por lotes.
+- Crea los índices de similitud coseno (HNSW o IVFFlat).
+
+Después hay que arrancar el backend con PGVECTOR_ENABLED=true.
+
+Uso:
+    python setup_pgvector.py
+    python setup_pgvector.py --index ivfflat
+    python setup_pgvector.py --index-only --index hnsw
+"""
+import os
+import sys
+import argparse
+
+sys.path.append('src')
+
+from sqlalchemy import inspect, text
+
+from src.database import engine
+from src.database_types import unpack_embedding, format_pgvector
+from src.infrastructure.services.pgvector_support import VECTOR_TABLES, ensure_extension, create_vector_index
+
+TMP_COLUMN = 'embedding_vector'
+
+
+def column_udt(conn, table: str, column: str):
+    return conn.execute(text(
+        "SELECT udt_name FROM information_schema.columns WHERE table_name = :table AND column_name = :column"
+    ), {'table': table, 'column': column}).scalar()
+
+
+def convert_table(table: str, dimension: int, batch_size: int) -> int:
+    if table not in inspect(engine).get_table_names():
+        print(f'⚠️  Tabla {table} no encontrada, se omite')
+        return 0
+
+    with engine.begin() as conn:
+        if column_udt(conn, table, 'embedding') == 'vector' and column_udt(conn, table, TMP_COLUMN) is None:
+            print(f'✅ {table} ya usa columnas vector')
+            return 0
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {TMP_COLUMN} vector({dimension})'))
+
+    update = text(f'UPDATE {table} SET {TMP_COLUMN} = CAST(:vector AS vector) WHERE id = :id')
+    converted = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                f'SELECT id, embedding FROM {table} '
+                f'WHERE {TMP_COLUMN} IS NULL AND embedding IS NOT NULL LIMIT :limit'
+            ), {'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            conn.execute(update, [
+                {'id': row_id, 'vector': format_pgvector(unpack_embedding(embedding))}
+                for row_id, embedding in rows
+            ])
+        converted += len(rows)
+        print(f'🔄 {table}: {converted} embeddings convertidos')
+
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table} DROP COLUMN embedding'))
+        conn.execute(text(f'ALTER TABLE {table} RENAME COLUMN {TMP_COLUMN} TO embedding'))
+
+    print(f'✅ {table}: {converted} embeddings convertidos a vector({dimension})')
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Activa la búsqueda vectorial en PostgreSQL con pgvector")
+    parser.add_argument('--index', choices=['hnsw', 'ivfflat'], default=os.getenv('PGVECTOR_INDEX', 'hnsw'),
+                        help="Tipo de índice vectorial")
+    parser.add_argument('--dimension', type=int, default=int(os.getenv('PGVECTOR_DIMENSION', 1536)),
+                        help="Dimensión de los embeddings")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Filas convertidas por transacción")
+    parser.add_argument('--index-only', action='store_true', help="Solo (re)crear los índices")
+    args = parser.parse_args()
+
+    if engine.dialect.name != 'postgresql':
+        print('❌ pgvector requiere PostgreSQL')
+        return False
+
+    try:
+        with engine.begin() as conn:
+            ensure_extension(conn)
+
+        if not args.index_only:
+            for table in VECTOR_TABLES:
+                convert_table(table, args.dimension, args.batch_size)
+
+        for table in VECTOR_TABLES:
+            with engine.begin() as conn:
+                print(f'✅ Índice creado: {create_vector_index(conn, table, args.index)}')
+
+        print('✅ pgvector configurado. Arranca el backend con PGVECTOR_ENABLED=true')
+        return True
+    except Exception as e:
+        print(f'❌ Error configurando pgvector: {str(e)}')
+        return False
+
+
+if __name__ == '__main__':
+    main()
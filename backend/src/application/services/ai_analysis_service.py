@@ -1,9 +1,12 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, AsyncIterator, Optional, List, Tuple
+import asyncio
+import hashlib
 import logging
 import re
 from pathlib import Path
 from ..use_cases.vectorization_use_case import VectorizationUseCase
-from ...infrastructure.services.llm_service_impl import LLMServiceImpl
+from ...infrastructure.services.llm_service_impl import LLMServiceImpl, FALLBACK_ANALYSIS_RESPONSE
+from ...infrastructure.services.llm_rate_limiter import LLMResponseTruncatedError
 from ...infrastructure.services.vector_store_service_impl import VectorStoreServiceImpl
 from .nsdk_query_service import NSDKQueryService
 
@@ -12,24 +15,37 @@ logger = logging.getLogger(__name__)
 class AIAnalysisService:
     """Servicio para análisis de ficheros .SCR con IA"""
     
-    def __init__(self, vectorization_use_case: VectorizationUseCase, llm_service: LLMServiceImpl, nsdk_query_service: NSDKQueryService = None):
+    # Versión de las plantillas de prompt: al cambiar los prompts hay que
+    # incrementarla para que no se reutilicen análisis de la caché
+    PROMPT_VERSION = "1.1"
+    
+    def __init__(self, vectorization_use_case: VectorizationUseCase, llm_service: LLMServiceImpl, nsdk_query_service: NSDKQueryService = None,
+                 analysis_repo=None):
         self.vectorization_use_case = vectorization_use_case
         self.llm_service = llm_service
         self.nsdk_query_service = nsdk_query_service
+        self.analysis_repo = analysis_repo  # AIAnalysisRepository para la caché de análisis
     
     async def analyze_scr_file(
         self, 
         file_path: str, 
         file_content: str, 
-        file_name: str
+        file_name: str,
+        force: bool = False,
+        raise_llm_errors: bool = False
     ) -> Dict[str, Any]:
         """
         Analiza un fichero .SCR para migración a Angular/Spring Boot
         
+        Si hay un análisis guardado con el mismo contenido, modelo, versión del
+        prompt y contexto recuperado se devuelve sin llamar a la IA (cached=True).
+        
         Args:
             file_path: Ruta completa del fichero
             file_content: Contenido del fichero .SCR
             file_name: Nombre del fichero
+            force: Ignorar la caché y repetir el análisis
+            raise_llm_errors: Propagar los errores de la IA en lugar de usar la respuesta de fallback
             
         Returns:
             Dict con el análisis completo del fichero
@@ -37,59 +53,15 @@ class AIAnalysisService:
         try:
             logger.info(f"Iniciando análisis IA para {file_name}")
             
-            # 1. Buscar código similar vectorizado para contexto
-            logger.info("1. Buscando código similar vectorizado...")
-            similar_code_context = await self._get_similar_code_context(file_content)
-            logger.info(f"Contexto de código similar obtenido: {len(similar_code_context)} elementos")
-            if similar_code_context:
-                for i, ctx in enumerate(similar_code_context):
-                    logger.info(f"  Similar {i+1}: {ctx.get('file_path', 'N/A')} - {len(str(ctx.get('content', '')))} chars")
-            
-            # 2. Consultar documentación NSDK para contexto técnico
-            logger.info("2. Consultando documentación NSDK...")
-            nsdk_context = await self._get_nsdk_documentation_context(file_content)
-            logger.info(f"Contexto NSDK obtenido: {len(nsdk_context)} caracteres")
-            if nsdk_context:
-                logger.info(f"Contexto NSDK preview: {nsdk_context[:300]}...")
-            
-            # 3. Crear el prompt para análisis
-            analysis_prompt = self._create_analysis_prompt(
-                file_name, file_content, similar_code_context, nsdk_context
+            cached_result, cache_fields, messages = await self._prepare_analysis(
+                file_content, file_name, force
             )
-            logger.info(f"Prompt creado: {len(analysis_prompt)} caracteres")
-            
-            # 3.1. Verificar si el prompt es demasiado largo y optimizar si es necesario
-            # Para GPT-5, permitir prompts mucho más largos (archivo completo)
-            is_gpt5 = hasattr(self.llm_service, 'config') and self.llm_service.config and getattr(self.llm_service.config, 'model_name', '').lower() == 'gpt-5'
-            max_prompt_length = 50000 if is_gpt5 else 6000  # GPT-5 puede manejar archivos completos
-            
-            if len(analysis_prompt) > max_prompt_length:
-                logger.warning(f"Prompt muy largo ({len(analysis_prompt)} chars), optimizando...")
-                analysis_prompt = self._optimize_prompt_for_tokens(
-                    file_name, file_content, similar_code_context, nsdk_context
-                )
-                logger.info(f"Prompt optimizado: {len(analysis_prompt)} caracteres")
+            if cached_result:
+                return cached_result
             
             # 4. Enviar a la IA para análisis
             logger.info("Enviando a OpenAI...")
-            
-            # Detectar si es GPT-5 y usar prompt especializado
-            is_gpt5 = hasattr(self.llm_service, 'config') and self.llm_service.config and getattr(self.llm_service.config, 'model_name', '').lower() == 'gpt-5'
-            
-            if is_gpt5:
-                logger.info("Usando prompt especializado para GPT-5")
-                system_prompt = self._get_gpt5_system_prompt()
-            else:
-                system_prompt = self._get_system_prompt()
-            
-            logger.info(f"System prompt: {system_prompt[:200]}...")
-            logger.info(f"User prompt length: {len(analysis_prompt)} caracteres")
-            logger.info(f"User prompt preview: {analysis_prompt[:500]}...")
-            
-            ai_response = await self.llm_service.chat_completion([
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": analysis_prompt}
-            ])
+            ai_response = await self.llm_service.chat_completion(messages, raise_on_error=raise_llm_errors)
             
             logger.info(f"=== RESPUESTA COMPLETA DE OPENAI ===")
             logger.info(f"Longitud total: {len(ai_response)} caracteres")
@@ -101,6 +73,11 @@ class AIAnalysisService:
             analysis_result = self._process_ai_response(ai_response, file_name)
             logger.info(f"Análisis procesado: {list(analysis_result.keys())}")
             
+            # Las respuestas de fallback o que no se pudieron procesar no se guardan en caché
+            if 'error' not in analysis_result and ai_response != FALLBACK_ANALYSIS_RESPONSE:
+                analysis_result.update(cache_fields)
+            analysis_result['cached'] = False
+            
             logger.info(f"Análisis IA completado para {file_name}")
             return analysis_result
             
@@ -108,19 +85,216 @@ class AIAnalysisService:
             logger.error(f"Error en análisis IA para {file_name}: {str(e)}")
             raise
     
-    async def _get_similar_code_context(self, file_content: str) -> List[Dict[str, Any]]:
+    async def stream_scr_analysis(
+        self,
+        file_content: str,
+        file_name: str,
+        force: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analiza un fichero .SCR en streaming
+        
+        Genera los eventos 'field' con cada campo de primer nivel del análisis en
+        cuanto la IA lo termina de escribir, y al final un evento 'result' con el
+        análisis completo (igual que analyze_scr_file, incluida la caché). Si la
+        respuesta se trunca o no es un JSON válido se genera un evento 'error'
+        sin resultado, para no guardar análisis incompletos.
+        """
+        logger.info(f"Iniciando análisis IA en streaming para {file_name}")
+        cached_result, cache_fields, messages = await self._prepare_analysis(file_content, file_name, force)
+        if cached_result:
+            yield {'type': 'result', 'analysis': cached_result}
+            return
+        
+        try:
+            async for event in self.llm_service.stream_json_completion(messages):
+                if event['type'] == 'field':
+                    yield event
+                    continue
+                
+                if event['data'] is None:
+                    logger.error(f"Respuesta de la IA sin JSON válido para {file_name}: {event['text'][:500]}")
+                    yield {'type': 'error', 'message': "No se pudo procesar la respuesta de la IA",
+                           'truncated': False}
+                    return
+                
+                logger.info(f"[OK] Análisis IA en streaming de {file_name}: primer campo en "
+                            f"{event['time_to_first_field']}s, total {event['elapsed']}s")
+                analysis_result = dict(event['data'])
+                analysis_result.update(file_name=file_name, analysis_timestamp=self._get_current_timestamp(),
+                                       analysis_version="1.0")
+                analysis_result.update(cache_fields)
+                analysis_result['cached'] = False
+                yield {'type': 'result', 'analysis': analysis_result,
+                       'time_to_first_field': event['time_to_first_field']}
+        except LLMResponseTruncatedError as e:
+            logger.error(f"[ERROR] Análisis IA de {file_name} truncado: {str(e)}")
+            yield {'type': 'error', 'message': str(e), 'truncated': True}
+    
+    async def _prepare_analysis(
+        self,
+        file_content: str,
+        file_name: str,
+        force: bool
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, str], List[Dict[str, str]]]:
+        """
+        Recupera el contexto, consulta la caché y construye los mensajes del análisis
+        
+        Returns:
+            Tupla (análisis en caché o None, campos de caché, mensajes para la IA)
+        """
+        # 1-2. Buscar código similar vectorizado y documentación NSDK para contexto
+        logger.info("1-2. Buscando código similar y consultando documentación NSDK...")
+        similar_code_context, nsdk_context = await self._get_retrieval_context(file_content)
+        logger.info(f"Contexto de código similar obtenido: {len(similar_code_context)} elementos")
+        if similar_code_context:
+            for i, ctx in enumerate(similar_code_context):
+                logger.info(f"  Similar {i+1}: {ctx.get('file_path', 'N/A')} - {len(str(ctx.get('content', '')))} chars")
+        
+        logger.info(f"Contexto NSDK obtenido: {len(nsdk_context)} caracteres")
+        if nsdk_context:
+            logger.info(f"Contexto NSDK preview: {nsdk_context[:300]}...")
+        
+        # 2.1. Reutilizar un análisis anterior con la misma clave de caché
+        cache_fields = self._build_cache_fields(file_content, similar_code_context, nsdk_context)
+        if not force and self.analysis_repo:
+            cached = self.analysis_repo.get_by_cache_key(cache_fields['cache_key'])
+            if cached:
+                logger.info(f"[OK] Análisis IA de {file_name} recuperado de caché ({cached.id})")
+                analysis_result = cached.to_dict()
+                analysis_result.update(cache_fields)
+                analysis_result.update(file_name=file_name, cached=True, cached_analysis_id=cached.id,
+                                       cached_file_analysis_id=cached.file_analysis_id)
+                return analysis_result, cache_fields, []
+        
+        # 3. Crear el prompt para análisis
+        analysis_prompt = self._create_analysis_prompt(
+            file_name, file_content, similar_code_context, nsdk_context
+        )
+        logger.info(f"Prompt creado: {len(analysis_prompt)} caracteres")
+        
+        # 3.1. Verificar si el prompt es demasiado largo y optimizar si es necesario
+        # Para GPT-5, permitir prompts mucho más largos (archivo completo)
+        is_gpt5 = hasattr(self.llm_service, 'config') and self.llm_service.config and getattr(self.llm_service.config, 'model_name', '').lower() == 'gpt-5'
+        max_prompt_length = 50000 if is_gpt5 else 6000  # GPT-5 puede manejar archivos completos
+        
+        if len(analysis_prompt) > max_prompt_length:
+            logger.warning(f"Prompt muy largo ({len(analysis_prompt)} chars), optimizando...")
+            analysis_prompt = self._optimize_prompt_for_tokens(
+                file_name, file_content, similar_code_context, nsdk_context
+            )
+            logger.info(f"Prompt optimizado: {len(analysis_prompt)} caracteres")
+        
+        # Detectar si es GPT-5 y usar prompt especializado
+        if is_gpt5:
+            logger.info("Usando prompt especializado para GPT-5")
+            system_prompt = self._get_gpt5_system_prompt()
+        else:
+            system_prompt = self._get_system_prompt()
+        
+        logger.info(f"System prompt: {system_prompt[:200]}...")
+        logger.info(f"User prompt length: {len(analysis_prompt)} caracteres")
+        logger.info(f"User prompt preview: {analysis_prompt[:500]}...")
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": analysis_prompt}
+        ]
+        return None, cache_fields, messages
+    
+    def save_analysis_result(self, file_analysis_id: str, analysis_result: Dict[str, Any]) -> str:
+        """
+        Guarda el análisis de un fichero y devuelve su ID. Un análisis servido
+        desde caché que ya pertenece al mismo fichero no se duplica.
+        """
+        if analysis_result.get('cached') and analysis_result.get('cached_file_analysis_id') == file_analysis_id:
+            return analysis_result['cached_analysis_id']
+        
+        from ...domain.entities.ai_analysis_result import AIAnalysisResult
+        ai_result = AIAnalysisResult(
+            file_analysis_id=file_analysis_id,
+            analysis_data=analysis_result,
+            raw_response=str(analysis_result)
+        )
+        return self.analysis_repo.create(ai_result).id
+    
+    def _build_cache_fields(self, file_content: str, similar_code: List[Dict[str, Any]],
+                            nsdk_context: str) -> Dict[str, str]:
+        """
+        Clave de caché del análisis: hash del contenido del fichero, modelo, versión
+        del prompt y huella del contexto recuperado (código similar y documentación)
+        """
+        config = getattr(self.llm_service, 'config', None)
+        model_name = f"{config.provider.value}:{config.model_name}" if config else "default"
+        content_hash = hashlib.sha256(file_content.encode('utf-8')).hexdigest()
+        
+        context = hashlib.sha256()
+        for item in similar_code:
+            context.update(f"{item.get('id') or item.get('file_path')}:{item.get('content_hash', '')}\n".encode('utf-8'))
+        context.update(nsdk_context.encode('utf-8'))
+        
+        cache_key = hashlib.sha256(
+            f"{content_hash}|{model_name}|{self.PROMPT_VERSION}|{context.hexdigest()}".encode('utf-8')
+        ).hexdigest()
+        return {
+            'cache_key': cache_key,
+            'content_hash': content_hash,
+            'model_name': model_name,
+            'prompt_version': self.PROMPT_VERSION
+        }
+    
+    async def _get_retrieval_context(self, file_content: str) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Obtiene el contexto de recuperación de una pantalla: código similar y
+        documentación NSDK.
+        
+        Todas las consultas (fragmentos del .SCR y términos técnicos) se vectorizan
+        en una sola llamada de embeddings y las dos búsquedas se lanzan a la vez.
+        """
+        # Limitar a 3 búsquedas de código y 3 consultas de documentación
+        search_queries = self._extract_search_queries_from_scr(file_content)[:3]
+        technical_terms = self._extract_technical_terms(file_content)[:3] if self.nsdk_query_service else []
+        logger.info(f"Términos técnicos extraídos: {technical_terms}")
+        
+        try:
+            embeddings = await self.llm_service.get_embeddings(search_queries + technical_terms)
+        except Exception as e:
+            logger.warning(f"Error vectorizando las consultas de contexto: {str(e)}")
+            return [], ""
+        
+        similar_code, nsdk_context = await asyncio.gather(
+            self._get_similar_code_context(file_content, search_queries, embeddings[:len(search_queries)]),
+            self._get_nsdk_documentation_context(file_content, technical_terms, embeddings[len(search_queries):])
+        )
+        return similar_code, nsdk_context
+    
+    async def _get_similar_code_context(self, file_content: str, search_queries: Optional[List[str]] = None,
+                                        query_embeddings: Optional[List[List[float]]] = None) -> List[Dict[str, Any]]:
         """Busca código similar vectorizado para proporcionar contexto"""
         try:
             # Extraer fragmentos clave del fichero .SCR para búsqueda
-            search_queries = self._extract_search_queries_from_scr(file_content)
+            if search_queries is None:
+                search_queries = self._extract_search_queries_from_scr(file_content)[:3]  # Limitar a 3 búsquedas
+            if not search_queries:
+                return []
+            if query_embeddings is None:
+                query_embeddings = await self.llm_service.get_embeddings(search_queries)
             
+            all_results = await self.vectorization_use_case.search_similar_code_batch(
+                query_embeddings=query_embeddings,
+                limit=2
+            )
+            
+            # Combinar los resultados de todas las consultas sin repetir ficheros
             similar_code = []
-            for query in search_queries[:3]:  # Limitar a 3 búsquedas
-                results = await self.vectorization_use_case.search_similar_code(
-                    query=query,
-                    limit=2
-                )
-                similar_code.extend(results)
+            seen = set()
+            for results in all_results:
+                for result in results:
+                    key = result.get('id') or result.get('file_path')
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    similar_code.append(result)
             
             return similar_code[:5]  # Máximo 5 ejemplos de contexto
             
@@ -150,32 +324,30 @@ class AIAnalysisService:
         
         return queries
     
-    async def _get_nsdk_documentation_context(self, file_content: str) -> str:
+    async def _get_nsdk_documentation_context(self, file_content: str, technical_terms: Optional[List[str]] = None,
+                                              query_embeddings: Optional[List[List[float]]] = None) -> str:
         """Obtiene contexto de la documentación NSDK para elementos específicos"""
         if not self.nsdk_query_service:
             return ""
         
         try:
             # Extraer términos técnicos del contenido del archivo
-            technical_terms = self._extract_technical_terms(file_content)
-            logger.info(f"Términos técnicos extraídos: {technical_terms}")
+            if technical_terms is None:
+                technical_terms = self._extract_technical_terms(file_content)[:3]  # Limitar a 3 consultas
+                logger.info(f"Términos técnicos extraídos: {technical_terms}")
             
             if not technical_terms:
                 logger.info("No se encontraron términos técnicos en el archivo")
                 return ""
             
-            # Consultar documentación para cada término
+            # Consultar documentación para todos los términos en una sola búsqueda
+            results = await self.nsdk_query_service.query_documentation_batch(technical_terms, query_embeddings)
             context_parts = []
-            for term in technical_terms[:3]:  # Limitar a 3 consultas
-                try:
-                    result = await self.nsdk_query_service.query_documentation(term)
-                    if result and "Información encontrada" in result:
-                        # Truncar resultado para ahorrar tokens
-                        truncated_result = result[:300] + "..." if len(result) > 300 else result
-                        context_parts.append(f"**{term}:** {truncated_result}")
-                except Exception as e:
-                    logger.warning(f"Error consultando documentación para '{term}': {e}")
-                    continue
+            for term, result in zip(technical_terms, results):
+                if result and "Información encontrada" in result:
+                    # Truncar resultado para ahorrar tokens
+                    truncated_result = result[:300] + "..." if len(result) > 300 else result
+                    context_parts.append(f"**{term}:** {truncated_result}")
             
             if context_parts:
                 return "\n\n## DOCUMENTACIÓN NSDK:\n" + "\n".join(context_parts)
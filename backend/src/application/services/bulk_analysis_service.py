@@ -0,0 +1,228 @@
+import os
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from ...domain.entities.vectorization_batch import VectorizationBatch, VectorizationBatchType
+from ...infrastructure.repositories.nsdk_file_analysis_repository import NSDKFileAnalysisRepository
+from ...infrastructure.repositories.ai_analysis_repository import AIAnalysisRepository
+from ...infrastructure.services.llm_service_impl import LLMServiceImpl
+from ...infrastructure.services.batch_progress_broker import batch_progress_broker
+from ..use_cases.vectorization_use_case import VectorizationUseCase
+from .ai_analysis_service import AIAnalysisService
+from .nsdk_query_service import NSDKQueryService
+
+logger = logging.getLogger(__name__)
+
+
+class BulkAnalysisService:
+    """
+    Análisis IA masivo de las pantallas .SCR pendientes de un repositorio.
+
+    Cada lote se ejecuta en segundo plano con ANALYSIS_BULK_CONCURRENCY análisis
+    simultáneos; el ritmo real lo marca el limitador compartido de RPM/TPM del
+    servicio LLM, que también reintenta los 429/5xx. Cada resultado se guarda en
+    cuanto termina, así que un lote interrumpido se retoma lanzando otro: solo
+    recoge las pantallas que siguen pendientes y las que quedaron en 'analyzing'
+    por una caída del proceso (las de lotes en curso se excluyen). Las pantallas
+    que ya no están pendientes al llegar su turno cuentan como omitidas. El
+    progreso se publica en batch_progress_broker como el de los lotes de
+    vectorización.
+    """
+
+    def __init__(self, vectorization_use_case: VectorizationUseCase, llm_service: LLMServiceImpl,
+                 session_factory=None, concurrency: Optional[int] = None):
+        self.vectorization_use_case = vectorization_use_case
+        self.llm_service = llm_service
+        if session_factory is None:
+            from ...database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.concurrency = concurrency or int(os.getenv('ANALYSIS_BULK_CONCURRENCY', 4))
+        self._batches: Dict[str, VectorizationBatch] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+        # Pantallas de los lotes en curso de este proceso
+        self._active_files: set = set()
+
+    def start(self, repository_name: str, config_id: UUID, force: bool = False) -> VectorizationBatch:
+        """
+        Lanza el análisis de las pantallas pendientes del repositorio, más las que
+        quedaron en 'analyzing' sin un lote en curso que las esté analizando
+
+        Returns:
+            VectorizationBatch: Lote de análisis con el total de pantallas a analizar
+        """
+        db = self.session_factory()
+        try:
+            file_repo = NSDKFileAnalysisRepository(db)
+            files = file_repo.get_by_type_and_status('screen', 'pending', repository_name)
+            stale = [file_analysis for file_analysis in
+                     file_repo.get_by_type_and_status('screen', 'analyzing', repository_name)
+                     if file_analysis.id not in self._active_files]
+        finally:
+            db.close()
+
+        batch = VectorizationBatch(
+            name=f"Análisis IA de {repository_name}",
+            batch_type=VectorizationBatchType.ANALYSIS,
+            config_id=config_id,
+            repo_type='source',
+            source_repo_branch='main',
+            metadata={'repository_name': repository_name, 'force': force, 'cached_files': 0,
+                      'skipped_files': 0}
+        )
+        for file_analysis in files + stale:
+            if file_analysis.id not in self._active_files:
+                batch.add_file(file_analysis.id)
+        self._active_files.update(batch.file_ids)
+        batch.set_stage('queued')
+
+        self._batches[batch.id] = batch
+        self._tasks[batch.id] = asyncio.create_task(self._run(batch, force))
+        logger.info(f"[OK] Lote de análisis {batch.id} lanzado: {batch.total_files} pantallas de {repository_name}"
+                    f" ({len(stale)} retomadas de 'analyzing')")
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[VectorizationBatch]:
+        return self._batches.get(batch_id)
+
+    def get_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Progreso compacto del lote más las pantallas servidas desde caché u omitidas y el ritmo por hora"""
+        batch = self._batches.get(batch_id)
+        if not batch:
+            return None
+        progress = batch.get_progress()
+        progress['repository_name'] = batch.metadata.get('repository_name')
+        progress['cached_files'] = batch.metadata.get('cached_files', 0)
+        progress['skipped_files'] = batch.metadata.get('skipped_files', 0)
+        progress['files_per_hour'] = round(progress['throughput'] * 3600) if progress['throughput'] else None
+        return progress
+
+    def cancel(self, batch_id: str) -> bool:
+        """Deja de lanzar análisis nuevos; los que están en curso terminan y se guardan"""
+        batch = self._batches.get(batch_id)
+        if not batch or batch.is_completed():
+            return False
+        self._cancelled.add(batch_id)
+        return True
+
+    async def stop(self):
+        """Interrumpe los lotes en curso; sus pantallas pendientes se retoman con un lote nuevo"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+
+    async def _run(self, batch: VectorizationBatch, force: bool):
+        queue: asyncio.Queue = asyncio.Queue()
+        for file_id in batch.file_ids:
+            queue.put_nowait(file_id)
+
+        batch.start_processing()
+        batch.set_stage('processing')
+        batch_progress_broker.publish_batch(batch)
+        try:
+            workers = [asyncio.create_task(self._worker(batch, queue, force))
+                       for _ in range(min(self.concurrency, max(batch.total_files, 1)))]
+            try:
+                await asyncio.gather(*workers)
+            except asyncio.CancelledError:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+
+            if batch.id in self._cancelled:
+                batch.cancel_processing()
+            else:
+                batch.complete_processing()
+        except asyncio.CancelledError:
+            batch.cancel_processing()
+            raise
+        except Exception as e:
+            logger.error(f"[ERROR] Error en el lote de análisis {batch.id}: {str(e)}")
+            batch.fail_processing(str(e))
+        finally:
+            self._cancelled.discard(batch.id)
+            self._tasks.pop(batch.id, None)
+            self._active_files.difference_update(batch.file_ids)
+            batch.set_stage(None)
+            batch_progress_broker.publish_batch(batch)
+            logger.info(f"[OK] Lote de análisis {batch.id} terminado con estado {batch.status.value}: "
+                        f"{batch.successful_files} analizadas, {batch.failed_files} con error, "
+                        f"{batch.metadata.get('cached_files', 0)} desde caché, "
+                        f"{batch.metadata.get('skipped_files', 0)} omitidas")
+
+    async def _worker(self, batch: VectorizationBatch, queue: asyncio.Queue, force: bool):
+        # Cada worker usa su propia sesión: las sesiones no se comparten entre tareas
+        db = self.session_factory()
+        try:
+            file_repo = NSDKFileAnalysisRepository(db)
+            ai_analysis_repo = AIAnalysisRepository(db)
+            ai_service = AIAnalysisService(
+                self.vectorization_use_case, self.llm_service,
+                NSDKQueryService(db, self.llm_service), ai_analysis_repo
+            )
+            while not queue.empty() and batch.id not in self._cancelled:
+                file_id = queue.get_nowait()
+                outcome = await self._analyze_file(ai_service, file_repo, file_id, force)
+                if outcome == 'skipped':
+                    batch.mark_file_skipped(file_id)
+                    batch.metadata['skipped_files'] = batch.metadata.get('skipped_files', 0) + 1
+                else:
+                    batch.mark_file_processed(file_id, outcome is not None)
+                if outcome == 'cached':
+                    batch.metadata['cached_files'] = batch.metadata.get('cached_files', 0) + 1
+                batch_progress_broker.publish_batch(batch)
+        finally:
+            db.close()
+
+    async def _analyze_file(self, ai_service: AIAnalysisService, file_repo: NSDKFileAnalysisRepository,
+                            file_id: str, force: bool) -> Optional[str]:
+        """
+        Analiza y guarda una pantalla. Devuelve 'analyzed', 'cached', 'skipped' si
+        ya no está pendiente (o ha desaparecido) o None si falla
+        """
+        file_analysis = file_repo.get_by_id(file_id)
+        # 'analyzing' solo llega aquí si se recogió como resto de una caída
+        if not file_analysis or file_analysis.analysis_status not in ('pending', 'analyzing'):
+            return 'skipped'
+
+        file_path = Path(file_analysis.file_path)
+        try:
+            file_content = file_path.read_text(encoding="utf-8", errors="ignore")
+        except Exception as e:
+            logger.warning(f"No se pudo leer {file_path}: {str(e)}")
+            file_analysis.analysis_status = "error"
+            file_repo.update(file_analysis)
+            return None
+
+        file_analysis.analysis_status = "analyzing"
+        file_repo.update(file_analysis)
+        try:
+            analysis_result = await ai_service.analyze_scr_file(
+                file_path=str(file_path),
+                file_content=file_content,
+                file_name=file_analysis.file_name,
+                force=force,
+                raise_llm_errors=True
+            )
+            ai_service.save_analysis_result(file_id, analysis_result)
+        except asyncio.CancelledError:
+            # Interrumpido (parada del proceso): la pantalla vuelve a quedar pendiente
+            file_analysis.analysis_status = "pending"
+            file_repo.update(file_analysis)
+            raise
+        except Exception as e:
+            logger.error(f"Error en análisis IA de {file_analysis.file_name}: {str(e)}")
+            file_analysis.analysis_status = "error"
+            file_repo.update(file_analysis)
+            return None
+
+        file_analysis.analysis_status = "analyzed"
+        file_repo.update(file_analysis)
+        return 'cached' if analysis_result.get('cached') else 'analyzed'
@@ -1,13 +1,16 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+import asyncio
 import logging
 import json
 import os
 import tempfile
 import shutil
 from pathlib import Path
+from git import GitCommandError
 from ..use_cases.vectorization_use_case import VectorizationUseCase
 from ...infrastructure.services.llm_service_impl import LLMServiceImpl
 from ...infrastructure.services.vector_store_service_impl import VectorStoreServiceImpl
+from ...infrastructure.services.git_worktree_service import git_worktree_service
 from .nsdk_query_service import NSDKQueryService
 
 logger = logging.getLogger(__name__)
@@ -46,49 +49,42 @@ class CodeGenerationService:
             self._validate_analysis_data(analysis_data, file_name)
             self._validate_repository_paths(frontend_repo_path, backend_repo_path)
             
-            # 1. Generar código Angular
-            logger.info("1. Generando código Angular...")
-            frontend_code = await self._generate_frontend_code(analysis_data, file_name)
-            
-            # 2. Generar código Spring Boot
-            logger.info("2. Generando código Spring Boot...")
-            backend_code = await self._generate_backend_code(analysis_data, file_name)
-            
-            # 3. Crear rama y aplicar cambios
-            logger.info("3. Creando rama y aplicando cambios...")
+            # 1-3. Generar el código Angular y Spring Boot y subir cada uno a su
+            # repositorio; las dos mitades son independientes y se ejecutan a la vez
+            logger.info("1-3. Generando código Angular y Spring Boot...")
             branch_name = f"feature/{file_name.replace('.scr', '').lower()}"
-            
-            # Crear rama en frontend
-            frontend_result = await self._create_branch_and_commit(
-                frontend_repo_path, 
-                branch_name, 
-                frontend_code, 
-                f"feat: Generar componente {file_name.replace('.scr', '')}"
+            screen_name = file_name.replace('.scr', '')
+            frontend_result, backend_result = await asyncio.gather(
+                self._generate_and_commit(
+                    self._generate_frontend_code, "Angular", analysis_data, file_name,
+                    frontend_repo_path, branch_name, f"feat: Generar componente {screen_name}"
+                ),
+                self._generate_and_commit(
+                    self._generate_backend_code, "Spring Boot", analysis_data, file_name,
+                    backend_repo_path, branch_name, f"feat: Generar entidad y servicios para {screen_name}"
+                )
             )
             
-            # Crear rama en backend
-            backend_result = await self._create_branch_and_commit(
-                backend_repo_path, 
-                branch_name, 
-                backend_code, 
-                f"feat: Generar entidad y servicios para {file_name.replace('.scr', '')}"
-            )
+            # Si falla una mitad se informa igualmente del resultado de la otra
+            failed = [side for side, result in (("frontend", frontend_result), ("backend", backend_result))
+                      if not result["success"]]
+            if not failed:
+                message = f"Código generado exitosamente en rama {branch_name}"
+            elif len(failed) == 1:
+                message = (f"Código generado parcialmente en rama {branch_name}: error en {failed[0]}: "
+                           f"{(frontend_result if failed[0] == 'frontend' else backend_result)['error']}")
+            else:
+                message = (f"Error generando código: frontend: {frontend_result['error']}; "
+                           f"backend: {backend_result['error']}")
             
             return {
-                "success": True,
+                "success": not failed,
+                "partial": len(failed) == 1,
                 "file_name": file_name,
                 "branch_name": branch_name,
-                "frontend": {
-                    "files_generated": len(frontend_code),
-                    "branch_created": frontend_result["branch_created"],
-                    "commit_hash": frontend_result["commit_hash"]
-                },
-                "backend": {
-                    "files_generated": len(backend_code),
-                    "branch_created": backend_result["branch_created"],
-                    "commit_hash": backend_result["commit_hash"]
-                },
-                "message": f"Código generado exitosamente en rama {branch_name}"
+                "frontend": frontend_result,
+                "backend": backend_result,
+                "message": message
             }
             
         except Exception as e:
@@ -100,6 +96,135 @@ class CodeGenerationService:
                 "message": f"Error generando código: {str(e)}"
             }
     
+    async def generate_code_batch(
+        self,
+        screens: List[Tuple[str, Dict[str, Any]]],
+        frontend_repo_path: str,
+        backend_repo_path: str,
+        branch_name: str,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Genera el código de varias pantallas y lo sube junto
+        
+        Las pantallas se generan en paralelo (CODE_GENERATION_BATCH_CONCURRENCY a la
+        vez) y todos sus archivos se escriben en una sola rama de cada repositorio,
+        con un único commit y un único push por repositorio en lugar de un ciclo
+        pull/checkout/commit/push por pantalla.
+        
+        Args:
+            screens: Lista de (nombre del archivo .SCR, datos del análisis de IA)
+            frontend_repo_path: Ruta del repositorio frontend
+            backend_repo_path: Ruta del repositorio backend
+            branch_name: Rama común a todas las pantallas
+            concurrency: Pantallas generadas a la vez
+            
+        Returns:
+            Dict con el resultado por pantalla y el commit de cada repositorio
+        """
+        self._validate_repository_paths(frontend_repo_path, backend_repo_path)
+        semaphore = asyncio.Semaphore(concurrency or int(os.getenv('CODE_GENERATION_BATCH_CONCURRENCY', 4)))
+        logger.info(f"Iniciando generación de código de {len(screens)} pantallas en la rama {branch_name}")
+        
+        async def generate_screen(file_name: str, analysis_data: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    self._validate_analysis_data(analysis_data, file_name)
+                except ValueError as e:
+                    return e, e
+                return await asyncio.gather(
+                    self._generate_frontend_code(analysis_data, file_name),
+                    self._generate_backend_code(analysis_data, file_name),
+                    return_exceptions=True
+                )
+        
+        generated = await asyncio.gather(*(generate_screen(file_name, data) for file_name, data in screens))
+        
+        # Reunir los archivos de todas las pantallas por repositorio
+        frontend_files: Dict[str, str] = {}
+        backend_files: Dict[str, str] = {}
+        screen_results = []
+        for (file_name, _), (frontend_code, backend_code) in zip(screens, generated):
+            screen_result = {"file_name": file_name}
+            for side, code, files in (("frontend", frontend_code, frontend_files),
+                                      ("backend", backend_code, backend_files)):
+                if isinstance(code, Exception):
+                    logger.error(f"Error generando código {side} para {file_name}: {str(code)}")
+                    screen_result[side] = {"success": False, "files_generated": 0, "error": str(code)}
+                else:
+                    files.update(code)
+                    screen_result[side] = {"success": True, "files_generated": len(code)}
+            screen_result["success"] = screen_result["frontend"]["success"] and screen_result["backend"]["success"]
+            screen_results.append(screen_result)
+        
+        generated_names = [result["file_name"].replace('.scr', '') for result in screen_results
+                           if result["frontend"]["success"] or result["backend"]["success"]]
+        commit_message = f"feat: Generar {len(generated_names)} pantallas migradas\n\n" + \
+            "\n".join(f"- {name}" for name in generated_names)
+        frontend_result, backend_result = await asyncio.gather(
+            self._commit_batch(frontend_repo_path, branch_name, frontend_files, commit_message),
+            self._commit_batch(backend_repo_path, branch_name, backend_files, commit_message)
+        )
+        
+        successful_screens = sum(1 for result in screen_results if result["success"])
+        success = successful_screens == len(screens) and frontend_result["success"] and backend_result["success"]
+        if success:
+            message = f"Código de {len(screens)} pantallas generado en rama {branch_name}"
+        elif generated_names and (frontend_result["success"] or backend_result["success"]):
+            message = (f"Código generado parcialmente en rama {branch_name}: "
+                       f"{successful_screens}/{len(screens)} pantallas completas")
+        else:
+            message = "Error generando código: no se subió ninguna pantalla"
+        logger.info(f"[OK] Generación por lotes terminada: {successful_screens}/{len(screens)} pantallas completas")
+        
+        return {
+            "success": success,
+            "partial": not success and bool(generated_names),
+            "branch_name": branch_name,
+            "total_screens": len(screens),
+            "successful_screens": successful_screens,
+            "screens": screen_results,
+            "frontend": frontend_result,
+            "backend": backend_result,
+            "message": message
+        }
+    
+    async def _commit_batch(self, repo_path: str, branch_name: str, files: Dict[str, str],
+                            commit_message: str) -> Dict[str, Any]:
+        """Sube los archivos del lote a un repositorio; los errores se devuelven en el resultado"""
+        if not files:
+            return {"success": False, "files_committed": 0, "error": "No se generó ningún archivo"}
+        try:
+            commit_result = await self._create_branch_and_commit(repo_path, branch_name, files, commit_message)
+            return {"success": True, **commit_result}
+        except Exception as e:
+            return {"success": False, "files_committed": 0, "error": str(e)}
+    
+    async def _generate_and_commit(
+        self,
+        generate,
+        label: str,
+        analysis_data: Dict[str, Any],
+        file_name: str,
+        repo_path: str,
+        branch_name: str,
+        commit_message: str
+    ) -> Dict[str, Any]:
+        """Genera una mitad del código y la sube a su repositorio; los errores se devuelven en el resultado"""
+        try:
+            files = await generate(analysis_data, file_name)
+            commit_result = await self._create_branch_and_commit(repo_path, branch_name, files, commit_message)
+            return {
+                "success": True,
+                "files_generated": len(files),
+                "branch_name": commit_result["branch_name"],
+                "branch_created": commit_result["branch_created"],
+                "commit_hash": commit_result["commit_hash"]
+            }
+        except Exception as e:
+            logger.error(f"Error generando código {label} para {file_name}: {str(e)}")
+            return {"success": False, "files_generated": 0, "error": str(e)}
+    
     async def _generate_frontend_code(self, analysis_data: Dict[str, Any], file_name: str) -> Dict[str, str]:
         """Genera código Angular a partir del análisis"""
         try:
@@ -111,10 +236,10 @@ class CodeGenerationService:
                 {"role": "user", "content": frontend_prompt}
             ]
             
-            ai_response = await self.llm_service.chat_completion(messages)
+            files_data, ai_response = await self._stream_generated_files(messages, "Angular")
             
             # Procesar respuesta y extraer archivos
-            frontend_files = self._extract_frontend_files(ai_response, file_name)
+            frontend_files = self._extract_frontend_files(ai_response, file_name, files_data)
             
             logger.info(f"Generados {len(frontend_files)} archivos Angular")
             return frontend_files
@@ -134,10 +259,10 @@ class CodeGenerationService:
                 {"role": "user", "content": backend_prompt}
             ]
             
-            ai_response = await self.llm_service.chat_completion(messages)
+            files_data, ai_response = await self._stream_generated_files(messages, "Spring Boot")
             
             # Procesar respuesta y extraer archivos
-            backend_files = self._extract_backend_files(ai_response, file_name)
+            backend_files = self._extract_backend_files(ai_response, file_name, files_data)
             
             logger.info(f"Generados {len(backend_files)} archivos Spring Boot")
             return backend_files
@@ -146,6 +271,24 @@ class CodeGenerationService:
             logger.error(f"Error generando código Spring Boot: {str(e)}")
             raise
     
+    async def _stream_generated_files(self, messages: List[Dict[str, str]],
+                                      label: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Pide el código a la IA en streaming y devuelve (JSON de archivos, texto)
+        
+        Cada archivo se registra en cuanto llega completo; una respuesta truncada
+        por el límite de tokens lanza LLMResponseTruncatedError en ese momento en
+        lugar de intentar extraer archivos de un JSON cortado.
+        """
+        async for event in self.llm_service.stream_json_completion(messages):
+            if event['type'] == 'field':
+                logger.info(f"Archivo {label} recibido: {event['key']} ({len(str(event['value']))} caracteres)")
+            else:
+                logger.info(f"[OK] Código {label} generado: primer archivo en {event['time_to_first_field']}s, "
+                            f"total {event['elapsed']}s")
+                return event['data'], event['text']
+        return None, ''
+    
     def _get_frontend_generation_prompt(self, analysis_data: Dict[str, Any], file_name: str) -> str:
         """Genera prompt para creación de código Angular"""
         component_name = file_name.replace('.scr', '').replace('_', '-').lower()
@@ -248,17 +391,18 @@ IMPORTANTE:
 - Responde SOLO con el JSON, sin texto adicional
 """
     
-    def _extract_frontend_files(self, ai_response: str, file_name: str) -> Dict[str, str]:
-        """Extrae archivos Angular de la respuesta de la IA"""
+    def _extract_frontend_files(self, ai_response: str, file_name: str,
+                               files_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Extrae archivos Angular de la respuesta de la IA (o del JSON ya parseado en streaming)"""
         try:
             import re
             
             # Extraer JSON de la respuesta
-            json_match = re.search(r'(\{.*\})', ai_response, re.DOTALL)
-            if not json_match:
-                raise Exception("No se encontró JSON en la respuesta de la IA")
-            
-            files_data = json.loads(json_match.group(1))
+            if files_data is None:
+                json_match = re.search(r'(\{.*\})', ai_response, re.DOTALL)
+                if not json_match:
+                    raise Exception("No se encontró JSON en la respuesta de la IA")
+                files_data = json.loads(json_match.group(1))
             
             # Mapear a rutas de archivos
             component_name = file_name.replace('.scr', '').replace('_', '-').lower()
@@ -281,17 +425,18 @@ IMPORTANTE:
             logger.error(f"Error extrayendo archivos Angular: {str(e)}")
             raise
     
-    def _extract_backend_files(self, ai_response: str, file_name: str) -> Dict[str, str]:
-        """Extrae archivos Spring Boot de la respuesta de la IA"""
+    def _extract_backend_files(self, ai_response: str, file_name: str,
+                               files_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Extrae archivos Spring Boot de la respuesta de la IA (o del JSON ya parseado en streaming)"""
         try:
             import re
             
             # Extraer JSON de la respuesta
-            json_match = re.search(r'(\{.*\})', ai_response, re.DOTALL)
-            if not json_match:
-                raise Exception("No se encontró JSON en la respuesta de la IA")
-            
-            files_data = json.loads(json_match.group(1))
+            if files_data is None:
+                json_match = re.search(r'(\{.*\})', ai_response, re.DOTALL)
+                if not json_match:
+                    raise Exception("No se encontró JSON en la respuesta de la IA")
+                files_data = json.loads(json_match.group(1))
             
             # Mapear a rutas de archivos
             entity_name = file_name.replace('.scr', '').replace('_', ' ').title().replace(' ', '')
@@ -476,39 +621,6 @@ IMPORTANTE:
         
         logger.info("Rutas de repositorios validadas correctamente")
     
-    def _get_unique_branch_name(self, repo_path: str, base_branch_name: str) -> str:
-        """Obtiene un nombre único para la rama, agregando sufijo si es necesario"""
-        import subprocess
-        
-        original_cwd = os.getcwd()
-        try:
-            os.chdir(repo_path)
-            
-            # Verificar si la rama base existe
-            result = subprocess.run(['git', 'branch', '--list', base_branch_name], 
-                                  capture_output=True, text=True)
-            
-            if not result.stdout.strip():
-                # La rama no existe, usar el nombre base
-                return base_branch_name
-            
-            # La rama existe, buscar un nombre único
-            counter = 1
-            while True:
-                unique_name = f"{base_branch_name}-{counter}"
-                result = subprocess.run(['git', 'branch', '--list', unique_name], 
-                                      capture_output=True, text=True)
-                
-                if not result.stdout.strip():
-                    # Encontramos un nombre único
-                    logger.info(f"Rama {base_branch_name} ya existe, usando {unique_name}")
-                    return unique_name
-                
-                counter += 1
-                
-        finally:
-            os.chdir(original_cwd)
-
     async def _create_branch_and_commit(
         self, 
         repo_path: str, 
@@ -516,107 +628,19 @@ IMPORTANTE:
         files: Dict[str, str], 
         commit_message: str
     ) -> Dict[str, Any]:
-        """Crea una rama, aplica cambios y hace commit"""
+        """
+        Crea una rama, aplica cambios y hace commit
+        
+        Trabaja en un worktree propio (git_worktree_service), de modo que varias
+        generaciones pueden subir ramas del mismo repositorio a la vez.
+        """
         try:
-            import subprocess
-            import os
-            
-            # Obtener un nombre único para la rama
-            unique_branch_name = self._get_unique_branch_name(repo_path, branch_name)
-            
-            # Si no hay archivos para crear, solo crear la rama
-            if not files:
-                logger.info(f"No hay archivos para crear en {repo_path}, solo creando rama {unique_branch_name}")
-                original_cwd = os.getcwd()
-                os.chdir(repo_path)
-                
-                try:
-                    # Hacer pull para asegurar que tenemos la versión más reciente
-                    logger.info(f"Haciendo pull del repositorio {repo_path}")
-                    subprocess.run(['git', 'pull', 'origin', 'main'], check=True, capture_output=True)
-                    logger.info(f"Pull completado en {repo_path}")
-                    
-                    # Crear la rama (ya sabemos que es única)
-                    subprocess.run(['git', 'checkout', '-b', unique_branch_name], check=True, capture_output=True)
-                    logger.info(f"Rama {unique_branch_name} creada en {repo_path}")
-                    
-                    # Hacer push de la rama vacía
-                    subprocess.run(['git', 'push', '-u', 'origin', unique_branch_name], check=True, capture_output=True)
-                    logger.info(f"Rama {unique_branch_name} subida al repositorio remoto")
-                    
-                    return {
-                        "success": True,
-                        "branch_created": True,
-                        "commit_hash": None,
-                        "files_created": 0,
-                        "message": f"Rama {branch_name} creada y subida sin archivos"
-                    }
-                finally:
-                    os.chdir(original_cwd)
-            
-            # Cambiar al directorio del repositorio
-            original_cwd = os.getcwd()
-            os.chdir(repo_path)
-            
-            try:
-                # 0. Hacer pull para asegurar que tenemos la versión más reciente
-                logger.info(f"Haciendo pull del repositorio {repo_path}")
-                subprocess.run(['git', 'pull', 'origin', 'main'], check=True, capture_output=True)
-                logger.info(f"Pull completado en {repo_path}")
-                
-                # 1. Crear la rama (ya sabemos que es única)
-                subprocess.run(['git', 'checkout', '-b', unique_branch_name], check=True, capture_output=True)
-                logger.info(f"Rama {unique_branch_name} creada en {repo_path}")
-                
-                # 2. Crear directorios necesarios y escribir archivos
-                for file_path, content in files.items():
-                    # Crear directorio si no existe
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    
-                    # Escribir archivo
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    
-                    logger.info(f"Archivo creado: {file_path}")
-                
-                # 3. Agregar archivos al staging
-                subprocess.run(['git', 'add', '.'], check=True, capture_output=True)
-                
-                # 4. Hacer commit
-                result = subprocess.run(
-                    ['git', 'commit', '-m', commit_message], 
-                    check=True, 
-                    capture_output=True, 
-                    text=True
-                )
-                
-                # Extraer hash del commit
-                commit_hash = subprocess.run(
-                    ['git', 'rev-parse', 'HEAD'], 
-                    check=True, 
-                    capture_output=True, 
-                    text=True
-                ).stdout.strip()
-                
-                # 5. Push de la rama
-                subprocess.run(['git', 'push', '-u', 'origin', unique_branch_name], check=True, capture_output=True)
-                
-                logger.info(f"Commit realizado: {commit_hash}")
-                
-                return {
-                    "branch_created": True,
-                    "commit_hash": commit_hash,
-                    "files_committed": len(files)
-                }
-                
-            finally:
-                # Volver al directorio original
-                os.chdir(original_cwd)
-                
-        except subprocess.CalledProcessError as e:
+            return await asyncio.to_thread(
+                git_worktree_service.commit_files, repo_path, branch_name, files, commit_message
+            )
+        except GitCommandError as e:
             logger.error(f"Error en operaciones Git: {e.stderr}")
             raise Exception(f"Error en operaciones Git: {e.stderr}")
         except Exception as e:
             logger.error(f"Error creando rama y commit: {str(e)}")
             raise
-
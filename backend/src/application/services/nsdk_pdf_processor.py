@@ -5,7 +5,12 @@ import os
 import re
 import uuid
 import json
-from typing import List, Dict, Optional
+import time
+import asyncio
+import hashlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional
 import PyPDF2
 from datetime import datetime
 
@@ -15,189 +20,322 @@ from src.infrastructure.services.llm_service_impl import LLMServiceImpl
 from src.infrastructure.services.vector_store_service_impl import VectorStoreServiceImpl
 
 
+# Páginas que extrae cada tarea del pool de procesos
+PAGES_PER_TASK = int(os.getenv('NSDK_DOCS_PAGES_PER_TASK', 20))
+# Procesos de extracción para la ingesta masiva
+EXTRACTION_WORKERS = int(os.getenv('NSDK_DOCS_EXTRACTION_WORKERS', os.cpu_count() or 2))
+# Chunks por llamada de embeddings e INSERT en bloque
+CHUNK_BATCH_SIZE = int(os.getenv('NSDK_DOCS_CHUNK_BATCH', 128))
+# Tamaño objetivo de cada chunk y solapamiento entre partes de una sección (tokens estimados)
+CHUNK_TARGET_TOKENS = int(os.getenv('NSDK_DOCS_CHUNK_TOKENS', 400))
+CHUNK_OVERLAP_TOKENS = int(os.getenv('NSDK_DOCS_CHUNK_OVERLAP', 50))
+
+# Títulos de sección: líneas en mayúsculas (con números, puntos o guiones)
+SECTION_TITLE_PATTERN = re.compile(r'^[A-Z][A-Z\s0-9\.\-]+$')
+
+
+def count_pdf_pages(file_path: str) -> int:
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_pdf_pages(file_path: str, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """
+    Extrae el texto de las páginas [start, end) con su marcador de página.
+    
+    Función de módulo para poder ejecutarse en un ProcessPoolExecutor: cada
+    proceso abre el PDF y extrae solo su rango de páginas.
+    """
+    with open(file_path, 'rb') as file:
+        pages = PyPDF2.PdfReader(file).pages
+        end = len(pages) if end is None else min(end, len(pages))
+        return [
+            f"\n--- PAGE {page_num + 1} ---\n{pages[page_num].extract_text()}\n"
+            for page_num in range(start, end)
+        ]
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[str]:
+    """Genera el texto de cada página (con su marcador) sin cargar el documento entero"""
+    with open(file_path, 'rb') as file:
+        for page_num, page in enumerate(PyPDF2.PdfReader(file).pages):
+            yield f"\n--- PAGE {page_num + 1} ---\n{page.extract_text()}\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token)"""
+    return len(text) // 4 + 1
+
+
+def calculate_file_hash(file_path: str) -> str:
+    """SHA-256 del archivo leído por bloques"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 class NSDKPDFProcessor:
-    def __init__(self, db_session):
+    def __init__(self, db_session, llm_service: Optional[LLMServiceImpl] = None):
         self.document_repo = NSDKDocumentRepository(db_session)
         self.chunk_repo = NSDKDocumentChunkRepository(db_session)
-        self.llm_service = LLMServiceImpl()
+        self.llm_service = llm_service or LLMServiceImpl()
         self.vector_store = VectorStoreServiceImpl()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extrae texto del PDF preservando estructura"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    text += f"\n--- PAGE {page_num + 1} ---\n{page_text}\n"
-                
-                return text
+            return "".join(extract_pdf_pages(file_path))
+        except Exception as e:
+            raise Exception(f"Error extrayendo texto del PDF: {str(e)}")
+    
+    async def extract_pages(self, file_path: str, executor: Optional[Executor] = None) -> List[str]:
+        """
+        Extrae las páginas del PDF. Con executor (pool de procesos) el documento se
+        reparte en rangos de PAGES_PER_TASK páginas que se extraen en paralelo.
+        """
+        try:
+            if executor is None:
+                return await asyncio.to_thread(extract_pdf_pages, file_path)
+            
+            loop = asyncio.get_running_loop()
+            page_count = await loop.run_in_executor(executor, count_pdf_pages, file_path)
+            ranges = await asyncio.gather(*[
+                loop.run_in_executor(executor, extract_pdf_pages, file_path, start, start + PAGES_PER_TASK)
+                for start in range(0, page_count, PAGES_PER_TASK)
+            ])
+            return [page for page_range in ranges for page in page_range]
         except Exception as e:
             raise Exception(f"Error extrayendo texto del PDF: {str(e)}")
     
     def create_smart_chunks(self, text: str) -> List[Dict]:
         """Crea chunks inteligentes basados en estructura del PDF"""
-        chunks = []
-        
-        # 1. Dividir por secciones (títulos en mayúsculas o con números)
-        sections = re.split(r'\n([A-Z][A-Z\s0-9\.\-]+)\n', text)
-        
-        for i in range(1, len(sections), 2):
-            if i + 1 < len(sections):
-                title = sections[i].strip()
-                content = sections[i + 1].strip()
-                
-                # Limpiar título
-                title = re.sub(r'^[0-9\.\-\s]+', '', title).strip()
-                
-                # 2. Subdividir contenido largo
-                if len(content) > 2000:
-                    sub_chunks = self._split_long_content(content)
-                    for j, sub_content in enumerate(sub_chunks):
-                        chunks.append({
-                            'title': f"{title} - Parte {j+1}" if len(sub_chunks) > 1 else title,
-                            'content': sub_content,
-                            'section': title,
-                            'chunk_type': 'section'
-                        })
-                else:
-                    chunks.append({
-                        'title': title,
-                        'content': content,
-                        'section': title,
-                        'chunk_type': 'section'
-                    })
-        
-        # Si no se encontraron secciones, dividir por párrafos
-        if not chunks:
-            chunks = self._split_by_paragraphs(text)
-        
-        return chunks
+        return list(self.iter_chunks([text]))
     
-    def _split_long_content(self, content: str) -> List[str]:
-        """Subdivide contenido largo preservando párrafos"""
-        paragraphs = content.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        
-        for paragraph in paragraphs:
-            if len(current_chunk + paragraph) > 1500:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = paragraph
-            else:
-                current_chunk += "\n\n" + paragraph if current_chunk else paragraph
+    def iter_chunks(self, pages: Iterable[str], target_tokens: Optional[int] = None,
+                    overlap_tokens: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Genera los chunks del documento consumiendo las páginas de una en una.
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        La sección actual y el texto pendiente se conservan entre páginas, así que
+        una sección que continúa en la página siguiente sigue en el mismo chunk. Al
+        alcanzar target_tokens se emite el chunk y la parte siguiente arranca con
+        las últimas líneas (hasta overlap_tokens) como contexto. El texto anterior
+        al primer título se agrupa en chunks de tipo 'paragraph'.
+        """
+        target_tokens = target_tokens or CHUNK_TARGET_TOKENS
+        overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        max_line_chars = target_tokens * 4
         
-        return chunks
-    
-    def _split_by_paragraphs(self, text: str) -> List[Dict]:
-        """Divide texto por párrafos cuando no hay secciones claras"""
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        chunk_index = 0
+        state = {'title': None, 'part': 0, 'paragraphs': 0}
+        lines: List[str] = []
+        tokens = 0
+        fresh = False  # Hay texto nuevo además del solapamiento
         
-        for paragraph in paragraphs:
-            if len(current_chunk + paragraph) > 1500:
-                if current_chunk:
-                    chunks.append({
-                        'title': f"Sección {chunk_index + 1}",
-                        'content': current_chunk.strip(),
-                        'section': f"Sección {chunk_index + 1}",
-                        'chunk_type': 'paragraph'
-                    })
-                    chunk_index += 1
-                current_chunk = paragraph
-            else:
-                current_chunk += "\n\n" + paragraph if current_chunk else paragraph
+        def emit() -> Optional[Dict]:
+            content = "\n".join(lines).strip()
+            if not fresh or not content:
+                return None
+            if state['title'] is None:
+                state['paragraphs'] += 1
+                title = f"Sección {state['paragraphs']}"
+                return {'title': title, 'content': content, 'section': title, 'chunk_type': 'paragraph'}
+            state['part'] += 1
+            title = state['title'] if state['part'] == 1 else f"{state['title']} - Parte {state['part']}"
+            return {'title': title, 'content': content, 'section': state['title'], 'chunk_type': 'section'}
         
-        if current_chunk:
-            chunks.append({
-                'title': f"Sección {chunk_index + 1}",
-                'content': current_chunk.strip(),
-                'section': f"Sección {chunk_index + 1}",
-                'chunk_type': 'paragraph'
-            })
+        for page in pages:
+            for line in page.splitlines():
+                stripped = line.strip()
+                if SECTION_TITLE_PATTERN.match(stripped):
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    state['title'] = re.sub(r'^[0-9\.\-\s]+', '', stripped).strip() or stripped
+                    state['part'] = 0
+                    lines, tokens, fresh = [], 0, False
+                    continue
+                
+                # Las líneas más largas que un chunk se trocean
+                for piece in (line[i:i + max_line_chars] for i in range(0, max(len(line), 1), max_line_chars)):
+                    piece_tokens = estimate_tokens(piece)
+                    if fresh and tokens + piece_tokens > target_tokens:
+                        chunk = emit()
+                        if chunk:
+                            yield chunk
+                        # Solapamiento: últimas líneas del chunk emitido
+                        overlap, overlap_count = [], 0
+                        for previous in reversed(lines):
+                            previous_tokens = estimate_tokens(previous)
+                            if overlap_count + previous_tokens > overlap_tokens:
+                                break
+                            overlap.insert(0, previous)
+                            overlap_count += previous_tokens
+                        lines, tokens, fresh = overlap, overlap_count, False
+                    lines.append(piece)
+                    tokens += piece_tokens
+                    fresh = fresh or bool(piece.strip())
         
-        return chunks
+        chunk = emit()
+        if chunk:
+            yield chunk
+    
+    async def _find_unchanged(self, document_name: str, file_hash: str):
+        """Documento ya procesado con el mismo contenido, o None si hay que (re)procesarlo"""
+        existing_document = await self.document_repo.get_by_name(document_name)
+        if existing_document and existing_document.status == 'completed' and existing_document.file_hash == file_hash:
+            return existing_document
+        return None
     
-    async def process_nsdk_document(self, file_path: str, document_name: str) -> str:
-        """Procesa un documento NSDK completo"""
+    async def process_nsdk_document(self, file_path: str, document_name: str, force: bool = False) -> str:
+        """Procesa un documento NSDK completo (se omite si ya está procesado y no ha cambiado)"""
         
         try:
             print(f"📄 Procesando: {document_name}")
             
-            # 1. Verificar si el documento ya existe
-            existing_document = await self.document_repo.get_by_name(document_name)
-            if existing_document and existing_document.status == 'completed':
+            # 1. Verificar si el documento ya existe con el mismo contenido
+            file_hash = await asyncio.to_thread(calculate_file_hash, file_path)
+            existing_document = None if force else await self._find_unchanged(document_name, file_hash)
+            if existing_document:
                 print(f"⚠️ Documento {document_name} ya está procesado")
                 return str(existing_document.id)
             
-            # 2. Si existe pero está en error, eliminar y reprocesar
-            if existing_document and existing_document.status == 'error':
-                print(f"🔄 Reprocesando documento {document_name} (estado anterior: error)")
-                await self.document_repo.delete(str(existing_document.id))
-                await self.chunk_repo.delete_by_document_id(str(existing_document.id))
-            
-            # 3. Crear nuevo registro de documento
-            document_id = str(uuid.uuid4())
-            file_size = os.path.getsize(file_path)
-            document = await self.document_repo.create({
-                'id': document_id,
-                'name': document_name,
-                'file_path': file_path,
-                'file_size': file_size,
-                'status': 'processing'
-            })
+            # 2. Extraer y trocear página a página
+            return await self._index_document(document_name, file_path, file_hash, iter_pdf_pages(file_path))
             
-            # 4. Extraer texto
-            text = self.extract_text_from_pdf(file_path)
-            print(f"✅ Texto extraído: {len(text)} caracteres")
+        except Exception as e:
+            raise Exception(f"Error procesando documento: {str(e)}")
+    
+    async def _index_document(self, document_name: str, file_path: str, file_hash: str, pages: Iterable[str]) -> str:
+        """Sustituye la versión anterior del documento por sus nuevos chunks"""
+        # 1. Eliminar la versión anterior (en error, a medias o con otro contenido)
+        existing_document = await self.document_repo.get_by_name(document_name)
+        if existing_document:
+            print(f"🔄 Reprocesando documento {document_name} (estado anterior: {existing_document.status})")
+            await self.chunk_repo.delete_by_document_id(str(existing_document.id))
+            await self.document_repo.delete(str(existing_document.id))
+        
+        # 2. Crear nuevo registro de documento
+        document_id = str(uuid.uuid4())
+        await self.document_repo.create({
+            'id': document_id,
+            'name': document_name,
+            'file_path': file_path,
+            'file_size': os.path.getsize(file_path),
+            'file_hash': file_hash,
+            'status': 'processing'
+        })
+        
+        try:
+            # 3. Chunks inteligentes con embeddings e inserción por lotes
+            total_chunks = await self._store_chunks(document_id, self.iter_chunks(pages))
             
-            # 5. Crear chunks inteligentes
-            chunks = self.create_smart_chunks(text)
-            print(f"✅ Chunks creados: {len(chunks)}")
+            # 4. Actualizar documento
+            await self.document_repo.update(document_id, {
+                'status': 'completed',
+                'total_chunks': total_chunks
+            })
             
-            # 6. Generar embeddings y almacenar chunks
-            for i, chunk in enumerate(chunks):
-                print(f"🔄 Procesando chunk {i+1}/{len(chunks)}")
-                
-                # Generar embedding
-                embedding = await self.llm_service.get_embedding(chunk['content'])
-                
-                # Crear chunk en BD
-                chunk_data = {
+            print(f"✅ Documento {document_name} procesado y almacenado: {total_chunks} chunks")
+            return document_id
+        except Exception:
+            await self.document_repo.update(document_id, {'status': 'error'})
+            raise
+    
+    async def _store_chunks(self, document_id: str, chunks: Iterator[Dict]) -> int:
+        """
+        Genera los embeddings y guarda los chunks en lotes de CHUNK_BATCH_SIZE.
+        
+        Los chunks se consumen del generador lote a lote (en un hilo, ya que leer
+        las páginas del PDF es bloqueante), así que en memoria solo hay un lote.
+        """
+        start = 0
+        while True:
+            batch = await asyncio.to_thread(lambda: list(islice(chunks, CHUNK_BATCH_SIZE)))
+            if not batch:
+                return start
+            embeddings = await self.llm_service.get_embeddings([chunk['content'] for chunk in batch])
+            await self.chunk_repo.create_many([
+                {
                     'id': str(uuid.uuid4()),
                     'document_id': document_id,
-                    'chunk_index': i,
+                    'chunk_index': start + i,
                     'chunk_text': chunk['content'],
                     'chunk_title': chunk['title'],
                     'chunk_section': chunk['section'],
                     'chunk_type': chunk['chunk_type'],
-                    'embedding': embedding  # Array de floats para PostgreSQL
+                    'embedding': embedding
                 }
+                for i, (chunk, embedding) in enumerate(zip(batch, embeddings))
+            ])
+            start += len(batch)
+    
+    async def ingest_directory(self, docs_path: str, force: bool = False,
+                               workers: Optional[int] = None) -> Dict:
+        """
+        Indexa todos los PDFs de una carpeta (NSDK-DOCS) en un solo trabajo.
+        
+        Los PDFs sin cambios (mismo SHA-256) se omiten. La extracción de páginas de
+        todos los documentos se reparte en un pool de procesos y, según termina
+        cada documento, sus chunks pasan por embeddings e inserción por lotes
+        mientras se siguen extrayendo los demás. Como mucho hay tantos documentos
+        extraídos o en extracción sin indexar como procesos, para acotar las
+        páginas que se mantienen en memoria.
+        
+        Returns:
+            Resumen con los documentos procesados, omitidos y fallidos
+        """
+        started = time.monotonic()
+        summary = {'processed': [], 'skipped': [], 'failed': [], 'total_chunks': 0}
+        
+        pdf_files = sorted(
+            os.path.join(docs_path, name) for name in os.listdir(docs_path) if name.lower().endswith('.pdf')
+        )
+        hashes = await asyncio.gather(*[asyncio.to_thread(calculate_file_hash, path) for path in pdf_files])
+        
+        pending = []
+        for file_path, file_hash in zip(pdf_files, hashes):
+            document_name = os.path.basename(file_path)
+            if not force and await self._find_unchanged(document_name, file_hash):
+                summary['skipped'].append(document_name)
+            else:
+                pending.append((document_name, file_path, file_hash))
+        
+        print(f"📚 Ingesta de {docs_path}: {len(pending)} PDFs a procesar, {len(summary['skipped'])} sin cambios")
+        if pending:
+            max_workers = workers or EXTRACTION_WORKERS
+            in_flight = asyncio.Semaphore(max_workers)
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                async def extract(document):
+                    # El permiso se libera al terminar de indexar el documento
+                    await in_flight.acquire()
+                    try:
+                        return document, await self.extract_pages(document[1], executor), None
+                    except Exception as e:
+                        return document, None, e
                 
-                await self.chunk_repo.create(chunk_data)
-            
-            # 7. Actualizar documento
-            await self.document_repo.update(document_id, {
-                'status': 'completed',
-                'total_chunks': len(chunks)
-            })
-            
-            print(f"✅ Documento {document_name} procesado y almacenado")
-            return document_id
-            
-        except Exception as e:
-            # Marcar como error si el documento fue creado
-            if 'document_id' in locals():
-                await self.document_repo.update(document_id, {'status': 'error'})
-            raise Exception(f"Error procesando documento: {str(e)}")
+                # La sesión de BD es única: la indexación es secuencial, la extracción no
+                for extraction in asyncio.as_completed([extract(document) for document in pending]):
+                    (document_name, file_path, file_hash), pages, error = await extraction
+                    try:
+                        if error:
+                            raise error
+                        document_id = await self._index_document(document_name, file_path, file_hash, pages)
+                        document = await self.document_repo.get_by_id(document_id)
+                        summary['processed'].append(document_name)
+                        summary['total_chunks'] += document.total_chunks if document else 0
+                    except Exception as e:
+                        print(f"❌ Error procesando {document_name}: {str(e)}")
+                        summary['failed'].append({'name': document_name, 'error': str(e)})
+                    finally:
+                        pages = None
+                        in_flight.release()
+        
+        summary['duration'] = round(time.monotonic() - started, 2)
+        print(f"✅ Ingesta completada en {summary['duration']}s: {len(summary['processed'])} procesados, "
+              f"{len(summary['skipped'])} omitidos, {len(summary['failed'])} fallidos")
+        return summary
     
     async def get_document_status(self, document_id: str) -> Dict:
         """Obtiene el estado de procesamiento de un documento"""
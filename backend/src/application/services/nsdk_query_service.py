@@ -7,9 +7,9 @@ from src.infrastructure.services.llm_service_impl import LLMServiceImpl
 
 
 class NSDKQueryService:
-    def __init__(self, db_session):
+    def __init__(self, db_session, llm_service: Optional[LLMServiceImpl] = None):
         self.chunk_repo = NSDKDocumentChunkRepository(db_session)
-        self.llm_service = LLMServiceImpl()
+        self.llm_service = llm_service or LLMServiceImpl()
     
     async def query_documentation(self, query: str, context: str = "") -> str:
         """Consulta la documentación NSDK y devuelve información relevante"""
@@ -25,19 +25,55 @@ class NSDKQueryService:
             )
             
             # 3. Formatear respuesta
-            if similar_chunks:
-                response = f"Información encontrada sobre '{query}':\n\n"
-                for i, chunk in enumerate(similar_chunks, 1):
-                    response += f"**Fuente {i}** ({chunk.chunk_title}):\n"
-                    response += f"{chunk.chunk_text[:500]}...\n\n"
-            else:
-                response = f"No se encontró información específica sobre '{query}' en la documentación NSDK."
-            
-            return response
+            return self._format_response(query, similar_chunks)
             
         except Exception as e:
             return f"Error consultando documentación: {str(e)}"
     
+    async def query_documentation_batch(self, queries: List[str],
+                                        query_embeddings: Optional[List[List[float]]] = None) -> List[str]:
+        """
+        Consulta varios términos a la vez: embeddings en una sola llamada (o los ya
+        calculados por el llamador) y una única búsqueda de chunks para todos.
+        
+        Los chunks que ya aparecen en la respuesta de una consulta anterior no se
+        repiten en las siguientes.
+        
+        Returns:
+            Una respuesta por consulta, con el mismo formato que query_documentation
+        """
+        if not queries:
+            return []
+        try:
+            if query_embeddings is None:
+                query_embeddings = await self.llm_service.get_embeddings(queries)
+            
+            all_chunks = await self.chunk_repo.search_similar_chunks_many(
+                query_embeddings,
+                limit=3,
+                threshold=0.7
+            )
+            responses = []
+            seen_ids = set()
+            for query, chunks in zip(queries, all_chunks):
+                unique_chunks = [chunk for chunk in chunks if chunk.id not in seen_ids]
+                seen_ids.update(chunk.id for chunk in unique_chunks)
+                responses.append(self._format_response(query, unique_chunks))
+            return responses
+            
+        except Exception as e:
+            return [f"Error consultando documentación: {str(e)}" for _ in queries]
+    
+    @staticmethod
+    def _format_response(query: str, similar_chunks: List) -> str:
+        if not similar_chunks:
+            return f"No se encontró información específica sobre '{query}' en la documentación NSDK."
+        response = f"Información encontrada sobre '{query}':\n\n"
+        for i, chunk in enumerate(similar_chunks, 1):
+            response += f"**Fuente {i}** ({chunk.chunk_title}):\n"
+            response += f"{chunk.chunk_text[:500]}...\n\n"
+        return response
+    
     async def get_documentation_stats(self) -> Dict:
         """Obtiene estadísticas de la documentación"""
         try:
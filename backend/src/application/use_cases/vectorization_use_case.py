@@ -3,17 +3,50 @@ import logging
 from uuid import UUID
 from ...domain.entities.vectorization_batch import VectorizationBatch
 from ...infrastructure.services.nsdk_vectorization_service import UnifiedVectorizationService
+from ...infrastructure.services.vectorization_job_engine import VectorizationJobEngine
 
 logger = logging.getLogger(__name__)
 
 class VectorizationUseCase:
     """Caso de uso para la vectorización de repositorios"""
     
-    def __init__(self, unified_vectorization_service: UnifiedVectorizationService):
+    def __init__(self, unified_vectorization_service: UnifiedVectorizationService,
+                 job_engine: Optional[VectorizationJobEngine] = None):
         self.unified_vectorization_service = unified_vectorization_service
+        self.job_engine = job_engine
+    
+    def submit_repository_vectorization(self, config_id: str, repo_type: str, branch: str = 'main',
+                                        force_update: bool = True, full_rescan: bool = False) -> VectorizationBatch:
+        """
+        Encola la vectorización de un repositorio en el motor de trabajos y devuelve
+        el lote pendiente sin esperar a que termine
+        """
+        if not self.job_engine:
+            raise RuntimeError("Motor de trabajos de vectorización no disponible")
+        logger.info(f"Encolando vectorización del repositorio: {repo_type} de configuración {config_id}")
+        return self.job_engine.submit('repository', {
+            'config_id': config_id,
+            'repo_type': repo_type,
+            'branch': branch,
+            'force_update': force_update,
+            'full_rescan': full_rescan
+        })
+    
+    def submit_module_vectorization(self, config_id: str, repo_type: str, module_path: str,
+                                    branch: str = 'main') -> VectorizationBatch:
+        """Encola la vectorización de un módulo en el motor de trabajos"""
+        if not self.job_engine:
+            raise RuntimeError("Motor de trabajos de vectorización no disponible")
+        logger.info(f"Encolando vectorización del módulo: {module_path}")
+        return self.job_engine.submit('module', {
+            'config_id': config_id,
+            'repo_type': repo_type,
+            'module_path': module_path,
+            'branch': branch
+        })
     
     async def vectorize_repository(self, config_id: str, repo_type: str, branch: str = 'main',
-                           force_update: bool = True) -> VectorizationBatch:
+                           force_update: bool = True, full_rescan: bool = False) -> VectorizationBatch:
         """
         Vectoriza un repositorio completo detectando automáticamente su tecnología
         
@@ -22,6 +55,7 @@ class VectorizationUseCase:
             repo_type: Tipo de repositorio ('source', 'frontend', 'backend')
             branch: Rama a procesar
             force_update: Si es True, fuerza pull del repositorio y limpia vectorización existente
+            full_rescan: Si es True, procesa todo el repositorio en lugar de solo los cambios
             
         Returns:
             VectorizationBatch: Lote de vectorización
@@ -34,7 +68,8 @@ class VectorizationUseCase:
                 config_id=config_id,
                 repo_type=repo_type,
                 branch=branch,
-                force_update=force_update
+                force_update=force_update,
+                full_rescan=full_rescan
             )
             
             logger.info(f"Vectorización completada. Estado: {batch.status.value}")
@@ -118,6 +153,25 @@ class VectorizationUseCase:
             logger.error(f"Error en búsqueda de código similar: {str(e)}")
             return []
     
+    async def search_similar_code_batch(self, query_embeddings: List[List[float]],
+                                        limit: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Busca código similar para varias consultas ya vectorizadas en una sola búsqueda
+        
+        Args:
+            query_embeddings: Embeddings de las consultas
+            limit: Número máximo de resultados por consulta
+            
+        Returns:
+            List[List[Dict[str, Any]]]: Resultados de cada consulta, en el mismo orden
+        """
+        results = await self.unified_vectorization_service.search_similar_code_batch(
+            query_embeddings=query_embeddings,
+            limit=limit
+        )
+        logger.info(f"Búsqueda múltiple completada. Resultados: {[len(r) for r in results]}")
+        return results
+    
     def get_vectorization_stats(self) -> Dict[str, Any]:
         """
         Obtiene estadísticas de vectorización
@@ -145,12 +199,25 @@ class VectorizationUseCase:
                 'last_vectorization': None
             }
     
-    def get_batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+    def get_batch(self, batch_id: str) -> Optional[VectorizationBatch]:
+        """Lote en memoria o, si no está, el persistido por el motor de trabajos"""
+        batch = self.unified_vectorization_service.get_batch_by_id(batch_id)
+        if not batch and self.job_engine:
+            batch = self.job_engine.load_batch(batch_id)
+        return batch
+    
+    def get_batch_progress(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Progreso compacto del lote (tamaño constante, apto para sondeo frecuente)"""
+        batch = self.get_batch(batch_id)
+        return batch.get_progress() if batch else None
+    
+    def get_batch_status(self, batch_id: str, include_files: bool = False) -> Optional[Dict[str, Any]]:
         """
         Obtiene el estado de un lote de vectorización
         
         Args:
             batch_id: ID del lote
+            include_files: Si es True, incluye la lista completa de file_ids
             
         Returns:
             Optional[Dict[str, Any]]: Estado del lote o None si no existe
@@ -158,8 +225,8 @@ class VectorizationUseCase:
         try:
             logger.info(f"Obteniendo estado del lote: {batch_id}")
             
-            # Buscar el lote en el servicio de vectorización
-            batch = self.unified_vectorization_service.get_batch_by_id(batch_id)
+            # Buscar el lote en el servicio de vectorización y, si no está en memoria, en BD
+            batch = self.get_batch(batch_id)
             
             if batch:
                 # Convertir a diccionario para la respuesta
@@ -175,8 +242,9 @@ class VectorizationUseCase:
                     'processed_files': batch.processed_files,
                     'successful_files': batch.successful_files,
                     'failed_files': batch.failed_files,
-                    'file_ids': batch.file_ids,
+                    'file_ids': batch.file_ids if include_files else None,
                     'error_files': batch.error_files,
+                    'stage': batch.stage,
                     'metadata': batch.metadata,
                     'started_at': batch.started_at.isoformat() if batch.started_at else None,
                     'completed_at': batch.completed_at.isoformat() if batch.completed_at else None,
@@ -207,10 +275,12 @@ class VectorizationUseCase:
         try:
             logger.info(f"Cancelando lote: {batch_id}")
             
-            # TODO: Implementar cancelación del lote
-            # Por ahora retornamos False
-            logger.warning("Cancelación de lote no implementada aún")
-            return False
+            if not self.job_engine:
+                logger.warning("Motor de trabajos de vectorización no disponible")
+                return False
+            
+            # La cancelación es cooperativa: el worker la atiende entre etapas del pipeline
+            return self.job_engine.cancel(batch_id)
             
         except Exception as e:
             logger.error(f"Error cancelando lote: {str(e)}")
@@ -49,6 +49,9 @@ def create_tables():
     from .domain.entities.vectorization_batch import VectorizationBatch
     from .domain.entities.nsdk_directory import NSDKDirectory
     from .domain.entities.vector_embedding import VectorEmbedding
+    from .domain.entities.embedding_cache_entry import EmbeddingCacheEntry
+    from .domain.entities.vectorization_state import VectorizationState
+    from .domain.entities.vectorization_job import VectorizationJob, VectorizationJobFile
     from .domain.entities.nsdk_document import NSDKDocument
     from .domain.entities.nsdk_document_chunk import NSDKDocumentChunk
     
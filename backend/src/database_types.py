@@ -0,0 +1,118 @@
+import os
+import json
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.types import TypeDecorator, LargeBinary, UserDefinedType
+
+# Cabecera de 4 bytes que indica el formato del vector empaquetado. Tener 4 bytes
+# mantiene alineados los datos para np.frombuffer.
+_HEADER_FLOAT32 = b'F32\x00'
+_HEADER_FLOAT16 = b'F16\x00'
+_HEADER_SIZE = 4
+
+
+def pgvector_enabled(dialect_name: Optional[str] = None) -> bool:
+    """
+    Indica si los embeddings se guardan en columnas vector de pgvector
+    (PGVECTOR_ENABLED=true y base de datos PostgreSQL).
+    """
+    if os.getenv('PGVECTOR_ENABLED', 'false').lower() != 'true':
+        return False
+    if dialect_name is None:
+        dialect_name = 'postgresql' if os.getenv('DATABASE_URL', '').startswith('postgres') else 'sqlite'
+    return dialect_name == 'postgresql'
+
+
+def pack_embedding(embedding: Sequence[float], dtype: Optional[str] = None) -> bytes:
+    """
+    Empaqueta un embedding como bytes little-endian (float32, o float16 si se pide
+    o si EMBEDDING_STORAGE_DTYPE=float16).
+    """
+    dtype = dtype or os.getenv('EMBEDDING_STORAGE_DTYPE', 'float32')
+    if dtype == 'float16':
+        return _HEADER_FLOAT16 + np.asarray(embedding, dtype='<f2').tobytes()
+    return _HEADER_FLOAT32 + np.asarray(embedding, dtype='<f4').tobytes()
+
+
+def unpack_embedding(data: Any) -> Optional[np.ndarray]:
+    """
+    Decodifica un embedding empaquetado a un array float32 de NumPy.
+
+    Los vectores float32 se leen directamente del buffer (sin copia, solo lectura);
+    los float16 se convierten a float32 en una sola operación. Acepta también el
+    formato antiguo (lista o JSON) por si quedan filas sin migrar.
+    """
+    if data is None:
+        return None
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if isinstance(data, (bytes, bytearray)):
+        header = bytes(data[:_HEADER_SIZE])
+        if header == _HEADER_FLOAT32:
+            return np.frombuffer(data, dtype='<f4', offset=_HEADER_SIZE)
+        if header == _HEADER_FLOAT16:
+            return np.frombuffer(data, dtype='<f2', offset=_HEADER_SIZE).astype(np.float32)
+        data = data.decode('utf-8')
+    if isinstance(data, str):
+        data = json.loads(data)
+    return np.asarray(data, dtype=np.float32)
+
+
+def format_pgvector(embedding: Sequence[float]) -> str:
+    """Representación textual '[x1,x2,...]' que acepta pgvector"""
+    return '[' + ','.join(repr(float(x)) for x in np.asarray(embedding, dtype=np.float32)) + ']'
+
+
+def parse_pgvector(value: str) -> np.ndarray:
+    """Decodifica el texto '[x1,x2,...]' de pgvector a float32 sin pasar por listas"""
+    return np.fromstring(value.strip('[]'), dtype=np.float32, sep=',')
+
+
+class PgVector(UserDefinedType):
+    """Tipo vector(n) de la extensión pgvector"""
+
+    cache_ok = True
+
+    def __init__(self, dimension: Optional[int] = None):
+        self.dimension = dimension
+
+    def get_col_spec(self, **kw):
+        return f"vector({self.dimension})" if self.dimension else "vector"
+
+
+class PackedVector(TypeDecorator):
+    """
+    Columna para embeddings. Por defecto se guardan como float32/float16
+    empaquetados (binario) en lugar de listas JSON; con pgvector activo
+    (PGVECTOR_ENABLED=true sobre PostgreSQL) se usa una columna vector(n) para
+    poder buscar en el servidor. En ambos casos se leen como np.ndarray float32.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if pgvector_enabled(dialect.name):
+            return dialect.type_descriptor(PgVector(int(os.getenv('PGVECTOR_DIMENSION', 1536))))
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if pgvector_enabled(dialect.name):
+            return value if isinstance(value, str) else format_pgvector(unpack_embedding(value))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return bytes(value)
+        return pack_embedding(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str) and value.startswith('['):
+            return parse_pgvector(value)
+        return unpack_embedding(value)
+
+    def compare_values(self, x, y):
+        # Evita la comparación elemento a elemento (ambigua) de los ndarray
+        if x is None or y is None:
+            return x is y
+        return np.array_equal(np.asarray(x), np.asarray(y))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -8,6 +8,11 @@ class AIAnalysisResult(Base):
     """Entidad para almacenar resultados de análisis IA de ficheros .SCR"""
     
     __tablename__ = "ai_analysis_results"
+    __table_args__ = (
+        # Cubre la consulta agrupada de get_statistics (solo índice)
+        Index('idx_ai_analysis_results_complexity_type', 'complexity', 'file_type'),
+        Index('idx_ai_analysis_results_cache_key', 'cache_key'),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     file_analysis_id = Column(String(255), ForeignKey('nsdk_file_analyses.id'), nullable=False)
@@ -16,6 +21,12 @@ class AIAnalysisResult(Base):
     analysis_timestamp = Column(DateTime, default=datetime.utcnow)
     analysis_version = Column(String(20), default="1.0")
     
+    # Caché de análisis: hash de (contenido, modelo, versión del prompt, contexto recuperado)
+    cache_key = Column(String(64))
+    content_hash = Column(String(64))
+    model_name = Column(String(100))
+    prompt_version = Column(String(20))
+    
     # Resultado del análisis (JSON)
     analysis_summary = Column(Text)
     file_type = Column(String(50))  # screen|form|report|utility
@@ -51,6 +62,10 @@ class AIAnalysisResult(Base):
         self.potential_issues = analysis_data.get('potential_issues')
         self.raw_ai_response = raw_response
         self.analysis_version = analysis_data.get('analysis_version', '1.0')
+        self.cache_key = analysis_data.get('cache_key')
+        self.content_hash = analysis_data.get('content_hash')
+        self.model_name = analysis_data.get('model_name')
+        self.prompt_version = analysis_data.get('prompt_version')
     
     def to_dict(self) -> dict:
         """Convierte la entidad a diccionario"""
@@ -96,6 +111,8 @@ class AIAnalysisResult(Base):
             'file_analysis_id': self.file_analysis_id,
             'analysis_timestamp': self.analysis_timestamp.isoformat() if self.analysis_timestamp else None,
             'analysis_version': self.analysis_version,
+            'model_name': self.model_name,
+            'prompt_version': self.prompt_version,
             'analysis_summary': self.analysis_summary,
             'file_type': self.file_type,
             'complexity': self.complexity,
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, DateTime, JSON, Integer
+from datetime import datetime
+
+from ...database_base import Base
+
+class EmbeddingCacheEntry(Base):
+    """
+    Entrada de la caché de embeddings direccionada por contenido.
+    
+    La clave depende solo del texto vectorizado y del modelo que lo vectorizó
+    (proveedor, modelo y dimensión), no de la ruta, la configuración ni la rama,
+    así que el mismo contenido nunca se vectoriza dos veces con el mismo modelo.
+    """
+    
+    __tablename__ = "embedding_cache"
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256(text_hash|provider|model|dimension)
+    text_hash = Column(String(64), nullable=False, index=True)  # sha256 del texto vectorizado
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    dimension = Column(Integer, nullable=False)
+    embedding = Column(JSON, nullable=False)  # Lista de floats del embedding
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not self.created_at:
+            self.created_at = datetime.utcnow()
@@ -17,6 +17,7 @@ class NSDKDocument(Base):
     name = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(BigInteger)
+    file_hash = Column(String(64), index=True)  # SHA-256 del PDF, para omitir documentos sin cambios
     status = Column(String(50), default='processing')
     total_chunks = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -32,6 +33,7 @@ class NSDKDocument(Base):
             'name': self.name,
             'file_path': self.file_path,
             'file_size': self.file_size,
+            'file_hash': self.file_hash,
             'status': self.status,
             'total_chunks': self.total_chunks,
             'created_at': self.created_at.isoformat() if self.created_at else None,
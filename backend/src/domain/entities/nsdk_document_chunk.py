@@ -1,14 +1,15 @@
 """
 Entidad para chunks de documentos NSDK
 """
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Float
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 import json
 
 from ...database_base import Base
+from ...database_types import PackedVector
 
 
 class NSDKDocumentChunk(Base):
@@ -21,7 +22,7 @@ class NSDKDocumentChunk(Base):
     chunk_title = Column(String(500))
     chunk_section = Column(String(500))
     chunk_type = Column(String(100), default='section')
-    embedding = Column(ARRAY(Float))  # Array de floats para PostgreSQL
+    embedding = Column(PackedVector)  # float32 empaquetado, se lee como np.ndarray
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relación con documento (comentada temporalmente para evitar problemas de importación)
@@ -37,6 +38,6 @@ class NSDKDocumentChunk(Base):
             'chunk_title': self.chunk_title,
             'chunk_section': self.chunk_section,
             'chunk_type': self.chunk_type,
-            'embedding': self.embedding,
+            'embedding': self.embedding.tolist() if hasattr(self.embedding, 'tolist') else self.embedding,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
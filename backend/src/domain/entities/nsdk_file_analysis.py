@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ...database import Base
 
@@ -33,6 +33,10 @@ class NSDKFileAnalysis:
 class NSDKFileAnalysisModel(Base):
     """Modelo SQLAlchemy para NSDKFileAnalysis"""
     __tablename__ = 'nsdk_file_analyses'
+    __table_args__ = (
+        # Cubre la consulta agrupada de get_statistics (solo índice)
+        Index('idx_nsdk_file_analyses_repo_status_type', 'repository_name', 'analysis_status', 'file_type'),
+    )
     
     id = Column(String, primary_key=True)
     file_path = Column(String, nullable=False, index=True)
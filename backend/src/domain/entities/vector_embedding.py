@@ -1,22 +1,29 @@
-from sqlalchemy import Column, String, DateTime, JSON, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, JSON, Text, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 import uuid
 
 from ...database_base import Base
+from ...database_types import PackedVector
 
 class VectorEmbedding(Base):
     """Entidad para almacenar embeddings de archivos vectorizados"""
     
     __tablename__ = "vector_embeddings"
+    __table_args__ = (
+        # Un embedding por archivo y configuración (clave de los upserts en bloque)
+        Index('uq_vector_embeddings_config_file', 'config_id', 'file_path', unique=True),
+        # Cubre la consulta agrupada de get_stats (solo índice)
+        Index('idx_vector_embeddings_config_type', 'config_id', 'file_type'),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     file_path = Column(String, nullable=False, index=True)
     file_name = Column(String, nullable=False)
     file_type = Column(String, nullable=False)  # 'scr', 'ncl', 'inc', 'prg'
     content_hash = Column(String, nullable=False, index=True)  # Hash del contenido para detectar cambios
-    embedding = Column(JSON, nullable=False)  # Lista de floats del embedding
+    embedding = Column(PackedVector, nullable=False)  # float32 empaquetado, se lee como np.ndarray
     file_metadata = Column(JSON, nullable=True)  # Metadatos extraídos del archivo
     config_id = Column(String, nullable=False, index=True)  # ID de la configuración
     repo_type = Column(String, nullable=False)  # 'source', 'frontend', 'backend'
@@ -42,7 +49,7 @@ class VectorEmbedding(Base):
             'file_name': self.file_name,
             'file_type': self.file_type,
             'content_hash': self.content_hash,
-            'embedding': self.embedding,
+            'embedding': self.embedding.tolist() if hasattr(self.embedding, 'tolist') else self.embedding,
             'file_metadata': self.file_metadata or {},
             'config_id': self.config_id,
             'repo_type': self.repo_type,
@@ -17,6 +17,7 @@ class VectorizationBatchType(Enum):
     MODULE = "module"              # Vectorización de un módulo específico
     FILES = "files"                # Vectorización de archivos específicos
     INCREMENTAL = "incremental"    # Vectorización incremental
+    ANALYSIS = "analysis"          # Análisis IA masivo de pantallas
 
 @dataclass
 class VectorizationBatch:
@@ -38,6 +39,7 @@ class VectorizationBatch:
     completed_at: Optional[datetime] = None
     created_at: datetime = None
     updated_at: datetime = None
+    stage: Optional[str] = None        # Etapa actual: 'queued', 'cloning', 'discovering', 'processing', 'syncing'
     
     def __post_init__(self):
         if self.id is None:
@@ -52,11 +54,15 @@ class VectorizationBatch:
             self.error_files = []
         if self.metadata is None:
             self.metadata = {}
+        # Índices para comprobar pertenencia en O(1) sin recorrer las listas
+        self._file_id_index = set(self.file_ids)
+        self._error_file_index = set(self.error_files)
     
     def start_processing(self):
-        """Inicia el procesamiento del lote"""
+        """Inicia el procesamiento del lote (un lote reanudado conserva su inicio)"""
         self.status = VectorizationBatchStatus.IN_PROGRESS
-        self.started_at = datetime.utcnow()
+        if self.started_at is None:
+            self.started_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
     
     def complete_processing(self):
@@ -73,9 +79,21 @@ class VectorizationBatch:
         if 'error_message' not in self.metadata:
             self.metadata['error_message'] = error_message
     
+    def cancel_processing(self):
+        """Marca el lote como cancelado"""
+        self.status = VectorizationBatchStatus.CANCELLED
+        self.completed_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+    
+    def set_stage(self, stage: str):
+        """Actualiza la etapa actual del lote"""
+        self.stage = stage
+        self.updated_at = datetime.utcnow()
+    
     def add_file(self, file_id: str):
         """Añade un archivo al lote"""
-        if file_id not in self.file_ids:
+        if file_id not in self._file_id_index:
+            self._file_id_index.add(file_id)
             self.file_ids.append(file_id)
             self.total_files += 1
             self.updated_at = datetime.utcnow()
@@ -87,10 +105,16 @@ class VectorizationBatch:
             self.successful_files += 1
         else:
             self.failed_files += 1
-            if file_id not in self.error_files:
+            if file_id not in self._error_file_index:
+                self._error_file_index.add(file_id)
                 self.error_files.append(file_id)
         self.updated_at = datetime.utcnow()
     
+    def mark_file_skipped(self, file_id: str):
+        """Marca un archivo como omitido: cuenta como procesado, sin éxito ni error"""
+        self.processed_files += 1
+        self.updated_at = datetime.utcnow()
+    
     def get_progress_percentage(self) -> float:
         """Calcula el porcentaje de progreso"""
         if self.total_files == 0:
@@ -105,7 +129,8 @@ class VectorizationBatch:
     
     def is_completed(self) -> bool:
         """Verifica si el lote está completado"""
-        return self.status in [VectorizationBatchStatus.COMPLETED, VectorizationBatchStatus.FAILED]
+        return self.status in [VectorizationBatchStatus.COMPLETED, VectorizationBatchStatus.FAILED,
+                               VectorizationBatchStatus.CANCELLED]
     
     def get_duration(self) -> Optional[float]:
         """Obtiene la duración del procesamiento en segundos"""
@@ -113,6 +138,36 @@ class VectorizationBatch:
             return (self.completed_at - self.started_at).total_seconds()
         return None
     
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        Progreso compacto del lote (tamaño constante, sin listas de archivos)
+        
+        Incluye el rendimiento en archivos/s desde el inicio y la estimación del
+        tiempo restante en segundos.
+        """
+        throughput = None
+        eta = None
+        if self.started_at and self.processed_files > 0:
+            end = self.completed_at or datetime.utcnow()
+            elapsed = (end - self.started_at).total_seconds()
+            if elapsed > 0:
+                throughput = self.processed_files / elapsed
+                if not self.is_completed():
+                    eta = max(self.total_files - self.processed_files, 0) / throughput
+        return {
+            'id': self.id,
+            'status': self.status.value,
+            'stage': self.stage,
+            'total_files': self.total_files,
+            'processed_files': self.processed_files,
+            'successful_files': self.successful_files,
+            'failed_files': self.failed_files,
+            'progress_percentage': round(self.get_progress_percentage(), 2),
+            'throughput': round(throughput, 2) if throughput is not None else None,
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
     def get_status_summary(self) -> Dict[str, Any]:
         """Obtiene un resumen del estado del lote"""
         return {
@@ -0,0 +1,58 @@
+from sqlalchemy import Column, String, DateTime, JSON, Integer, Boolean, Text, ForeignKey
+from datetime import datetime
+import uuid
+
+from ...database_base import Base
+
+class VectorizationJob(Base):
+    """
+    Estado persistido de un lote de vectorización ejecutado en segundo plano.
+    
+    Guarda los contadores del VectorizationBatch y los parámetros con los que se
+    lanzó, para poder consultar su estado tras un reinicio y reanudar los trabajos
+    que quedaron a medias.
+    """
+    
+    __tablename__ = "vectorization_jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))  # Mismo ID que el lote
+    name = Column(String, nullable=False)
+    batch_type = Column(String, nullable=False)  # 'repository', 'module'...
+    config_id = Column(String, nullable=False, index=True)
+    repo_type = Column(String, nullable=False)
+    repo_branch = Column(String, nullable=False, default='main')
+    status = Column(String, nullable=False, default='pending', index=True)
+    params = Column(JSON, nullable=True)  # Parámetros de la vectorización (force_update, module_path...)
+    total_files = Column(Integer, default=0)
+    processed_files = Column(Integer, default=0)
+    successful_files = Column(Integer, default=0)
+    failed_files = Column(Integer, default=0)
+    error_files = Column(JSON, nullable=True)
+    job_metadata = Column(JSON, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not self.id:
+            self.id = str(uuid.uuid4())
+        if not self.created_at:
+            self.created_at = datetime.utcnow()
+        if not self.updated_at:
+            self.updated_at = datetime.utcnow()
+
+
+class VectorizationJobFile(Base):
+    """Archivo ya procesado (y confirmado en BD) de un trabajo de vectorización"""
+    
+    __tablename__ = "vectorization_job_files"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String, ForeignKey('vectorization_jobs.id', ondelete='CASCADE'), nullable=False, index=True)
+    file_path = Column(String, nullable=False)
+    success = Column(Boolean, nullable=False)
+    error = Column(Text, nullable=True)
+    processed_at = Column(DateTime, default=datetime.utcnow)
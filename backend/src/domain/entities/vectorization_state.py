@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, DateTime, UniqueConstraint
+from datetime import datetime
+import uuid
+
+from ...database_base import Base
+
+class VectorizationState(Base):
+    """
+    Último commit vectorizado de cada repositorio (configuración, tipo y rama).
+    
+    Permite que la siguiente vectorización procese solo los archivos que cambian
+    entre ese commit y el actual (git diff) en lugar de recorrer todo el repositorio.
+    """
+    
+    __tablename__ = "vectorization_states"
+    __table_args__ = (UniqueConstraint('config_id', 'repo_type', 'repo_branch', name='uq_vectorization_state'),)
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    config_id = Column(String, nullable=False, index=True)
+    repo_type = Column(String, nullable=False)  # 'source', 'frontend', 'backend'
+    repo_branch = Column(String, nullable=False, default='main')
+    last_commit_sha = Column(String(40), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not self.id:
+            self.id = str(uuid.uuid4())
+        if not self.updated_at:
+            self.updated_at = datetime.utcnow()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Optional
 from ..entities import LLMConfig, Analysis, Screen
 
 class LLMService(ABC):
@@ -45,8 +45,14 @@ class LLMService(ABC):
         """Obtiene el embedding de un texto"""
         pass
     
+    @abstractmethod
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Obtiene los embeddings de varios textos, en el mismo orden de entrada"""
+        pass
+    
     @abstractmethod
     async def chat_completion(self, messages: List[Dict[str, str]], 
-                            system_prompt: Optional[str] = None) -> str:
+                            system_prompt: Optional[str] = None,
+                            raise_on_error: bool = False) -> str:
         """Realiza una completación de chat genérica"""
         pass
\ No newline at end of file
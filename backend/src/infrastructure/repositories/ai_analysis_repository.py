@@ -1,5 +1,6 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from ...domain.entities.ai_analysis_result import AIAnalysisResult
 import logging
 
@@ -65,6 +66,16 @@ class AIAnalysisRepository:
             logger.error(f"Error obteniendo resultado de análisis para fichero {file_analysis_id}: {str(e)}")
             return None
     
+    def get_by_cache_key(self, cache_key: str) -> Optional[AIAnalysisResult]:
+        """Obtiene el análisis más reciente con la misma clave de caché"""
+        try:
+            return self.db.query(AIAnalysisResult).filter(
+                AIAnalysisResult.cache_key == cache_key
+            ).order_by(AIAnalysisResult.created_at.desc()).first()
+        except Exception as e:
+            logger.error(f"Error buscando análisis IA en caché: {str(e)}")
+            return None
+    
     def get_all_by_file_analysis_id(self, file_analysis_id: str) -> List[AIAnalysisResult]:
         """Obtiene todos los resultados de análisis para un fichero (historial)"""
         try:
@@ -121,23 +132,29 @@ class AIAnalysisRepository:
             return []
     
     def get_statistics(self) -> dict:
-        """Obtiene estadísticas de los análisis realizados"""
+        """
+        Obtiene estadísticas de los análisis realizados con una sola consulta
+        agrupada por (complexity, file_type); los totales se suman en memoria
+        """
         try:
-            total = self.db.query(AIAnalysisResult).count()
-            by_complexity = self.db.query(
+            rows = self.db.query(
                 AIAnalysisResult.complexity,
-                self.db.func.count(AIAnalysisResult.id)
-            ).group_by(AIAnalysisResult.complexity).all()
-            
-            by_file_type = self.db.query(
                 AIAnalysisResult.file_type,
-                self.db.func.count(AIAnalysisResult.id)
-            ).group_by(AIAnalysisResult.file_type).all()
+                func.count(AIAnalysisResult.id)
+            ).group_by(AIAnalysisResult.complexity, AIAnalysisResult.file_type).all()
+            
+            total = 0
+            by_complexity = {}
+            by_file_type = {}
+            for complexity, file_type, count in rows:
+                total += count
+                by_complexity[complexity] = by_complexity.get(complexity, 0) + count
+                by_file_type[file_type] = by_file_type.get(file_type, 0) + count
             
             return {
                 'total_analyses': total,
-                'by_complexity': dict(by_complexity),
-                'by_file_type': dict(by_file_type)
+                'by_complexity': by_complexity,
+                'by_file_type': by_file_type
             }
         except Exception as e:
             logger.error(f"Error obteniendo estadísticas de análisis: {str(e)}")
@@ -0,0 +1,56 @@
+from typing import List, Dict
+from sqlalchemy.orm import Session
+import logging
+from ...domain.entities.embedding_cache_entry import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCacheRepository:
+    """Repositorio para la caché persistente de embeddings"""
+    
+    # Máximo de claves por consulta IN para no superar límites de parámetros (SQLite: 999)
+    QUERY_CHUNK_SIZE = 500
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_many(self, cache_keys: List[str]) -> Dict[str, List[float]]:
+        """Obtiene los embeddings guardados para las claves indicadas"""
+        found: Dict[str, List[float]] = {}
+        try:
+            for start in range(0, len(cache_keys), self.QUERY_CHUNK_SIZE):
+                chunk = cache_keys[start:start + self.QUERY_CHUNK_SIZE]
+                rows = self.db.query(EmbeddingCacheEntry.cache_key, EmbeddingCacheEntry.embedding).filter(
+                    EmbeddingCacheEntry.cache_key.in_(chunk)
+                ).all()
+                for cache_key, embedding in rows:
+                    found[cache_key] = embedding
+        except Exception as e:
+            logger.error(f"Error leyendo la caché de embeddings: {str(e)}")
+        return found
+    
+    def save_many(self, entries: List[EmbeddingCacheEntry]) -> int:
+        """Guarda las entradas que aún no existen; devuelve cuántas se insertaron"""
+        if not entries:
+            return 0
+        try:
+            # Deduplicar por clave y descartar las ya existentes
+            unique = {entry.cache_key: entry for entry in entries}
+            existing = self.get_many(list(unique.keys()))
+            new_entries = [entry for key, entry in unique.items() if key not in existing]
+            
+            self.db.add_all(new_entries)
+            self.db.commit()
+            return len(new_entries)
+        except Exception as e:
+            logger.error(f"Error guardando en la caché de embeddings: {str(e)}")
+            self.db.rollback()
+            return 0
+    
+    def count(self) -> int:
+        """Número de entradas en la caché persistente"""
+        try:
+            return self.db.query(EmbeddingCacheEntry).count()
+        except Exception as e:
+            logger.error(f"Error contando la caché de embeddings: {str(e)}")
+            return 0
@@ -3,9 +3,11 @@ Repositorio para chunks de documentos NSDK
 """
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, Float
 
+from src.database_types import pgvector_enabled
 from src.domain.entities.nsdk_document_chunk import NSDKDocumentChunk
+from src.infrastructure.services.document_chunk_index import document_chunk_index
 
 
 class NSDKDocumentChunkRepository:
@@ -18,8 +20,18 @@ class NSDKDocumentChunkRepository:
         self.db.add(chunk)
         self.db.commit()
         self.db.refresh(chunk)
+        document_chunk_index.invalidate()
         return chunk
     
+    async def create_many(self, chunks_data: List[Dict]) -> int:
+        """Crea varios chunks en un único INSERT por lotes y un solo commit"""
+        if not chunks_data:
+            return 0
+        self.db.add_all([NSDKDocumentChunk(**chunk_data) for chunk_data in chunks_data])
+        self.db.commit()
+        document_chunk_index.invalidate()
+        return len(chunks_data)
+    
     async def get_by_id(self, chunk_id: str) -> Optional[NSDKDocumentChunk]:
         """Obtiene un chunk por ID"""
         stmt = select(NSDKDocumentChunk).where(NSDKDocumentChunk.id == chunk_id)
@@ -43,8 +55,9 @@ class NSDKDocumentChunkRepository:
     async def update(self, chunk_id: str, update_data: Dict) -> Optional[NSDKDocumentChunk]:
         """Actualiza un chunk"""
         stmt = update(NSDKDocumentChunk).where(NSDKDocumentChunk.id == chunk_id).values(**update_data)
-        self.db_session.execute(stmt)
-        self.db_session.commit()
+        self.db.execute(stmt)
+        self.db.commit()
+        document_chunk_index.invalidate()
         
         return await self.get_by_id(chunk_id)
     
@@ -52,44 +65,67 @@ class NSDKDocumentChunkRepository:
         """Elimina un chunk"""
         stmt = delete(NSDKDocumentChunk).where(NSDKDocumentChunk.id == chunk_id)
         result = self.db.execute(stmt)
-        self.db_session.commit()
+        self.db.commit()
+        document_chunk_index.invalidate()
         return result.rowcount > 0
     
     async def delete_by_document_id(self, document_id: str) -> int:
         """Elimina todos los chunks de un documento"""
         stmt = delete(NSDKDocumentChunk).where(NSDKDocumentChunk.document_id == document_id)
         result = self.db.execute(stmt)
-        self.db_session.commit()
+        self.db.commit()
+        document_chunk_index.invalidate()
         return result.rowcount
     
     async def search_similar_chunks(self, query_embedding: List[float], limit: int = 5, threshold: float = 0.7) -> List[NSDKDocumentChunk]:
-        """Busca chunks similares usando embeddings (implementación básica)"""
-        import json
-        
-        # Nota: Esta es una implementación básica. Para producción, usar pgvector o FAISS
-        all_chunks = await self.get_all()
+        """
+        Busca chunks similares. Con pgvector la búsqueda se hace en el servidor;
+        en otro caso (SQLite) se usa el índice en memoria de embeddings.
+        """
+        if pgvector_enabled(self.db.get_bind().dialect.name):
+            return self._search_similar_chunks_pgvector(query_embedding, limit, threshold)
         
-        # Calcular similitud coseno básica
-        similar_chunks = []
-        for chunk in all_chunks:
-            if chunk.embedding and isinstance(chunk.embedding, list):
-                similarity = self._cosine_similarity(query_embedding, chunk.embedding)
-                if similarity >= threshold:
-                    similar_chunks.append((chunk, similarity))
+        matches = document_chunk_index.search(self.db, query_embedding, limit=limit, threshold=threshold)
+        if not matches:
+            return []
         
-        # Ordenar por similitud y devolver los mejores
-        similar_chunks.sort(key=lambda x: x[1], reverse=True)
-        return [chunk for chunk, _ in similar_chunks[:limit]]
+        # Cargar solo los chunks seleccionados, manteniendo el orden por similitud
+        ids = [chunk_id for chunk_id, _ in matches]
+        stmt = select(NSDKDocumentChunk).where(NSDKDocumentChunk.id.in_(ids))
+        chunks_by_id = {chunk.id: chunk for chunk in self.db.execute(stmt).scalars().all()}
+        return [chunks_by_id[chunk_id] for chunk_id in ids if chunk_id in chunks_by_id]
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calcula similitud coseno entre dos vectores"""
-        import math
+    async def search_similar_chunks_many(self, query_embeddings: List[List[float]], limit: int = 5,
+                                         threshold: float = 0.7) -> List[List[NSDKDocumentChunk]]:
+        """
+        Busca chunks similares para varias consultas. Sin pgvector se hace un único
+        producto de matrices en el índice en memoria y una sola carga de chunks.
+        """
+        if pgvector_enabled(self.db.get_bind().dialect.name):
+            return [self._search_similar_chunks_pgvector(query_embedding, limit, threshold)
+                    for query_embedding in query_embeddings]
         
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = math.sqrt(sum(a * a for a in vec1))
-        magnitude2 = math.sqrt(sum(a * a for a in vec2))
+        all_matches = document_chunk_index.search_many(self.db, query_embeddings, limit=limit, threshold=threshold)
+        ids = {chunk_id for matches in all_matches for chunk_id, _ in matches}
+        if not ids:
+            return [[] for _ in query_embeddings]
         
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0
+        stmt = select(NSDKDocumentChunk).where(NSDKDocumentChunk.id.in_(ids))
+        chunks_by_id = {chunk.id: chunk for chunk in self.db.execute(stmt).scalars().all()}
+        return [
+            [chunks_by_id[chunk_id] for chunk_id, _ in matches if chunk_id in chunks_by_id]
+            for matches in all_matches
+        ]
+    
+    def _search_similar_chunks_pgvector(self, query_embedding: List[float], limit: int, threshold: float) -> List[NSDKDocumentChunk]:
+        """ORDER BY embedding <=> :q LIMIT k usando el índice HNSW/IVFFlat de pgvector"""
+        from src.infrastructure.services.pgvector_support import apply_search_params
+        
+        distance = NSDKDocumentChunk.embedding.op('<=>', return_type=Float)(query_embedding)
+        stmt = select(NSDKDocumentChunk, distance.label('distance')).where(
+            NSDKDocumentChunk.embedding.isnot(None)
+        ).order_by(distance).limit(limit)
         
-        return dot_product / (magnitude1 * magnitude2)
+        apply_search_params(self.db)
+        rows = self.db.execute(stmt).all()
+        return [chunk for chunk, chunk_distance in rows if 1 - chunk_distance >= threshold]
@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 import uuid
 from datetime import datetime
 from ...domain.entities.nsdk_file_analysis import NSDKFileAnalysis, NSDKFileAnalysisModel
@@ -294,43 +294,33 @@ class NSDKFileAnalysisRepository:
             raise
     
     def get_statistics(self, repository_name: str) -> Dict[str, Any]:
-        """Obtiene estadísticas del repositorio"""
+        """
+        Obtiene estadísticas del repositorio con una sola consulta agrupada por
+        (analysis_status, file_type); los totales se suman en memoria
+        """
         try:
-            total_files = self.db.query(NSDKFileAnalysisModel).filter(
+            rows = self.db.query(
+                NSDKFileAnalysisModel.analysis_status,
+                NSDKFileAnalysisModel.file_type,
+                func.count(NSDKFileAnalysisModel.id)
+            ).filter(
                 NSDKFileAnalysisModel.repository_name == repository_name
-            ).count()
-            
-            analyzed_files = self.db.query(NSDKFileAnalysisModel).filter(
-                and_(
-                    NSDKFileAnalysisModel.repository_name == repository_name,
-                    NSDKFileAnalysisModel.analysis_status == 'analyzed'
-                )
-            ).count()
-            
-            pending_files = self.db.query(NSDKFileAnalysisModel).filter(
-                and_(
-                    NSDKFileAnalysisModel.repository_name == repository_name,
-                    NSDKFileAnalysisModel.analysis_status == 'pending'
-                )
-            ).count()
+            ).group_by(
+                NSDKFileAnalysisModel.analysis_status, NSDKFileAnalysisModel.file_type
+            ).all()
             
-            error_files = self.db.query(NSDKFileAnalysisModel).filter(
-                and_(
-                    NSDKFileAnalysisModel.repository_name == repository_name,
-                    NSDKFileAnalysisModel.analysis_status == 'error'
-                )
-            ).count()
-            
-            # Estadísticas por tipo
-            type_stats = {}
-            for file_type in ['module', 'screen', 'include', 'program']:
-                count = self.db.query(NSDKFileAnalysisModel).filter(
-                    and_(
-                        NSDKFileAnalysisModel.repository_name == repository_name,
-                        NSDKFileAnalysisModel.file_type == file_type
-                    )
-                ).count()
-                type_stats[file_type] = count
+            total_files = 0
+            status_stats = {}
+            type_stats = {file_type: 0 for file_type in ['module', 'screen', 'include', 'program']}
+            for status, file_type, count in rows:
+                total_files += count
+                status_stats[status] = status_stats.get(status, 0) + count
+                if file_type in type_stats:
+                    type_stats[file_type] += count
+            
+            analyzed_files = status_stats.get('analyzed', 0)
+            pending_files = status_stats.get('pending', 0)
+            error_files = status_stats.get('error', 0)
             
             return {
                 'total_files': total_files,
@@ -1,6 +1,6 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, Float, insert, update
 import logging
 from ...domain.entities.vector_embedding import VectorEmbedding
 import hashlib
@@ -10,6 +10,10 @@ logger = logging.getLogger(__name__)
 class VectorEmbeddingRepository:
     """Repositorio para operaciones de embeddings vectorizados"""
     
+    # Columnas que se sobrescriben cuando el archivo ya tiene embedding (config_id, file_path)
+    UPSERT_COLUMNS = ('file_name', 'file_type', 'content_hash', 'embedding', 'file_metadata',
+                      'repo_type', 'repo_branch', 'vectorization_batch_id', 'updated_at')
+    
     def __init__(self, db: Session):
         self.db = db
     
@@ -40,6 +44,99 @@ class VectorEmbeddingRepository:
             logger.error(f"Error obteniendo embedding por file_path: {str(e)}")
             return None
     
+    def get_existing_by_file_paths(self, config_id: str, file_paths: List[str],
+                                   chunk_size: int = 500) -> Dict[str, Any]:
+        """
+        Obtiene (id, file_path, content_hash, file_metadata) de los embeddings ya
+        guardados para los archivos indicados, en consultas IN por bloques y sin
+        cargar los vectores.
+        
+        Returns:
+            Dict {file_path: fila}
+        """
+        try:
+            existing = {}
+            for start in range(0, len(file_paths), chunk_size):
+                chunk = file_paths[start:start + chunk_size]
+                rows = self.db.query(
+                    VectorEmbedding.id, VectorEmbedding.file_path,
+                    VectorEmbedding.content_hash, VectorEmbedding.file_metadata
+                ).filter(
+                    and_(
+                        VectorEmbedding.config_id == config_id,
+                        VectorEmbedding.file_path.in_(chunk)
+                    )
+                ).all()
+                existing.update((row.file_path, row) for row in rows)
+            return existing
+        except Exception as e:
+            logger.error(f"Error obteniendo embeddings por rutas: {str(e)}")
+            return {}
+    
+    def upsert_many(self, rows: List[Dict[str, Any]], chunk_size: int = 500) -> int:
+        """
+        Inserta o actualiza embeddings por (config_id, file_path) en sentencias por
+        lotes con un commit por bloque: INSERT ... ON CONFLICT DO UPDATE en
+        PostgreSQL y SQLite (executemany), e INSERT/UPDATE por lotes en el resto.
+        
+        Args:
+            rows: Diccionarios con las columnas de VectorEmbedding
+            
+        Returns:
+            Número de filas escritas
+        """
+        if not rows:
+            return 0
+        dialect = self.db.get_bind().dialect.name
+        written = 0
+        try:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                if dialect in ('postgresql', 'sqlite'):
+                    self._upsert_on_conflict(chunk, dialect)
+                else:
+                    self._upsert_by_lookup(chunk)
+                self.db.commit()
+                written += len(chunk)
+            logger.info(f"[OK] {written} embeddings guardados en bloque")
+            return written
+        except Exception as e:
+            logger.error(f"Error guardando embeddings en bloque: {str(e)}")
+            self.db.rollback()
+            raise
+    
+    def _upsert_on_conflict(self, chunk: List[Dict[str, Any]], dialect: str):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(VectorEmbedding)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['config_id', 'file_path'],
+            set_={column: stmt.excluded[column] for column in self.UPSERT_COLUMNS}
+        )
+        self.db.execute(stmt, chunk)
+    
+    def _upsert_by_lookup(self, chunk: List[Dict[str, Any]]):
+        """Alternativa sin ON CONFLICT: una consulta IN por configuración y dos executemany"""
+        existing_ids = {}
+        for config_id in {row['config_id'] for row in chunk}:
+            paths = [row['file_path'] for row in chunk if row['config_id'] == config_id]
+            for file_path, row in self.get_existing_by_file_paths(config_id, paths).items():
+                existing_ids[(config_id, file_path)] = row.id
+        
+        updates, inserts = [], []
+        for row in chunk:
+            row_id = existing_ids.get((row['config_id'], row['file_path']))
+            if row_id:
+                updates.append({'id': row_id, **{column: row[column] for column in self.UPSERT_COLUMNS if column in row}})
+            else:
+                inserts.append(row)
+        if updates:
+            self.db.execute(update(VectorEmbedding), updates)
+        if inserts:
+            self.db.execute(insert(VectorEmbedding), inserts)
+    
     def get_by_content_hash(self, content_hash: str, config_id: str) -> Optional[VectorEmbedding]:
         """Obtiene un embedding por hash del contenido y configuración"""
         try:
@@ -95,6 +192,26 @@ class VectorEmbeddingRepository:
             self.db.rollback()
             return False
     
+    def delete_by_file_paths(self, config_id: str, file_paths: List[str], chunk_size: int = 500) -> int:
+        """Elimina los embeddings de los archivos indicados; devuelve cuántos se eliminaron"""
+        try:
+            count = 0
+            for start in range(0, len(file_paths), chunk_size):
+                chunk = file_paths[start:start + chunk_size]
+                count += self.db.query(VectorEmbedding).filter(
+                    and_(
+                        VectorEmbedding.config_id == config_id,
+                        VectorEmbedding.file_path.in_(chunk)
+                    )
+                ).delete(synchronize_session=False)
+            self.db.commit()
+            logger.info(f"Eliminados {count} embeddings de archivos borrados para config_id: {config_id}")
+            return count
+        except Exception as e:
+            logger.error(f"Error eliminando embeddings por ruta: {str(e)}")
+            self.db.rollback()
+            return 0
+    
     def delete_by_config_and_repo(self, config_id: str, repo_type: str, branch: str = 'main') -> bool:
         """Elimina embeddings de una configuración y repositorio específicos"""
         try:
@@ -122,28 +239,95 @@ class VectorEmbeddingRepository:
             logger.error(f"Error obteniendo todos los embeddings: {str(e)}")
             return []
     
+    def get_sync_state(self, config_id: str = None) -> List[Any]:
+        """
+        Obtiene solo (id, content_hash, updated_at) de los embeddings, sin cargar los
+        vectores. Permite calcular qué ha cambiado respecto al índice vectorial.
+        """
+        try:
+            query = self.db.query(VectorEmbedding.id, VectorEmbedding.content_hash, VectorEmbedding.updated_at)
+            if config_id:
+                query = query.filter(VectorEmbedding.config_id == config_id)
+            return query.all()
+        except Exception as e:
+            logger.error(f"Error obteniendo estado de sincronización: {str(e)}")
+            return []
+    
+    def get_by_ids(self, ids: List[str], chunk_size: int = 500) -> List[VectorEmbedding]:
+        """Obtiene embeddings por ID en consultas IN por bloques"""
+        try:
+            results = []
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                results.extend(self.db.query(VectorEmbedding).filter(VectorEmbedding.id.in_(chunk)).all())
+            return results
+        except Exception as e:
+            logger.error(f"Error obteniendo embeddings por ID: {str(e)}")
+            return []
+    
+    def search_similar(self, query_embedding: List[float], limit: int = 10, threshold: float = 0.0,
+                       config_id: str = None) -> List[Tuple[VectorEmbedding, float]]:
+        """
+        Búsqueda por similitud coseno en el servidor con pgvector
+        (ORDER BY embedding <=> :q LIMIT k).
+        
+        Returns:
+            Lista de (embedding, similitud) ordenada de mayor a menor similitud
+        """
+        from ..services.pgvector_support import apply_search_params
+        try:
+            distance = VectorEmbedding.embedding.op('<=>', return_type=Float)(query_embedding)
+            query = self.db.query(VectorEmbedding, distance.label('distance'))
+            if config_id:
+                query = query.filter(VectorEmbedding.config_id == config_id)
+            apply_search_params(self.db)
+            rows = query.order_by(distance).limit(limit).all()
+            return [(embedding, 1 - row_distance) for embedding, row_distance in rows if 1 - row_distance >= threshold]
+        except Exception as e:
+            logger.error(f"Error en búsqueda pgvector de embeddings: {str(e)}")
+            self.db.rollback()
+            return []
+    
+    def get_watermark(self, config_id: str = None, repo_type: str = None, branch: str = None) -> Dict[str, Any]:
+        """
+        Obtiene una marca de versión de los embeddings (número de filas y última
+        actualización) con una sola consulta. Sirve para saber si un índice
+        persistido sigue al día respecto a la BD.
+        """
+        try:
+            query = self.db.query(func.count(VectorEmbedding.id), func.max(VectorEmbedding.updated_at))
+            if config_id:
+                query = query.filter(VectorEmbedding.config_id == config_id)
+            if repo_type:
+                query = query.filter(VectorEmbedding.repo_type == repo_type)
+            if branch:
+                query = query.filter(VectorEmbedding.repo_branch == branch)
+            row_count, max_updated_at = query.one()
+            return {
+                'row_count': row_count or 0,
+                'max_updated_at': max_updated_at.isoformat() if max_updated_at else None
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo watermark de embeddings: {str(e)}")
+            return {}
+    
     def get_stats(self) -> Dict[str, Any]:
-        """Obtiene estadísticas de embeddings"""
+        """
+        Obtiene estadísticas de embeddings con una sola consulta agrupada por
+        (config_id, file_type); los totales por dimensión se suman en memoria
+        """
         try:
-            total = self.db.query(VectorEmbedding).count()
+            rows = self.db.query(
+                VectorEmbedding.config_id, VectorEmbedding.file_type, func.count(VectorEmbedding.id)
+            ).group_by(VectorEmbedding.config_id, VectorEmbedding.file_type).all()
             
-            # Estadísticas por tipo de archivo
-            file_types = self.db.query(VectorEmbedding.file_type).distinct().all()
+            total = 0
             file_type_stats = {}
-            for file_type in file_types:
-                count = self.db.query(VectorEmbedding).filter(
-                    VectorEmbedding.file_type == file_type[0]
-                ).count()
-                file_type_stats[file_type[0]] = count
-            
-            # Estadísticas por configuración
-            configs = self.db.query(VectorEmbedding.config_id).distinct().all()
             config_stats = {}
-            for config_id in configs:
-                count = self.db.query(VectorEmbedding).filter(
-                    VectorEmbedding.config_id == config_id[0]
-                ).count()
-                config_stats[config_id[0]] = count
+            for config_id, file_type, count in rows:
+                total += count
+                file_type_stats[file_type] = file_type_stats.get(file_type, 0) + count
+                config_stats[config_id] = config_stats.get(config_id, 0) + count
             
             return {
                 'total_embeddings': total,
@@ -0,0 +1,150 @@
+from typing import List, Dict, Any, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+import logging
+from ...domain.entities.vectorization_job import VectorizationJob, VectorizationJobFile
+from ...domain.entities.vectorization_batch import VectorizationBatch, VectorizationBatchStatus, VectorizationBatchType
+
+logger = logging.getLogger(__name__)
+
+class VectorizationJobRepository:
+    """Repositorio del estado persistido de los trabajos de vectorización"""
+
+    # Estados de trabajos que no terminaron y pueden reanudarse
+    RESUMABLE_STATUSES = (VectorizationBatchStatus.PENDING.value, VectorizationBatchStatus.IN_PROGRESS.value)
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, job_id: str) -> Optional[VectorizationJob]:
+        """Obtiene un trabajo por ID (el mismo que el del lote)"""
+        try:
+            return self.db.query(VectorizationJob).filter(VectorizationJob.id == job_id).first()
+        except Exception as e:
+            logger.error(f"Error obteniendo trabajo de vectorización: {str(e)}")
+            return None
+
+    def save_batch(self, batch: VectorizationBatch, params: Dict[str, Any] = None) -> bool:
+        """Crea o actualiza el trabajo con el estado actual del lote"""
+        try:
+            job = self.get(batch.id)
+            if job is None:
+                job = VectorizationJob(id=batch.id, params=params or {}, cancel_requested=False)
+                self.db.add(job)
+            elif params is not None:
+                job.params = params
+
+            job.name = batch.name
+            job.batch_type = batch.batch_type.value
+            job.config_id = str(batch.config_id)
+            job.repo_type = batch.repo_type
+            job.repo_branch = batch.source_repo_branch
+            job.status = batch.status.value
+            job.total_files = batch.total_files
+            job.processed_files = batch.processed_files
+            job.successful_files = batch.successful_files
+            job.failed_files = batch.failed_files
+            job.error_files = list(batch.error_files)
+            job.job_metadata = dict(batch.metadata)
+            job.started_at = batch.started_at
+            job.completed_at = batch.completed_at
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error guardando trabajo de vectorización: {str(e)}")
+            self.db.rollback()
+            return False
+
+    def add_file_results(self, job_id: str, results: List[Tuple[str, bool, Optional[str]]]) -> bool:
+        """Registra los archivos ya procesados: (ruta, éxito, error)"""
+        if not results:
+            return True
+        try:
+            self.db.add_all([
+                VectorizationJobFile(job_id=job_id, file_path=file_path, success=success, error=error)
+                for file_path, success, error in results
+            ])
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error registrando progreso de archivos: {str(e)}")
+            self.db.rollback()
+            return False
+
+    def get_processed_files(self, job_id: str) -> Set[str]:
+        """Rutas ya procesadas del trabajo (para reanudarlo)"""
+        try:
+            rows = self.db.query(VectorizationJobFile.file_path).filter(VectorizationJobFile.job_id == job_id).all()
+            return {file_path for (file_path,) in rows}
+        except Exception as e:
+            logger.error(f"Error obteniendo archivos procesados: {str(e)}")
+            return set()
+
+    def clear_file_results(self, job_id: str) -> bool:
+        """Elimina el progreso por archivo de un trabajo terminado"""
+        try:
+            self.db.query(VectorizationJobFile).filter(
+                VectorizationJobFile.job_id == job_id
+            ).delete(synchronize_session=False)
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error limpiando progreso de archivos: {str(e)}")
+            self.db.rollback()
+            return False
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Marca la cancelación solicitada; el worker la comprueba entre etapas"""
+        try:
+            job = self.get(job_id)
+            if job is None or job.status not in self.RESUMABLE_STATUSES:
+                return False
+            job.cancel_requested = True
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error solicitando cancelación: {str(e)}")
+            self.db.rollback()
+            return False
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        try:
+            return bool(self.db.query(VectorizationJob.cancel_requested).filter(
+                VectorizationJob.id == job_id
+            ).scalar())
+        except Exception as e:
+            logger.error(f"Error consultando cancelación: {str(e)}")
+            return False
+
+    def get_resumable(self) -> List[VectorizationJob]:
+        """Trabajos pendientes o en curso (p. ej. interrumpidos por un reinicio)"""
+        try:
+            return self.db.query(VectorizationJob).filter(
+                VectorizationJob.status.in_(self.RESUMABLE_STATUSES)
+            ).order_by(VectorizationJob.created_at).all()
+        except Exception as e:
+            logger.error(f"Error obteniendo trabajos reanudables: {str(e)}")
+            return []
+
+    @staticmethod
+    def to_batch(job: VectorizationJob) -> VectorizationBatch:
+        """Reconstruye el VectorizationBatch a partir del trabajo persistido"""
+        return VectorizationBatch(
+            id=job.id,
+            name=job.name,
+            batch_type=VectorizationBatchType(job.batch_type),
+            config_id=UUID(job.config_id),
+            repo_type=job.repo_type,
+            source_repo_branch=job.repo_branch,
+            status=VectorizationBatchStatus(job.status),
+            total_files=job.total_files or 0,
+            processed_files=job.processed_files or 0,
+            successful_files=job.successful_files or 0,
+            failed_files=job.failed_files or 0,
+            error_files=list(job.error_files or []),
+            metadata=dict(job.job_metadata or {}),
+            started_at=job.started_at,
+            completed_at=job.completed_at,
+            created_at=job.created_at,
+            updated_at=job.updated_at
+        )
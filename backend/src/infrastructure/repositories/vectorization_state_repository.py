@@ -0,0 +1,67 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+import logging
+from ...domain.entities.vectorization_state import VectorizationState
+
+logger = logging.getLogger(__name__)
+
+class VectorizationStateRepository:
+    """Repositorio del último commit vectorizado por repositorio"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get(self, config_id: str, repo_type: str, branch: str = 'main') -> Optional[VectorizationState]:
+        """Obtiene el estado de vectorización de un repositorio"""
+        try:
+            return self.db.query(VectorizationState).filter(
+                and_(
+                    VectorizationState.config_id == config_id,
+                    VectorizationState.repo_type == repo_type,
+                    VectorizationState.repo_branch == branch
+                )
+            ).first()
+        except Exception as e:
+            logger.error(f"Error obteniendo estado de vectorización: {str(e)}")
+            return None
+    
+    def get_last_commit(self, config_id: str, repo_type: str, branch: str = 'main') -> Optional[str]:
+        """SHA del último commit vectorizado, o None si nunca se vectorizó"""
+        state = self.get(config_id, repo_type, branch)
+        return state.last_commit_sha if state else None
+    
+    def save_last_commit(self, config_id: str, repo_type: str, branch: str, commit_sha: str) -> bool:
+        """Guarda (o actualiza) el último commit vectorizado"""
+        try:
+            state = self.get(config_id, repo_type, branch)
+            if state:
+                state.last_commit_sha = commit_sha
+            else:
+                state = VectorizationState(
+                    config_id=config_id,
+                    repo_type=repo_type,
+                    repo_branch=branch,
+                    last_commit_sha=commit_sha
+                )
+                self.db.add(state)
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error guardando estado de vectorización: {str(e)}")
+            self.db.rollback()
+            return False
+    
+    def delete(self, config_id: str, repo_type: str = None) -> bool:
+        """Elimina el estado para forzar una vectorización completa la próxima vez"""
+        try:
+            query = self.db.query(VectorizationState).filter(VectorizationState.config_id == config_id)
+            if repo_type:
+                query = query.filter(VectorizationState.repo_type == repo_type)
+            query.delete(synchronize_session=False)
+            self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error eliminando estado de vectorización: {str(e)}")
+            self.db.rollback()
+            return False
@@ -0,0 +1,95 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Estados tras los que el lote ya no emite más progreso
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
+class BatchProgressBroker:
+    """
+    Difunde el progreso de los lotes (vectorización, análisis...) a los clientes
+    suscritos por Server-Sent Events.
+
+    Cada suscriptor tiene una cola acotada; si un cliente lento la llena se
+    descarta el evento más antiguo, ya que cada evento es una instantánea completa
+    del progreso y basta con el último. Publicar no bloquea, así que puede
+    llamarse desde el pipeline tras cada grupo de archivos.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, heartbeat: Optional[float] = None):
+        self.queue_size = queue_size or int(os.getenv('PROGRESS_STREAM_QUEUE_SIZE', 32))
+        self.heartbeat = heartbeat if heartbeat is not None else float(os.getenv('PROGRESS_STREAM_HEARTBEAT', 15))
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, batch_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(batch_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, batch_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(batch_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[batch_id]
+
+    def publish(self, batch_id: str, event: Dict[str, Any]):
+        """Envía el evento a los suscriptores del lote (sin esperar)"""
+        for queue in self._subscribers.get(batch_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def publish_batch(self, batch):
+        """Publica la instantánea compacta de un lote con get_progress()"""
+        if batch.id in self._subscribers:
+            self.publish(batch.id, batch.get_progress())
+
+    @staticmethod
+    def format_event(event: Dict[str, Any], event_type: str = 'progress') -> str:
+        return f"event: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    async def stream(self, batch_id: str, get_snapshot: Callable[[], Optional[Dict[str, Any]]],
+                     is_disconnected: Optional[Callable] = None) -> AsyncIterator[str]:
+        """
+        Genera los eventos SSE de un lote: la instantánea actual y después cada
+        actualización, hasta que el lote termina o el cliente se desconecta.
+
+        La instantánea se toma con get_snapshot() después de suscribirse, para que
+        un lote que termina entre la petición y la suscripción no deje el stream
+        esperando un evento final que ya se publicó.
+        """
+        queue = self.subscribe(batch_id)
+        try:
+            snapshot = get_snapshot()
+            if not snapshot:
+                return
+            yield self.format_event(snapshot)
+            if snapshot.get('status') in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    # asyncio.timeout no pierde un evento que llega justo al vencer la espera
+                    async with asyncio.timeout(self.heartbeat):
+                        event = await queue.get()
+                except TimeoutError:
+                    if is_disconnected and await is_disconnected():
+                        break
+                    # Comentario SSE para mantener viva la conexión a través de proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield self.format_event(event)
+                if event.get('status') in TERMINAL_STATUSES:
+                    break
+        finally:
+            self.unsubscribe(batch_id, queue)
+
+
+# Instancia compartida por los servicios de lotes y los endpoints del proceso
+batch_progress_broker = BatchProgressBroker()
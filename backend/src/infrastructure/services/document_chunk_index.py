@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentChunkIndex:
+    """
+    Índice en memoria de los embeddings de los chunks de documentación NSDK.
+
+    Guarda una matriz float32 con los embeddings normalizados, de modo que una
+    búsqueda es un único producto matriz-vector más argpartition. Se construye la
+    primera vez que se consulta y se invalida cuando el repositorio de chunks
+    modifica datos; además, cada CHUNK_INDEX_CHECK_INTERVAL segundos se compara
+    (número de chunks, último created_at) con la BD para detectar cambios hechos
+    desde otro proceso.
+    """
+
+    def __init__(self, check_interval: Optional[float] = None):
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv('CHUNK_INDEX_CHECK_INTERVAL', 30)
+        )
+        self._lock = threading.Lock()
+        self._ids: List = []
+        self._matrix: Optional[np.ndarray] = None
+        self._watermark: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """Descarta el índice; se reconstruirá en la siguiente búsqueda"""
+        with self._lock:
+            self._matrix = None
+            self._ids = []
+            self._watermark = None
+
+    @staticmethod
+    def _get_watermark(db) -> Tuple:
+        from ...domain.entities.nsdk_document_chunk import NSDKDocumentChunk
+        return tuple(db.execute(
+            select(func.count(NSDKDocumentChunk.id), func.max(NSDKDocumentChunk.created_at))
+        ).one())
+
+    def _build(self, db, watermark: Tuple):
+        """Carga solo (id, embedding) de los chunks y construye la matriz normalizada"""
+        from ...domain.entities.nsdk_document_chunk import NSDKDocumentChunk
+
+        rows = db.execute(
+            select(NSDKDocumentChunk.id, NSDKDocumentChunk.embedding).where(
+                NSDKDocumentChunk.embedding.isnot(None)
+            )
+        ).all()
+
+        ids, vectors = [], []
+        dimension = None
+        for chunk_id, embedding in rows:
+            if embedding is None or len(embedding) == 0:
+                continue
+            if dimension is None:
+                dimension = len(embedding)
+            elif len(embedding) != dimension:
+                logger.warning(f"Chunk {chunk_id} con dimensión {len(embedding)} != {dimension}, se ignora")
+                continue
+            ids.append(chunk_id)
+            vectors.append(embedding)
+
+        if vectors:
+            matrix = np.vstack(vectors).astype(np.float32, copy=False)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        self._ids = ids
+        self._matrix = matrix
+        self._watermark = watermark
+        logger.info(f"[OK] Índice de chunks de documentación construido: {len(ids)} chunks")
+
+    def _ensure_fresh(self, db):
+        now = time.monotonic()
+        if self._matrix is not None and now - self._checked_at < self.check_interval:
+            return
+        watermark = self._get_watermark(db)
+        self._checked_at = now
+        if self._matrix is None or watermark != self._watermark:
+            self._build(db, watermark)
+
+    def search(self, db, query_embedding, limit: int = 5, threshold: float = 0.7) -> List[Tuple[object, float]]:
+        """
+        Devuelve los chunks más similares a la consulta.
+
+        Returns:
+            Lista de (id del chunk, similitud coseno) ordenada de mayor a menor
+        """
+        with self._lock:
+            self._ensure_fresh(db)
+            matrix, ids = self._matrix, self._ids
+
+        if matrix is None or len(ids) == 0 or limit <= 0:
+            return []
+
+        return self._top_matches(ids, matrix, [query_embedding], limit, threshold)[0]
+
+    def search_many(self, db, query_embeddings, limit: int = 5,
+                    threshold: float = 0.7) -> List[List[Tuple[object, float]]]:
+        """
+        Igual que search para varias consultas: un único producto matriz-matriz.
+
+        Returns:
+            Una lista de (id del chunk, similitud coseno) por consulta, en el mismo orden
+        """
+        with self._lock:
+            self._ensure_fresh(db)
+            matrix, ids = self._matrix, self._ids
+
+        if matrix is None or len(ids) == 0 or limit <= 0 or len(query_embeddings) == 0:
+            return [[] for _ in query_embeddings]
+        return self._top_matches(ids, matrix, query_embeddings, limit, threshold)
+
+    @staticmethod
+    def _top_matches(ids: List, matrix: np.ndarray, query_embeddings, limit: int,
+                     threshold: float) -> List[List[Tuple[object, float]]]:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != matrix.shape[1]:
+            logger.warning(f"Dimensión de la consulta ({queries.shape[-1]}) distinta de la de los chunks ({matrix.shape[1]})")
+            return [[] for _ in range(len(queries))]
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        valid = query_norms[:, 0] > 0
+        query_norms[~valid] = 1.0
+
+        all_scores = (queries / query_norms) @ matrix.T
+        k = min(limit, matrix.shape[0])
+        results = []
+        for scores, is_valid in zip(all_scores, valid):
+            if not is_valid:
+                results.append([])
+                continue
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(ids[i], float(scores[i])) for i in top if scores[i] >= threshold])
+        return results
+
+
+# Instancia compartida por todos los repositorios de chunks del proceso
+document_chunk_index = DocumentChunkIndex()
@@ -0,0 +1,138 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    Caché de embeddings direccionada por contenido, con dos niveles:
+
+    - Memoria: LRU en proceso con un número máximo de entradas.
+    - Persistente: tabla embedding_cache en la base de datos.
+
+    La clave es (hash del texto, proveedor, modelo, dimensión), de modo que el mismo
+    texto se reutiliza entre configuraciones, ramas, rutas y documentos NSDK.
+    """
+
+    def __init__(self, max_memory_entries: Optional[int] = None, persistent: Optional[bool] = None,
+                 session_factory=None):
+        self.max_memory_entries = max_memory_entries or int(os.getenv('EMBEDDING_CACHE_SIZE', 20000))
+        if persistent is None:
+            persistent = os.getenv('EMBEDDING_CACHE_PERSIST', 'true').lower() == 'true'
+        self.persistent = persistent
+        self._session_factory = session_factory
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def make_key(text: str, provider: str, model: str, dimension: int) -> Tuple[str, str]:
+        """Devuelve (clave de caché, hash del texto)"""
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        cache_key = hashlib.sha256(f"{text_hash}|{provider}|{model}|{dimension}".encode('utf-8')).hexdigest()
+        return cache_key, text_hash
+
+    def _get_session(self):
+        if self._session_factory is None:
+            from ...database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _remember(self, cache_key: str, embedding: List[float]):
+        """Guarda en el nivel de memoria respetando el tamaño máximo (LRU)"""
+        with self._lock:
+            self._memory[cache_key] = embedding
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, texts: List[str], provider: str, model: str, dimension: int) -> Dict[int, List[float]]:
+        """
+        Busca los embeddings de los textos en la caché.
+
+        Returns:
+            Diccionario índice del texto -> embedding, solo para los textos encontrados
+        """
+        found: Dict[int, List[float]] = {}
+        pending: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                cache_key, _ = self.make_key(text, provider, model, dimension)
+                embedding = self._memory.get(cache_key)
+                if embedding is not None:
+                    self._memory.move_to_end(cache_key)
+                    found[i] = embedding
+                    self.stats['memory_hits'] += 1
+                else:
+                    pending.setdefault(cache_key, []).append(i)
+
+        if pending and self.persistent:
+            db = None
+            try:
+                from ..repositories.embedding_cache_repository import EmbeddingCacheRepository
+                db = self._get_session()
+                stored = EmbeddingCacheRepository(db).get_many(list(pending.keys()))
+                for cache_key, embedding in stored.items():
+                    self._remember(cache_key, embedding)
+                    for i in pending.pop(cache_key):
+                        found[i] = embedding
+                        self.stats['db_hits'] += 1
+            except Exception as e:
+                logger.warning(f"Caché de embeddings persistente no disponible: {str(e)}")
+            finally:
+                if db is not None:
+                    db.close()
+
+        self.stats['misses'] += sum(len(indices) for indices in pending.values())
+        return found
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]], provider: str, model: str, dimension: int):
+        """Guarda embeddings recién calculados en ambos niveles de la caché"""
+        entries = []
+        for text, embedding in zip(texts, embeddings):
+            cache_key, text_hash = self.make_key(text, provider, model, dimension)
+            self._remember(cache_key, embedding)
+            entries.append((cache_key, text_hash, embedding))
+
+        if not entries or not self.persistent:
+            return
+
+        db = None
+        try:
+            from ...domain.entities.embedding_cache_entry import EmbeddingCacheEntry
+            from ..repositories.embedding_cache_repository import EmbeddingCacheRepository
+            db = self._get_session()
+            EmbeddingCacheRepository(db).save_many([
+                EmbeddingCacheEntry(
+                    cache_key=cache_key,
+                    text_hash=text_hash,
+                    provider=provider,
+                    model=model,
+                    dimension=dimension,
+                    embedding=embedding
+                )
+                for cache_key, text_hash, embedding in entries
+            ])
+        except Exception as e:
+            logger.warning(f"No se pudo persistir la caché de embeddings: {str(e)}")
+        finally:
+            if db is not None:
+                db.close()
+
+    def clear_memory(self):
+        """Vacía el nivel de memoria"""
+        with self._lock:
+            self._memory.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Estadísticas de aciertos y tamaño de la caché en memoria"""
+        return {**self.stats, 'memory_entries': len(self._memory)}
+
+
+# Instancia compartida por todos los LLMServiceImpl del proceso
+embedding_cache = EmbeddingCache()
@@ -3,100 +3,197 @@ from typing import List, Dict, Any, Optional
 from ...domain.entities.vector_embedding import VectorEmbedding
 from ...infrastructure.repositories.vector_embedding_repository import VectorEmbeddingRepository
 from .vector_store_service_impl import VectorStoreServiceImpl
+from ...database_types import pgvector_enabled
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingSyncService:
     """Servicio para sincronizar embeddings entre BD y Vector Store"""
     
+    COLLECTION_NAME = 'nsdk-embeddings'
+    
     def __init__(self, vector_store_service: VectorStoreServiceImpl):
         self.vector_store_service = vector_store_service
     
     async def sync_embeddings_to_vector_store(self, vector_embedding_repo: VectorEmbeddingRepository, 
-                                            config_id: str = None) -> bool:
-        """Sincroniza embeddings desde BD al Vector Store"""
+                                            config_id: str = None, full_rebuild: bool = False) -> bool:
+        """
+        Sincroniza embeddings desde BD al Vector Store.
+        
+        Si ya hay un índice FAISS cargado se aplica una sincronización incremental:
+        solo se añaden, actualizan o eliminan los vectores cuyo content_hash o
+        updated_at ha cambiado (limitado a config_id si se indica). Se reconstruye
+        el índice completo cuando no existe, cuando cambia la dimensión o cuando el
+        tipo de índice no admite borrados.
+        """
         try:
-            logger.info("Iniciando sincronización de embeddings a Vector Store...")
-            logger.info(f"Config ID: {config_id}")
-            logger.info(f"Vector store service: {self.vector_store_service}")
-            
-            # Obtener embeddings de la BD
-            if config_id:
-                embeddings = vector_embedding_repo.get_by_config_and_repo(config_id, 'source', 'main')
-                logger.info(f"Obtenidos {len(embeddings)} embeddings para config_id: {config_id}")
-            else:
-                embeddings = vector_embedding_repo.get_all()
-                logger.info(f"Obtenidos {len(embeddings)} embeddings totales")
-            
-            if not embeddings:
-                logger.warning("No hay embeddings para sincronizar")
+            if pgvector_enabled():
+                # Con pgvector la búsqueda se hace sobre la propia tabla: no hay copia que sincronizar
+                logger.info("pgvector activo, no es necesario sincronizar un índice FAISS")
                 return True
             
-            # Detectar la dimensión de los embeddings
-            if embeddings:
-                detected_dimension = len(embeddings[0].embedding)
-                logger.info(f"Dimensión detectada en embeddings: {detected_dimension}")
-            else:
-                detected_dimension = 1536  # Dimensión por defecto
-                logger.info(f"Usando dimensión por defecto: {detected_dimension}")
-            
-            # Configuración para FAISS con dimensión detectada
-            config = {
-                'type': 'faiss',
-                'collectionName': 'nsdk-embeddings',
-                'dimension': detected_dimension
-            }
-            
-            # Inicializar colección si no existe
-            logger.info(f"Inicializando colección con config: {config}")
-            init_result = self.vector_store_service.initialize_collection(config)
-            logger.info(f"Resultado de inicialización: {init_result}")
-            if not init_result:
-                logger.error("No se pudo inicializar la colección del Vector Store")
-                return False
-            
-            # Preparar datos para el Vector Store
-            embedding_vectors = []
-            metadata_list = []
-            ids_list = []
+            logger.info("Iniciando sincronización de embeddings a Vector Store...")
+            logger.info(f"Config ID: {config_id}")
             
-            for embedding in embeddings:
-                embedding_vectors.append(embedding.embedding)
-                metadata_list.append({
-                    'file_path': embedding.file_path,
-                    'file_name': embedding.file_name,
-                    'file_type': embedding.file_type,
-                    'content_hash': embedding.content_hash,
-                    'config_id': embedding.config_id,
-                    'repo_type': embedding.repo_type,
-                    'repo_branch': embedding.repo_branch,
-                    'created_at': embedding.created_at.isoformat() if embedding.created_at else None,
-                    'file_metadata': embedding.file_metadata or {}
-                })
-                ids_list.append(embedding.id)
+            # Marca de versión de toda la BD antes de leer (si cambia durante la lectura, el
+            # snapshot quedará obsoleto). Siempre es global: el snapshot guarda el índice completo
+            watermark = vector_embedding_repo.get_watermark()
             
-            # Añadir embeddings al Vector Store
-            success = self.vector_store_service.add_embeddings(
-                config=config,
-                embeddings=embedding_vectors,
-                metadata=metadata_list,
-                ids=ids_list
-            )
+            if not full_rebuild and self.vector_store_service.faiss_index is not None:
+                result = self._sync_delta(vector_embedding_repo, config_id)
+                if result is not None:
+                    # Tras sincronizar una sola configuración el índice puede no reflejar las
+                    # demás, así que no se guarda: el arranque aplicará los cambios pendientes
+                    if result and not config_id:
+                        self.vector_store_service.save_faiss_snapshot(self.COLLECTION_NAME, watermark)
+                    return result
+                logger.info("Sincronización incremental no aplicable, reconstruyendo el índice completo")
             
-            if success:
-                logger.info(f"Sincronización completada: {len(embeddings)} embeddings cargados al Vector Store")
-                return True
-            else:
-                logger.error("Error en la sincronización de embeddings")
-                return False
+            # La reconstrucción siempre es global: el índice refleja toda la BD
+            return self._sync_full(vector_embedding_repo, watermark)
                 
         except Exception as e:
             logger.error(f"Error en sincronización de embeddings: {str(e)}")
             return False
     
+    def _sync_full(self, vector_embedding_repo: VectorEmbeddingRepository, watermark: Dict[str, Any]) -> bool:
+        """Reconstruye el índice FAISS con todos los embeddings de la BD"""
+        embeddings = vector_embedding_repo.get_all()
+        logger.info(f"Obtenidos {len(embeddings)} embeddings totales")
+        
+        if not embeddings:
+            logger.warning("No hay embeddings para sincronizar")
+            return True
+        
+        # Detectar la dimensión de los embeddings
+        detected_dimension = len(embeddings[0].embedding)
+        logger.info(f"Dimensión detectada en embeddings: {detected_dimension}")
+        
+        # Configuración para FAISS con dimensión detectada
+        config = self._faiss_config(detected_dimension)
+        config['expectedSize'] = len(embeddings)  # Para elegir el tipo de índice automáticamente
+        
+        # Inicializar colección (descarta el índice anterior)
+        logger.info(f"Inicializando colección con config: {config}")
+        init_result = self.vector_store_service.initialize_collection(config)
+        logger.info(f"Resultado de inicialización: {init_result}")
+        if not init_result:
+            logger.error("No se pudo inicializar la colección del Vector Store")
+            return False
+        
+        success = self._add_to_vector_store(config, embeddings)
+        if success:
+            logger.info(f"Sincronización completada: {len(embeddings)} embeddings cargados al Vector Store")
+            self.vector_store_service.save_faiss_snapshot(self.COLLECTION_NAME, watermark)
+            return True
+        else:
+            logger.error("Error en la sincronización de embeddings")
+            return False
+    
+    def _sync_delta(self, vector_embedding_repo: VectorEmbeddingRepository, config_id: str = None) -> Optional[bool]:
+        """
+        Aplica al índice FAISS existente solo los cambios de la BD.
+        
+        Returns:
+            True/False según el resultado, o None si hace falta reconstruir el índice
+        """
+        indexed = self.vector_store_service.get_faiss_entries()
+        if config_id:
+            indexed = {point_id: meta for point_id, meta in indexed.items() if meta.get('config_id') == config_id}
+        
+        # Estado ligero de la BD: sin cargar los vectores
+        changed_ids = []
+        current_ids = set()
+        for embedding_id, content_hash, updated_at in vector_embedding_repo.get_sync_state(config_id):
+            current_ids.add(embedding_id)
+            meta = indexed.get(embedding_id)
+            if (meta is None or meta.get('content_hash') != content_hash
+                    or meta.get('updated_at') != (updated_at.isoformat() if updated_at else None)):
+                changed_ids.append(embedding_id)
+        removed_ids = [point_id for point_id in indexed if point_id not in current_ids]
+        
+        logger.info(
+            f"Sincronización incremental: {len(changed_ids)} nuevos/modificados, "
+            f"{len(removed_ids)} eliminados, {len(current_ids) - len(changed_ids)} sin cambios"
+        )
+        if not changed_ids and not removed_ids:
+            return True
+        
+        config = self._faiss_config(self.vector_store_service.faiss_index.d)
+        
+        if removed_ids and not self.vector_store_service.remove_embeddings(config, removed_ids):
+            return None
+        
+        if changed_ids:
+            embeddings = vector_embedding_repo.get_by_ids(changed_ids)
+            if any(len(embedding.embedding) != config['dimension'] for embedding in embeddings):
+                logger.info("La dimensión de los embeddings ha cambiado")
+                return None
+            if not self._add_to_vector_store(config, embeddings):
+                # Un fallo al sustituir vectores deja el índice a medias
+                return None
+        
+        logger.info("[OK] Sincronización incremental completada")
+        return True
+    
+    def _faiss_config(self, dimension: int) -> Dict[str, Any]:
+        return {
+            'type': 'faiss',
+            'collectionName': self.COLLECTION_NAME,
+            'dimension': dimension
+        }
+    
+    def _add_to_vector_store(self, config: Dict[str, Any], embeddings: List[VectorEmbedding]) -> bool:
+        """Añade (o sustituye) embeddings de la BD en el Vector Store"""
+        embedding_vectors = []
+        metadata_list = []
+        ids_list = []
+        
+        for embedding in embeddings:
+            embedding_vectors.append(embedding.embedding)
+            metadata_list.append({
+                'file_path': embedding.file_path,
+                'file_name': embedding.file_name,
+                'file_type': embedding.file_type,
+                'content_hash': embedding.content_hash,
+                'config_id': embedding.config_id,
+                'repo_type': embedding.repo_type,
+                'repo_branch': embedding.repo_branch,
+                'created_at': embedding.created_at.isoformat() if embedding.created_at else None,
+                'updated_at': embedding.updated_at.isoformat() if embedding.updated_at else None,
+                'file_metadata': embedding.file_metadata or {}
+            })
+            ids_list.append(embedding.id)
+        
+        return self.vector_store_service.add_embeddings(
+            config=config,
+            embeddings=embedding_vectors,
+            metadata=metadata_list,
+            ids=ids_list
+        )
+    
     async def load_embeddings_from_db(self, vector_embedding_repo: VectorEmbeddingRepository) -> bool:
-        """Carga embeddings desde BD al Vector Store al iniciar el sistema"""
+        """
+        Carga embeddings al Vector Store al iniciar el sistema.
+        
+        Si existe un snapshot FAISS en disco cuya marca de versión coincide con la BD
+        (mismo número de filas y misma última actualización) se usa directamente.
+        Si el snapshot está obsoleto se aplican solo los cambios sobre él, y solo se
+        reconstruye desde cero cuando no hay snapshot.
+        """
         try:
+            if pgvector_enabled():
+                logger.info("pgvector activo, no se carga el índice FAISS")
+                return True
+            
+            snapshot_watermark = self.vector_store_service.load_faiss_snapshot(self.COLLECTION_NAME)
+            if snapshot_watermark is not None:
+                current_watermark = vector_embedding_repo.get_watermark()
+                if current_watermark and snapshot_watermark == current_watermark:
+                    logger.info("Snapshot FAISS al día con la BD, no es necesario reconstruir el índice")
+                    return True
+                logger.info(f"Snapshot FAISS obsoleto ({snapshot_watermark} != {current_watermark}), sincronizando cambios")
+            
             logger.info("Cargando embeddings desde BD al Vector Store...")
             return await self.sync_embeddings_to_vector_store(vector_embedding_repo)
         except Exception as e:
@@ -0,0 +1,98 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FileInfoCache:
+    """
+    Caché de los metadatos NSDK extraídos de cada fichero de un repositorio
+    (líneas, funciones, campos, botones...), con dos niveles:
+
+    - Memoria: un diccionario por repositorio, cargado la primera vez que se usa.
+    - Persistente: un JSON por repositorio en `cache_dir`.
+
+    Cada entrada se valida con (ruta relativa, tamaño, mtime_ns): si el fichero no
+    ha cambiado no se vuelve a leer ni a analizar con expresiones regulares.
+    """
+
+    def __init__(self, cache_dir: Path, persistent: Optional[bool] = None):
+        self.cache_dir = Path(cache_dir)
+        if persistent is None:
+            persistent = os.getenv('FILE_INFO_CACHE_PERSIST', 'true').lower() == 'true'
+        self.persistent = persistent
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _cache_file(self, repo_name: str) -> Path:
+        return self.cache_dir / f"{repo_name}.json"
+
+    def _load(self, repo_name: str) -> Dict[str, Dict[str, Any]]:
+        """Entradas del repositorio (se carga el JSON la primera vez); llamar con el lock"""
+        entries = self._entries.get(repo_name)
+        if entries is not None:
+            return entries
+        entries = {}
+        cache_file = self._cache_file(repo_name)
+        if self.persistent and cache_file.exists():
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except Exception as e:
+                logger.warning(f"Caché de ficheros de {repo_name} ilegible, se reconstruye: {str(e)}")
+                entries = {}
+        self._entries[repo_name] = entries
+        return entries
+
+    def get(self, repo_name: str, relative_path: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        """Metadatos guardados del fichero si no ha cambiado desde que se extrajeron"""
+        with self._lock:
+            entry = self._load(repo_name).get(relative_path)
+            if entry and entry['size'] == size and entry['mtime_ns'] == mtime_ns:
+                self.stats['hits'] += 1
+                return dict(entry['info'])
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, repo_name: str, relative_path: str, size: int, mtime_ns: int, info: Dict[str, Any]):
+        with self._lock:
+            self._load(repo_name)[relative_path] = {'size': size, 'mtime_ns': mtime_ns, 'info': info}
+            self._dirty.add(repo_name)
+
+    def save(self, repo_name: str):
+        """Escribe el JSON del repositorio si hay entradas nuevas (escritura atómica)"""
+        if not self.persistent:
+            return
+        with self._lock:
+            if repo_name not in self._dirty:
+                return
+            payload = json.dumps(self._entries.get(repo_name, {}))
+            self._dirty.discard(repo_name)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._cache_file(repo_name))
+        except Exception as e:
+            logger.warning(f"No se pudo persistir la caché de ficheros de {repo_name}: {str(e)}")
+
+    def invalidate(self, repo_name: str):
+        """Olvida las entradas de un repositorio (p. ej. al eliminarlo)"""
+        with self._lock:
+            self._entries.pop(repo_name, None)
+            self._dirty.discard(repo_name)
+        try:
+            self._cache_file(repo_name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
@@ -0,0 +1,136 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from uuid import uuid4
+
+from git import Repo, GitCommandError
+
+logger = logging.getLogger(__name__)
+
+
+class GitWorktreeService:
+    """
+    Operaciones git de la generación de código sobre worktrees aislados.
+
+    Cada trabajo crea su rama en un `git worktree` propio bajo
+    CODE_GENERATION_WORKTREES_DIR, partiendo de origin/<rama base>, así que no
+    toca la copia de trabajo del repositorio ni el directorio actual del proceso
+    (GitPython ejecuta cada orden con su ruta explícita). Varias pantallas pueden
+    generarse y subirse a la vez en ramas distintas; solo el fetch y la creación
+    o borrado de worktrees se serializan por repositorio.
+    """
+
+    def __init__(self, worktrees_dir: Optional[str] = None):
+        self.worktrees_dir = Path(worktrees_dir or os.getenv(
+            'CODE_GENERATION_WORKTREES_DIR', os.path.join(tempfile.gettempdir(), 'nsdk-worktrees')
+        ))
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _repo_lock(self, repo_path: str) -> threading.Lock:
+        key = str(Path(repo_path).resolve())
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def branch_exists(repo: Repo, branch_name: str) -> bool:
+        """La rama existe en local o entre las ramas remotas ya conocidas de origin"""
+        return bool(repo.git.branch('--list', branch_name).strip()
+                    or repo.git.branch('-r', '--list', f'origin/{branch_name}').strip())
+
+    @classmethod
+    def unique_branch_name(cls, repo: Repo, base_branch_name: str) -> str:
+        """Nombre de rama libre, agregando sufijo numérico si ya existe"""
+        if not cls.branch_exists(repo, base_branch_name):
+            return base_branch_name
+        counter = 1
+        while cls.branch_exists(repo, f"{base_branch_name}-{counter}"):
+            counter += 1
+        unique_name = f"{base_branch_name}-{counter}"
+        logger.info(f"Rama {base_branch_name} ya existe, usando {unique_name}")
+        return unique_name
+
+    @contextmanager
+    def worktree(self, repo_path: str, branch_name: str, base_branch: str = 'main') -> Iterator[Tuple[Repo, str]]:
+        """
+        Crea una rama nueva desde origin/<base_branch> en un worktree temporal
+
+        Yields:
+            Tupla (repositorio del worktree, nombre de rama finalmente usado)
+        """
+        repo = Repo(repo_path)
+        worktree_path = self.worktrees_dir / f"{Path(repo_path).name}-{uuid4().hex[:8]}"
+        self.worktrees_dir.mkdir(parents=True, exist_ok=True)
+
+        with self._repo_lock(repo_path):
+            repo.git.worktree('prune')
+            logger.info(f"Actualizando {base_branch} desde origin en {repo_path}")
+            repo.git.fetch('origin', base_branch)
+            unique_branch_name = self.unique_branch_name(repo, branch_name)
+            repo.git.worktree('add', '-b', unique_branch_name, str(worktree_path), f'origin/{base_branch}')
+        logger.info(f"Rama {unique_branch_name} creada en el worktree {worktree_path}")
+
+        try:
+            yield Repo(worktree_path), unique_branch_name
+        finally:
+            with self._repo_lock(repo_path):
+                try:
+                    repo.git.worktree('remove', '--force', str(worktree_path))
+                except GitCommandError as e:
+                    logger.warning(f"No se pudo eliminar el worktree {worktree_path}: {e.stderr}")
+                    shutil.rmtree(worktree_path, ignore_errors=True)
+                    repo.git.worktree('prune')
+
+    @staticmethod
+    def write_files(worktree: Repo, files: Dict[str, str]):
+        """Escribe los archivos (rutas relativas a la raíz del repositorio) en el worktree"""
+        for file_path, content in files.items():
+            full_path = os.path.join(worktree.working_tree_dir, file_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            logger.info(f"Archivo creado: {file_path}")
+
+    @staticmethod
+    def commit_and_push(worktree: Repo, branch_name: str, paths, commit_message: str) -> Optional[str]:
+        """
+        Hace commit de las rutas indicadas y sube la rama
+
+        Returns:
+            Hash del commit, o None si no había archivos (solo se sube la rama)
+        """
+        paths = list(paths)
+        commit_hash = None
+        if paths:
+            worktree.git.add('--', *paths)
+            worktree.git.commit('-m', commit_message)
+            commit_hash = worktree.head.commit.hexsha
+            logger.info(f"Commit realizado: {commit_hash}")
+        worktree.git.push('-u', 'origin', branch_name)
+        logger.info(f"Rama {branch_name} subida al repositorio remoto")
+        return commit_hash
+
+    def commit_files(self, repo_path: str, branch_name: str, files: Dict[str, str],
+                     commit_message: str, base_branch: str = 'main') -> Dict[str, object]:
+        """
+        Crea la rama, escribe los archivos, hace commit y push (bloqueante; los
+        servicios asíncronos lo llaman con asyncio.to_thread)
+        """
+        with self.worktree(repo_path, branch_name, base_branch) as (worktree, unique_branch_name):
+            self.write_files(worktree, files)
+            commit_hash = self.commit_and_push(worktree, unique_branch_name, files.keys(), commit_message)
+        return {
+            "branch_created": True,
+            "branch_name": unique_branch_name,
+            "commit_hash": commit_hash,
+            "files_committed": len(files)
+        }
+
+
+# Instancia compartida: los bloqueos por repositorio deben ser comunes a todo el proceso
+git_worktree_service = GitWorktreeService()
@@ -0,0 +1,108 @@
+import os
+import logging
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class HTTPClientPool:
+    """
+    Clientes HTTP de larga duración compartidos por todos los servicios.
+
+    Mantiene un cliente con pool de conexiones por proveedor (openai, mistral,
+    ollama, qdrant, chroma...) para reutilizar sesiones TLS y conexiones
+    keep-alive entre llamadas. Los clientes se crean en el arranque de la
+    aplicación (o bajo demanda la primera vez que se piden) y se cierran en el
+    apagado.
+    """
+
+    # Proveedores cuyos clientes se crean en el arranque
+    DEFAULT_PROVIDERS = ('openai', 'mistral', 'ollama')
+
+    def __init__(self):
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+        self._sync_clients: Dict[str, httpx.Client] = {}
+        self.max_connections = _env_int('HTTP_MAX_CONNECTIONS', 100)
+        self.max_keepalive_connections = _env_int('HTTP_MAX_KEEPALIVE_CONNECTIONS', 20)
+        self.keepalive_expiry = _env_float('HTTP_KEEPALIVE_EXPIRY', 30.0)
+        self.http2 = os.getenv('HTTP2_ENABLED', 'true').lower() == 'true' and self._http2_available()
+
+    @staticmethod
+    def _http2_available() -> bool:
+        """HTTP/2 en httpx requiere el paquete opcional 'h2'"""
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            logger.info("Paquete 'h2' no instalado, los clientes HTTP usarán HTTP/1.1")
+            return False
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def get_async_client(self, provider: str) -> httpx.AsyncClient:
+        """Obtiene (o crea) el cliente asíncrono compartido del proveedor"""
+        client = self._async_clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(http2=self.http2, limits=self._limits(), timeout=30)
+            self._async_clients[provider] = client
+            logger.info(f"Cliente HTTP asíncrono creado para {provider} (http2={self.http2})")
+        return client
+
+    def get_sync_client(self, provider: str) -> httpx.Client:
+        """Obtiene (o crea) el cliente síncrono compartido del proveedor"""
+        client = self._sync_clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.Client(http2=self.http2, limits=self._limits(), timeout=30)
+            self._sync_clients[provider] = client
+            logger.info(f"Cliente HTTP síncrono creado para {provider} (http2={self.http2})")
+        return client
+
+    def startup(self):
+        """Crea los clientes de los proveedores por defecto"""
+        for provider in self.DEFAULT_PROVIDERS:
+            self.get_async_client(provider)
+        logger.info(
+            f"[OK] Pool HTTP inicializado (max_connections={self.max_connections}, "
+            f"max_keepalive={self.max_keepalive_connections}, http2={self.http2})"
+        )
+
+    async def aclose(self):
+        """Cierra todos los clientes abiertos"""
+        for provider, client in list(self._async_clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error cerrando cliente HTTP de {provider}: {str(e)}")
+        for provider, client in list(self._sync_clients.items()):
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Error cerrando cliente HTTP de {provider}: {str(e)}")
+        self._async_clients.clear()
+        self._sync_clients.clear()
+        logger.info("[OK] Pool HTTP cerrado")
+
+
+# Instancia compartida por toda la aplicación
+http_client_pool = HTTPClientPool()
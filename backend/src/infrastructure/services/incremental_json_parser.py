@@ -0,0 +1,127 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Parser incremental del objeto JSON de una respuesta LLM en streaming.
+
+    Recibe los fragmentos de texto según llegan y devuelve cada campo de primer
+    nivel en cuanto su valor está completo, sin esperar al resto de la respuesta.
+    El texto anterior a la primera llave (explicaciones, ```json) se ignora.
+    Solo recorre cada carácter una vez: guarda la profundidad y si está dentro
+    de una cadena, y decodifica con json.loads únicamente los valores cerrados.
+    """
+
+    def __init__(self):
+        self._text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._expect = 'key'  # 'key' | 'colon' | 'value'
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self.result: Dict[str, Any] = {}
+        self.complete = False
+        self.error: Optional[str] = None
+
+    @property
+    def started(self) -> bool:
+        """Se ha encontrado la llave de apertura del objeto"""
+        return self._started
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Añade un fragmento y devuelve los campos (clave, valor) completados con él
+        """
+        if self.complete or self.error or not chunk:
+            return []
+        self._text += chunk
+        fields = []
+        text = self._text
+        while self._pos < len(text):
+            char = text[self._pos]
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = self._decode(self._key_start, self._pos + 1)
+                        self._key_start = None
+                        self._expect = 'colon'
+                self._pos += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == 'key':
+                    self._key_start = self._pos
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    field = self._close_value(self._pos)
+                    if field:
+                        fields.append(field)
+                    self.complete = True
+                    self._pos += 1
+                    break
+            elif self._depth == 1:
+                if char == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+                    self._value_start = self._pos + 1
+                elif char == ',' and self._expect == 'value':
+                    field = self._close_value(self._pos)
+                    if field:
+                        fields.append(field)
+                    self._expect = 'key'
+            self._pos += 1
+            if self.error:
+                break
+        return fields
+
+    @property
+    def truncated(self) -> bool:
+        """El objeto se abrió pero el texto recibido no lo cierra"""
+        return self._started and not self.complete
+
+    def _decode(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self._text[start:end])
+        except json.JSONDecodeError as e:
+            self.error = f"JSON inválido en la posición {start}: {str(e)}"
+            return None
+
+    def _close_value(self, end: int) -> Optional[Tuple[str, Any]]:
+        """Decodifica el valor del campo actual, que termina en `end`"""
+        if self._expect != 'value' or self._value_start is None or self._key is None:
+            return None
+        start = self._value_start
+        self._value_start = None
+        if not self._text[start:end].strip():
+            return None
+        value = self._decode(start, end)
+        if self.error:
+            return None
+        key = self._key
+        self._key = None
+        self.result[key] = value
+        return key, value
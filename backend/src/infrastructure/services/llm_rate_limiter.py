@@ -0,0 +1,148 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LLMProviderError(Exception):
+    """Respuesta de error de un proveedor LLM (con el código HTTP para decidir si se reintenta)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code == 429 or (self.status_code is not None and self.status_code >= 500)
+
+    @classmethod
+    def from_response(cls, provider: str, response: httpx.Response) -> 'LLMProviderError':
+        retry_after = response.headers.get('retry-after')
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None
+        return cls(f"{provider} API error: {response.text}", response.status_code, retry_after)
+
+
+class LLMResponseTruncatedError(Exception):
+    """La respuesta en streaming se cortó (límite de tokens o conexión cerrada) antes de terminar"""
+
+
+class TokenBucket:
+    """
+    Cubo de tokens con capacidad por minuto que se rellena de forma continua.
+
+    acquire espera (en orden de llegada) hasta que hay saldo suficiente; una
+    petición mayor que la capacidad se limita a la capacidad para no bloquearse.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class LLMRateLimiter:
+    """
+    Limitador compartido de las llamadas de chat a los proveedores LLM.
+
+    Respeta los límites de peticiones (LLM_RATE_LIMIT_RPM) y de tokens
+    (LLM_RATE_LIMIT_TPM) por minuto con dos cubos de tokens; un límite a 0 lo
+    desactiva. Los errores 429/5xx y de red se reintentan hasta LLM_MAX_RETRIES
+    veces con backoff exponencial (LLM_RETRY_BASE_DELAY segundos, con jitter) o el
+    Retry-After del proveedor; tras un 429 todas las llamadas esperan esa pausa.
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 max_retries: Optional[int] = None, base_delay: Optional[float] = None):
+        rpm = rpm if rpm is not None else int(os.getenv('LLM_RATE_LIMIT_RPM', 0))
+        tpm = tpm if tpm is not None else int(os.getenv('LLM_RATE_LIMIT_TPM', 0))
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 3))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('LLM_RETRY_BASE_DELAY', 2))
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens: int = 0):
+        """Espera turno para una petición que consumirá aproximadamente `tokens` tokens"""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens and tokens:
+            await self.tokens.acquire(tokens)
+
+    def pause(self, seconds: float):
+        """Detiene todas las peticiones durante `seconds` (p. ej. tras un 429)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        if isinstance(error, LLMProviderError):
+            if not error.retryable:
+                return None
+            if error.retry_after is not None:
+                return error.retry_after
+        elif not isinstance(error, httpx.TransportError):
+            return None
+        return self.base_delay * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    async def backoff(self, error: Exception, attempt: int) -> bool:
+        """
+        Espera antes del reintento `attempt` (desde 0) de una llamada fallida.
+
+        Returns:
+            bool: False si el error no es transitorio o se agotaron los reintentos
+        """
+        delay = self._retry_delay(error, attempt)
+        if delay is None or attempt >= self.max_retries:
+            return False
+        if isinstance(error, LLMProviderError) and error.status_code == 429:
+            self.pause(delay)
+        logger.warning(f"Llamada LLM fallida ({str(error)[:200]}), reintento {attempt + 1}/{self.max_retries} "
+                       f"en {delay:.1f}s")
+        await asyncio.sleep(delay)
+        return True
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """Ejecuta la llamada respetando los límites y reintentando los errores transitorios"""
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            try:
+                return await call()
+            except Exception as e:
+                if not await self.backoff(e, attempt):
+                    raise
+                attempt += 1
+
+
+# Instancia compartida por todas las instancias de LLMServiceImpl del proceso
+llm_rate_limiter = LLMRateLimiter()
@@ -1,10 +1,45 @@
+import os
+import json
+import time
 import httpx
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from ...domain.repositories.llm_service import LLMService
 from ...domain.entities import LLMConfig, Analysis, Screen
+from .http_client_pool import http_client_pool
+from .embedding_cache import embedding_cache
+from .llm_rate_limiter import LLMProviderError, LLMResponseTruncatedError, llm_rate_limiter
+from .incremental_json_parser import IncrementalJSONParser
+
+# Respuesta que devuelve chat_completion cuando la llamada falla definitivamente
+FALLBACK_ANALYSIS_RESPONSE = '''{
+    "analysis_summary": "Error en análisis automático - Fallback temporal",
+    "file_type": "screen",
+    "complexity": "unknown",
+    "estimated_hours": "0",
+    "frontend": {},
+    "backend": {},
+    "migration_notes": ["Error en análisis automático"],
+    "potential_issues": ["Error en análisis automático"]
+}'''
 
 class LLMServiceImpl(LLMService):
+    # Límites por petición de los endpoints de embeddings: (tokens totales, número de entradas)
+    EMBEDDING_BATCH_LIMITS = {
+        'openai': (250000, 2048),
+        'mistral': (16000, 128),
+    }
+    # Modelo y dimensión de embeddings de cada proveedor (forman parte de la clave de caché)
+    EMBEDDING_MODELS = {
+        'openai': ('text-embedding-3-small', 1536),
+        'mistral': ('mistral-embed', 1024),
+        'ollama': ('llama2', 4096),
+    }
+    # Peticiones simultáneas a Ollama, que no admite varias entradas por llamada
+    OLLAMA_EMBEDDING_CONCURRENCY = 4
+    # Segundos máximos sin recibir datos de una respuesta en streaming
+    STREAM_IDLE_TIMEOUT = float(os.getenv('LLM_STREAM_IDLE_TIMEOUT', 60))
+    
     def __init__(self):
         self.config = None
         self.provider = None
@@ -25,24 +60,120 @@ class LLMServiceImpl(LLMService):
     
     async def get_embedding(self, text: str) -> List[float]:
         """Obtiene el embedding de un texto usando el proveedor configurado"""
-        try:
-            if not self.config:
-                # Si no hay configuración, usar embedding simple
-                return self._simple_embedding(text)
+        embeddings = await self.get_embeddings([text])
+        return embeddings[0]
+    
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Obtiene los embeddings de varios textos minimizando las llamadas al proveedor.
+        
+        Antes de llamar al proveedor se consulta la caché de embeddings direccionada
+        por contenido; solo los textos distintos que no estén en caché se envían.
+        OpenAI y Mistral aceptan varias entradas por petición, así que los textos se
+        agrupan en lotes respetando un presupuesto de tokens. Ollama no tiene endpoint
+        por lotes y se usan llamadas individuales con concurrencia limitada.
+        
+        Args:
+            texts: Textos a vectorizar
             
-            if self.provider == 'openai':
-                return await self._openai_embedding(text)
+        Returns:
+            Lista de embeddings en el mismo orden que los textos de entrada
+        """
+        if not texts:
+            return []
+        
+        if not self.config or self.provider not in self.EMBEDDING_MODELS:
+            # Si no hay configuración, usar embedding simple
+            return [self._simple_embedding(text) for text in texts]
+        
+        model, dimension = self.EMBEDDING_MODELS[self.provider]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        
+        for i, embedding in embedding_cache.get_many(texts, self.provider, model, dimension).items():
+            embeddings[i] = embedding
+        
+        # Textos distintos que faltan (el mismo texto repetido se pide una sola vez)
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if embeddings[i] is None:
+                missing.setdefault(text, []).append(i)
+        
+        if missing:
+            missing_texts = list(missing.keys())
+            computed = await self._fetch_embeddings(missing_texts)
+            
+            # Los fallbacks (_simple_embedding) no tienen la dimensión del modelo y no se cachean
+            cacheable = [(text, embedding) for text, embedding in zip(missing_texts, computed)
+                         if len(embedding) == dimension]
+            if cacheable:
+                embedding_cache.put_many(
+                    [text for text, _ in cacheable],
+                    [embedding for _, embedding in cacheable],
+                    self.provider, model, dimension
+                )
+            
+            for text, embedding in zip(missing_texts, computed):
+                for i in missing[text]:
+                    embeddings[i] = embedding
+        
+        return embeddings
+    
+    async def _fetch_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Pide al proveedor los embeddings de los textos, agrupando en lotes cuando es posible"""
+        try:
+            if self.provider in self.EMBEDDING_BATCH_LIMITS:
+                batch_fn = self._openai_embeddings if self.provider == 'openai' else self._mistral_embeddings
+                max_tokens, max_items = self.EMBEDDING_BATCH_LIMITS[self.provider]
+                embeddings: List[Optional[List[float]]] = [None] * len(texts)
+                for batch_indices in self._build_embedding_batches(texts, max_tokens, max_items):
+                    batch_embeddings = await batch_fn([texts[i] for i in batch_indices])
+                    for i, embedding in zip(batch_indices, batch_embeddings):
+                        embeddings[i] = embedding
+                return embeddings
             elif self.provider == 'ollama':
-                return await self._ollama_embedding(text)
-            elif self.provider == 'mistral':
-                return await self._mistral_embedding(text)
+                semaphore = asyncio.Semaphore(self.OLLAMA_EMBEDDING_CONCURRENCY)
+                
+                async def _bounded_embedding(text: str) -> List[float]:
+                    async with semaphore:
+                        return await self._ollama_embedding(text)
+                
+                return list(await asyncio.gather(*[_bounded_embedding(text) for text in texts]))
             else:
                 # Fallback a embedding simple
-                return self._simple_embedding(text)
+                return [self._simple_embedding(text) for text in texts]
         except Exception as e:
-            print(f"Error obteniendo embedding: {e}")
-            # Fallback a embedding simple
-            return self._simple_embedding(text)
+            print(f"Error obteniendo embeddings por lotes: {e}")
+            return [self._simple_embedding(text) for text in texts]
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Estimación aproximada de tokens (~4 caracteres por token)"""
+        return len(text) // 4 + 1
+    
+    def _build_embedding_batches(self, texts: List[str], max_tokens: int, max_items: int) -> List[List[int]]:
+        """
+        Agrupa los índices de los textos en lotes que no superen el presupuesto de tokens
+        ni el número máximo de entradas por petición.
+        
+        Un texto que por sí solo supera el presupuesto va en un lote propio.
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        
+        for i, text in enumerate(texts):
+            tokens = self._estimate_tokens(text)
+            if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        
+        return batches
     
     def _simple_embedding(self, text: str) -> List[float]:
         """Embedding simple basado en hash para desarrollo/testing"""
@@ -68,62 +199,75 @@ class LLMServiceImpl(LLMService):
     
     async def _openai_embedding(self, text: str) -> List[float]:
         """Obtiene embedding usando OpenAI"""
+        embeddings = await self._openai_embeddings([text])
+        return embeddings[0]
+    
+    async def _openai_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Obtiene embeddings de varios textos con una sola llamada a OpenAI"""
         try:
             headers = {'Authorization': f'Bearer {self.api_key}'}
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    'https://api.openai.com/v1/embeddings',
-                    headers=headers,
-                    json={'input': text, 'model': 'text-embedding-3-small'},
-                    timeout=30
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['data'][0]['embedding']
-                else:
-                    raise Exception(f"OpenAI API error: {response.text}")
+            client = http_client_pool.get_async_client('openai')
+            response = await client.post(
+                'https://api.openai.com/v1/embeddings',
+                headers=headers,
+                json={'input': texts, 'model': self.EMBEDDING_MODELS['openai'][0]},
+                timeout=60
+            )
+            if response.status_code == 200:
+                data = response.json()
+                # La API puede devolver los elementos desordenados: ordenar por 'index'
+                items = sorted(data['data'], key=lambda item: item['index'])
+                return [item['embedding'] for item in items]
+            else:
+                raise LLMProviderError.from_response('OpenAI', response)
         except Exception as e:
             print(f"Error OpenAI embedding: {e}")
-            return self._simple_embedding(text)
+            return [self._simple_embedding(text) for text in texts]
     
     async def _ollama_embedding(self, text: str) -> List[float]:
         """Obtiene embedding usando Ollama"""
         try:
             base_url = self.base_url or 'http://localhost:11434'
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f'{base_url}/api/embeddings',
-                    json={'model': 'llama2', 'prompt': text},
-                    timeout=30
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['embedding']
-                else:
-                    raise Exception(f"Ollama API error: {response.text}")
+            client = http_client_pool.get_async_client('ollama')
+            response = await client.post(
+                f'{base_url}/api/embeddings',
+                json={'model': self.EMBEDDING_MODELS['ollama'][0], 'prompt': text},
+                timeout=30
+            )
+            if response.status_code == 200:
+                data = response.json()
+                return data['embedding']
+            else:
+                raise LLMProviderError.from_response('Ollama', response)
         except Exception as e:
             print(f"Error Ollama embedding: {e}")
             return self._simple_embedding(text)
     
     async def _mistral_embedding(self, text: str) -> List[float]:
         """Obtiene embedding usando Mistral"""
+        embeddings = await self._mistral_embeddings([text])
+        return embeddings[0]
+    
+    async def _mistral_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Obtiene embeddings de varios textos con una sola llamada a Mistral"""
         try:
             headers = {'Authorization': f'Bearer {self.api_key}'}
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    'https://api.mistral.ai/v1/embeddings',
-                    headers=headers,
-                    json={'input': text, 'model': 'mistral-embed'},
-                    timeout=30
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['data'][0]['embedding']
-                else:
-                    raise Exception(f"Mistral API error: {response.text}")
+            client = http_client_pool.get_async_client('mistral')
+            response = await client.post(
+                'https://api.mistral.ai/v1/embeddings',
+                headers=headers,
+                json={'input': texts, 'model': self.EMBEDDING_MODELS['mistral'][0]},
+                timeout=60
+            )
+            if response.status_code == 200:
+                data = response.json()
+                items = sorted(data['data'], key=lambda item: item.get('index', 0))
+                return [item['embedding'] for item in items]
+            else:
+                raise LLMProviderError.from_response('Mistral', response)
         except Exception as e:
             print(f"Error Mistral embedding: {e}")
-            return self._simple_embedding(text)
+            return [self._simple_embedding(text) for text in texts]
     
     # Métodos temporales para cumplir con la interfaz
     async def analyze_screen(self, screen: Screen, context: str) -> Analysis:
@@ -162,22 +306,39 @@ class LLMServiceImpl(LLMService):
         return self.test_connection(self.config.__dict__ if self.config else {})[0]
     
     async def chat_completion(self, messages: List[Dict[str, str]], 
-                            system_prompt: Optional[str] = None) -> str:
-        """Realiza una completación de chat genérica"""
+                            system_prompt: Optional[str] = None,
+                            raise_on_error: bool = False) -> str:
+        """
+        Realiza una completación de chat genérica
+        
+        Las peticiones pasan por el limitador compartido de RPM/TPM, que reintenta
+        los errores 429/5xx con backoff. Si la llamada falla definitivamente se
+        devuelve FALLBACK_ANALYSIS_RESPONSE, o se propaga el error con raise_on_error.
+        """
         try:
             if not self.config:
                 raise Exception("LLM service no inicializado con configuración")
             
             if self.provider == 'openai':
-                return await self._openai_chat_completion(messages, system_prompt)
+                completion = self._openai_chat_completion
             elif self.provider == 'ollama':
-                return await self._ollama_chat_completion(messages, system_prompt)
+                completion = self._ollama_chat_completion
             elif self.provider == 'mistral':
-                return await self._mistral_chat_completion(messages, system_prompt)
+                completion = self._mistral_chat_completion
             else:
                 raise Exception(f"Proveedor LLM no soportado: {self.provider}")
+            
+            # Los límites de TPM cuentan el prompt más los tokens máximos de la respuesta
+            prompt_text = (system_prompt or '') + ''.join(message.get('content', '') for message in messages)
+            max_tokens = getattr(self.config, 'max_tokens', None) or 4096
+            return await llm_rate_limiter.run(
+                lambda: completion(messages, system_prompt),
+                tokens=self._estimate_tokens(prompt_text) + max_tokens
+            )
                 
         except Exception as e:
+            if raise_on_error:
+                raise
             import traceback
             print(f"=== ERROR EN CHAT COMPLETION ===")
             print(f"Error: {e}")
@@ -188,16 +349,29 @@ class LLMServiceImpl(LLMService):
             traceback.print_exc()
             print(f"=== FIN ERROR ===")
             # Fallback a respuesta temporal si hay error
-            return '''{
-    "analysis_summary": "Error en análisis automático - Fallback temporal",
-    "file_type": "screen",
-    "complexity": "unknown",
-    "estimated_hours": "0",
-    "frontend": {},
-    "backend": {},
-    "migration_notes": ["Error en análisis automático"],
-    "potential_issues": ["Error en análisis automático"]
-}'''
+            return FALLBACK_ANALYSIS_RESPONSE
+    
+    def _openai_payload(self, openai_messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Cuerpo de la petición de chat de OpenAI según el modelo configurado"""
+        # Determinar el parámetro correcto según el modelo
+        model_name = self.config.model_name if hasattr(self.config, 'model_name') else 'gpt-4'
+        max_tokens_value = self.config.max_tokens if hasattr(self.config, 'max_tokens') else 4096
+        temperature_value = self.config.temperature if hasattr(self.config, 'temperature') else 0.7
+        
+        payload = {
+            'model': model_name,
+            'messages': openai_messages
+        }
+        
+        # GPT-5 tiene restricciones específicas
+        if model_name.startswith('gpt-5'):
+            payload['max_completion_tokens'] = max_tokens_value
+            # GPT-5 no soporta temperature personalizado, solo usa el valor por defecto (1)
+            # No incluimos temperature en el payload para GPT-5
+        else:
+            payload['max_tokens'] = max_tokens_value
+            payload['temperature'] = temperature_value
+        return payload
     
     async def _openai_chat_completion(self, messages: List[Dict[str, str]], 
                                     system_prompt: Optional[str] = None) -> str:
@@ -218,24 +392,7 @@ class LLMServiceImpl(LLMService):
                 'Content-Type': 'application/json'
             }
             
-            # Determinar el parámetro correcto según el modelo
-            model_name = self.config.model_name if hasattr(self.config, 'model_name') else 'gpt-4'
-            max_tokens_value = self.config.max_tokens if hasattr(self.config, 'max_tokens') else 4096
-            temperature_value = self.config.temperature if hasattr(self.config, 'temperature') else 0.7
-            
-            payload = {
-                'model': model_name,
-                'messages': openai_messages
-            }
-            
-            # GPT-5 tiene restricciones específicas
-            if model_name.startswith('gpt-5'):
-                payload['max_completion_tokens'] = max_tokens_value
-                # GPT-5 no soporta temperature personalizado, solo usa el valor por defecto (1)
-                # No incluimos temperature en el payload para GPT-5
-            else:
-                payload['max_tokens'] = max_tokens_value
-                payload['temperature'] = temperature_value
+            payload = self._openai_payload(openai_messages)
             
             # Log de entrada
             print("=== OPENAI REQUEST ===")
@@ -254,33 +411,33 @@ class LLMServiceImpl(LLMService):
                 print(f"     Content: {msg['content'][:200]}{'...' if len(msg['content']) > 200 else ''}")
             print("=====================")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    'https://api.openai.com/v1/chat/completions',
-                    headers=headers,
-                    json=payload,
-                    timeout=300  # Aumentar timeout a 5 minutos para GPT-5
-                )
+            client = http_client_pool.get_async_client('openai')
+            response = await client.post(
+                'https://api.openai.com/v1/chat/completions',
+                headers=headers,
+                json=payload,
+                timeout=300  # Aumentar timeout a 5 minutos para GPT-5
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    content = data['choices'][0]['message']['content']
+            if response.status_code == 200:
+                data = response.json()
+                content = data['choices'][0]['message']['content']
                     
-                    # Log de salida
-                    print("=== OPENAI RESPONSE ===")
-                    print(f"Status: {response.status_code}")
-                    print(f"Usage: {data.get('usage', 'N/A')}")
-                    print(f"Content length: {len(content)}")
-                    print(f"Content: {content[:500]}{'...' if len(content) > 500 else ''}")
-                    print("======================")
+                # Log de salida
+                print("=== OPENAI RESPONSE ===")
+                print(f"Status: {response.status_code}")
+                print(f"Usage: {data.get('usage', 'N/A')}")
+                print(f"Content length: {len(content)}")
+                print(f"Content: {content[:500]}{'...' if len(content) > 500 else ''}")
+                print("======================")
                     
-                    return content
-                else:
-                    print(f"=== OPENAI ERROR ===")
-                    print(f"Status: {response.status_code}")
-                    print(f"Response: {response.text}")
-                    print("===================")
-                    raise Exception(f"OpenAI API error: {response.text}")
+                return content
+            else:
+                print(f"=== OPENAI ERROR ===")
+                print(f"Status: {response.status_code}")
+                print(f"Response: {response.text}")
+                print("===================")
+                raise LLMProviderError.from_response('OpenAI', response)
                     
         except httpx.ReadTimeout as e:
             print(f"=== TIMEOUT ERROR ===")
@@ -311,18 +468,18 @@ class LLMServiceImpl(LLMService):
                 'stream': False
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f'{base_url}/api/chat',
-                    json=payload,
-                    timeout=60
-                )
+            client = http_client_pool.get_async_client('ollama')
+            response = await client.post(
+                f'{base_url}/api/chat',
+                json=payload,
+                timeout=60
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['message']['content']
-                else:
-                    raise Exception(f"Ollama API error: {response.text}")
+            if response.status_code == 200:
+                data = response.json()
+                return data['message']['content']
+            else:
+                raise LLMProviderError.from_response('Ollama', response)
                     
         except Exception as e:
             print(f"Error Ollama chat completion: {e}")
@@ -350,24 +507,167 @@ class LLMServiceImpl(LLMService):
                 'temperature': 0.7
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    'https://api.mistral.ai/v1/chat/completions',
-                    headers=headers,
-                    json=payload,
-                    timeout=60
-                )
+            client = http_client_pool.get_async_client('mistral')
+            response = await client.post(
+                'https://api.mistral.ai/v1/chat/completions',
+                headers=headers,
+                json=payload,
+                timeout=60
+            )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data['choices'][0]['message']['content']
-                else:
-                    raise Exception(f"Mistral API error: {response.text}")
+            if response.status_code == 200:
+                data = response.json()
+                return data['choices'][0]['message']['content']
+            else:
+                raise LLMProviderError.from_response('Mistral', response)
                     
         except Exception as e:
             print(f"Error Mistral chat completion: {e}")
             raise
     
+    async def stream_chat_completion(self, messages: List[Dict[str, str]],
+                                     system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Completación de chat en streaming: genera los fragmentos de texto según
+        los envía el proveedor.
+        
+        Pasa por el mismo limitador que chat_completion, pero solo reintenta
+        mientras no se ha recibido ningún fragmento. Si el proveedor deja de enviar
+        datos durante LLM_STREAM_IDLE_TIMEOUT segundos se corta la petición, y si la
+        respuesta termina por el límite de tokens o sin marca de fin se lanza
+        LLMResponseTruncatedError en lugar de devolver un resultado incompleto.
+        """
+        if not self.config:
+            raise Exception("LLM service no inicializado con configuración")
+        
+        request = self._stream_request(messages, system_prompt)
+        prompt_text = (system_prompt or '') + ''.join(message.get('content', '') for message in messages)
+        max_tokens = getattr(self.config, 'max_tokens', None) or 4096
+        tokens = self._estimate_tokens(prompt_text) + max_tokens
+        
+        attempt = 0
+        while True:
+            await llm_rate_limiter.acquire(tokens)
+            received = False
+            try:
+                async for delta in self._stream_deltas(*request):
+                    received = True
+                    yield delta
+                return
+            except Exception as e:
+                if received or not await llm_rate_limiter.backoff(e, attempt):
+                    raise
+                attempt += 1
+    
+    async def stream_json_completion(self, messages: List[Dict[str, str]],
+                                     system_prompt: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Completación en streaming de una respuesta JSON.
+        
+        Genera un evento {'type': 'field', 'key', 'value'} por cada campo de primer
+        nivel en cuanto el parser incremental lo completa y, al terminar, un evento
+        {'type': 'result'} con el objeto completo en 'data' (None si la respuesta no
+        era un JSON válido), el texto íntegro en 'text' y los segundos hasta el
+        primer campo en 'time_to_first_field'.
+        """
+        parser = IncrementalJSONParser()
+        chunks = []
+        started = time.monotonic()
+        time_to_first_field = None
+        async for delta in self.stream_chat_completion(messages, system_prompt):
+            chunks.append(delta)
+            for key, value in parser.feed(delta):
+                if time_to_first_field is None:
+                    time_to_first_field = round(time.monotonic() - started, 2)
+                yield {'type': 'field', 'key': key, 'value': value}
+        
+        yield {
+            'type': 'result',
+            'data': parser.result if parser.complete and not parser.error else None,
+            'text': ''.join(chunks),
+            'time_to_first_field': time_to_first_field,
+            'elapsed': round(time.monotonic() - started, 2)
+        }
+    
+    def _stream_request(self, messages: List[Dict[str, str]],
+                        system_prompt: Optional[str] = None) -> Tuple[str, str, Dict[str, str], Dict[str, Any]]:
+        """Proveedor, URL, cabeceras y cuerpo de la petición de chat en streaming"""
+        chat_messages = []
+        if system_prompt:
+            chat_messages.append({"role": "system", "content": system_prompt})
+        chat_messages.extend(messages)
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        if self.provider == 'openai':
+            if not self.api_key:
+                raise Exception("API Key no configurada para OpenAI")
+            payload = self._openai_payload(chat_messages)
+            payload['stream'] = True
+            return 'openai', 'https://api.openai.com/v1/chat/completions', headers, payload
+        if self.provider == 'ollama':
+            base_url = self.base_url or 'http://localhost:11434'
+            payload = {'model': 'llama2', 'messages': chat_messages, 'stream': True}
+            return 'ollama', f'{base_url}/api/chat', {'Content-Type': 'application/json'}, payload
+        if self.provider == 'mistral':
+            payload = {
+                'model': 'mistral-large-latest',
+                'messages': chat_messages,
+                'max_tokens': 4096,
+                'temperature': 0.7,
+                'stream': True
+            }
+            return 'mistral', 'https://api.mistral.ai/v1/chat/completions', headers, payload
+        raise Exception(f"Proveedor LLM no soportado: {self.provider}")
+    
+    async def _stream_deltas(self, provider: str, url: str, headers: Dict[str, str],
+                             payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Lee la respuesta en streaming del proveedor: eventos SSE `data:` en OpenAI y
+        Mistral, una línea JSON por fragmento en Ollama
+        """
+        provider_name = {'openai': 'OpenAI', 'ollama': 'Ollama', 'mistral': 'Mistral'}[provider]
+        client = http_client_pool.get_async_client(provider)
+        # El timeout de lectura se aplica entre fragmentos, no a la respuesta completa
+        timeout = httpx.Timeout(30.0, read=self.STREAM_IDLE_TIMEOUT)
+        finish_reason = None
+        
+        async with client.stream('POST', url, headers=headers, json=payload, timeout=timeout) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise LLMProviderError.from_response(provider_name, response)
+            
+            async for line in response.aiter_lines():
+                line = line.strip()
+                if not line:
+                    continue
+                if provider == 'ollama':
+                    data = json.loads(line)
+                    delta = data.get('message', {}).get('content')
+                    if data.get('done'):
+                        finish_reason = data.get('done_reason') or 'stop'
+                else:
+                    if not line.startswith('data:'):
+                        continue
+                    line = line[len('data:'):].strip()
+                    if line == '[DONE]':
+                        break
+                    data = json.loads(line)
+                    choice = (data.get('choices') or [{}])[0]
+                    delta = choice.get('delta', {}).get('content')
+                    finish_reason = choice.get('finish_reason') or finish_reason
+                if delta:
+                    yield delta
+                if finish_reason:
+                    break
+        
+        if finish_reason == 'length':
+            raise LLMResponseTruncatedError(f"Respuesta de {provider_name} truncada: alcanzado el límite de tokens")
+        if finish_reason is None:
+            raise LLMResponseTruncatedError(f"Respuesta de {provider_name} interrumpida antes de terminar")
+    
     @staticmethod
     def test_connection(config: dict) -> (bool, str):
         provider = config.get('provider')
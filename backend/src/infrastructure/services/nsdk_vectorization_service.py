@@ -1,7 +1,10 @@
 import os
 import re
+import asyncio
 import tempfile
 import shutil
+import uuid
+from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import logging
@@ -14,12 +17,24 @@ from ...domain.entities.vectorization_batch import VectorizationBatch, Vectoriza
 from .vector_store_service_impl import VectorStoreServiceImpl
 from .llm_service_impl import LLMServiceImpl
 from .repository_manager_service import RepositoryManagerService
+from .batch_progress_broker import batch_progress_broker
 
 logger = logging.getLogger(__name__)
 
 class RepositoryVectorizationService(ABC):
     """Servicio base abstracto para vectorización de repositorios"""
     
+    # Archivos que se leen y se envían juntos a get_embeddings en cada iteración
+    FILES_PER_EMBEDDING_BATCH = int(os.getenv('VECTORIZATION_EMBEDDING_BATCH', 64))
+    
+    # Concurrencia de cada etapa del pipeline de vectorización
+    READ_CONCURRENCY = int(os.getenv('VECTORIZATION_READ_WORKERS', 8))
+    METADATA_CONCURRENCY = int(os.getenv('VECTORIZATION_METADATA_WORKERS', 4))
+    EMBEDDING_CONCURRENCY = int(os.getenv('VECTORIZATION_EMBEDDING_WORKERS', 2))
+    # Tamaño máximo de las colas entre etapas y espera (s) para completar un lote de embeddings
+    PIPELINE_QUEUE_SIZE = int(os.getenv('VECTORIZATION_QUEUE_SIZE', 256))
+    EMBEDDING_BATCH_WAIT = float(os.getenv('VECTORIZATION_EMBEDDING_BATCH_WAIT', 0.05))
+    
     def __init__(self, vector_store_service: VectorStoreServiceImpl, llm_service: LLMServiceImpl):
         self.vector_store_service = vector_store_service
         self.llm_service = llm_service
@@ -84,95 +99,165 @@ class NSDKVectorizationService(RepositoryVectorizationService):
         
         # Buscar archivos NSDK recursivamente
         for file_path in root_path.rglob('*'):
-            if file_path.is_file():
-                for file_type, pattern in self.nsdk_file_patterns.items():
-                    if re.search(pattern, file_path.name):
-                        nsdk_files.append(str(file_path))
-                        logger.debug(f"Archivo NSDK encontrado: {file_path.name} (tipo: {file_type})")
-                        break
+            if file_path.is_file() and self.is_nsdk_file(file_path.name):
+                nsdk_files.append(str(file_path))
+                logger.debug(f"Archivo NSDK encontrado: {file_path.name}")
         
         logger.info(f"Total de archivos NSDK encontrados: {len(nsdk_files)}")
         return nsdk_files
     
+    def is_nsdk_file(self, file_name: str) -> bool:
+        """Indica si el nombre de archivo corresponde a un tipo NSDK vectorizable"""
+        return any(re.search(pattern, file_name) for pattern in self.nsdk_file_patterns.values())
+    
     async def process_file(self, file_path: str, config_id: str = None, repo_type: str = None, 
                           branch: str = 'main', vector_embedding_repo = None) -> Dict[str, Any]:
         """Procesa un archivo NSDK individual con persistencia de embeddings"""
-        try:
-            # Leer contenido del archivo
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Calcular hash del contenido para detectar cambios
-            content_hash = self._calculate_content_hash(content)
-            
-            # Verificar si ya existe un embedding para este archivo
-            logger.info(f"[DEBUG] vector_embedding_repo: {vector_embedding_repo is not None}, config_id: {config_id}")
-            if vector_embedding_repo and config_id:
-                existing_embedding = vector_embedding_repo.get_by_file_path(file_path, config_id)
-                logger.info(f"[DEBUG] existing_embedding encontrado: {existing_embedding is not None}")
-                
-                if existing_embedding and not existing_embedding.is_content_changed(content_hash):
-                    logger.info(f"Usando embedding existente para {Path(file_path).name} (sin cambios)")
-                    return {
-                        'success': True,
-                        'metadata': existing_embedding.file_metadata,
-                        'embedding': existing_embedding.embedding,
-                        'content_preview': content[:1000],
-                        'cached': True
-                    }
-                elif existing_embedding and existing_embedding.is_content_changed(content_hash):
-                    logger.info(f"Contenido cambiado para {Path(file_path).name}, recalculando embedding")
-            
-            # Extraer metadatos
-            metadata = self._extract_nsdk_metadata(file_path, content)
-            
-            # Vectorizar contenido
-            vectorization_text = self._create_vectorization_text(file_path, content, metadata)
-            logger.info(f"[IA] Obteniendo embedding para {Path(file_path).name}...")
-            logger.info(f"[IA] Longitud del texto a vectorizar: {len(vectorization_text)} caracteres")
-            embedding = await self.llm_service.get_embedding(vectorization_text)
-            logger.info(f"[IA] Embedding obtenido exitosamente para {Path(file_path).name}")
-            
-            # Guardar embedding en la base de datos si tenemos repositorio
-            if vector_embedding_repo and config_id:
-                from ...domain.entities.vector_embedding import VectorEmbedding
-                
-                vector_embedding = VectorEmbedding(
-                    file_path=file_path,
-                    file_name=Path(file_path).name,
-                    file_type=self._get_file_type(file_path),
-                    content_hash=content_hash,
-                    embedding=embedding,
-                    file_metadata=metadata,
-                    config_id=config_id,
-                    repo_type=repo_type or 'source',
-                    repo_branch=branch,
-                    vectorization_batch_id=None  # Se actualizará después si es necesario
-                )
-                
-                if existing_embedding:
-                    # Actualizar embedding existente
-                    existing_embedding.update_embedding(embedding, metadata)
-                    vector_embedding_repo.update(existing_embedding)
-                    logger.info(f"Embedding actualizado para {Path(file_path).name}")
-                else:
-                    # Crear nuevo embedding
-                    vector_embedding_repo.create(vector_embedding)
-                    logger.info(f"Nuevo embedding guardado para {Path(file_path).name}")
+        results = await self.process_files(
+            [file_path],
+            config_id=config_id,
+            repo_type=repo_type,
+            branch=branch,
+            vector_embedding_repo=vector_embedding_repo
+        )
+        return results[0]
+    
+    async def process_files(self, file_paths: List[str], config_id: str = None, repo_type: str = None,
+                           branch: str = 'main', vector_embedding_repo = None) -> List[Dict[str, Any]]:
+        """
+        Procesa un grupo de archivos NSDK pidiendo todos sus embeddings en una sola
+        llamada por lotes al servicio LLM.
+        
+        Args:
+            file_paths: Rutas de los archivos a procesar
+            config_id: ID de configuración para persistir los embeddings
+            repo_type: Tipo de repositorio
+            branch: Rama del repositorio
+            vector_embedding_repo: Repositorio de embeddings (opcional)
             
-            return {
+        Returns:
+            Lista de resultados en el mismo orden que file_paths
+        """
+        existing = self._prefetch_existing_embeddings(file_paths, config_id, vector_embedding_repo)
+        items = []
+        for file_path in file_paths:
+            item = {'file_path': file_path}
+            try:
+                item['content'], item['content_hash'] = self._read_file(file_path)
+                if not self._lookup_existing_embedding(item, existing):
+                    self._prepare_vectorization(item)
+            except Exception as e:
+                logger.error(f"Error procesando archivo NSDK {file_path}: {str(e)}")
+                item['result'] = {'success': False, 'error': str(e)}
+            items.append(item)
+        
+        await self._embed_items([item for item in items if 'result' not in item])
+        self._persist_items(items, config_id, repo_type, branch, vector_embedding_repo)
+        
+        return [item['result'] for item in items]
+    
+    def _read_file(self, file_path: str) -> Tuple[str, str]:
+        """Lee un archivo y calcula el hash de su contenido"""
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        return content, self._calculate_content_hash(content)
+    
+    def _prefetch_existing_embeddings(self, file_paths: List[str], config_id: str,
+                                      vector_embedding_repo) -> Dict[str, Any]:
+        """Hash y metadatos ya guardados de todos los archivos, con consultas IN por bloques"""
+        if not (vector_embedding_repo and config_id and file_paths):
+            return {}
+        return vector_embedding_repo.get_existing_by_file_paths(config_id, file_paths)
+    
+    def _lookup_existing_embedding(self, item: Dict[str, Any], existing: Dict[str, Any]) -> bool:
+        """
+        Busca el embedding persistido del archivo entre los precargados. Si existe y
+        el contenido no ha cambiado, deja el resultado en item['result'] y devuelve True.
+        """
+        file_path = item['file_path']
+        existing_embedding = existing.get(file_path)
+        item['existing'] = existing_embedding
+        
+        if existing_embedding and existing_embedding.content_hash == item['content_hash']:
+            logger.debug(f"Usando embedding existente para {Path(file_path).name} (sin cambios)")
+            item['result'] = {
                 'success': True,
-                'metadata': metadata,
-                'embedding': embedding,
-                'content_preview': content[:1000],
-                'cached': False
+                'metadata': existing_embedding.file_metadata,
+                'content_preview': item['content'][:1000],
+                'cached': True
             }
-            
+            return True
+        elif existing_embedding:
+            logger.info(f"Contenido cambiado para {Path(file_path).name}, recalculando embedding")
+        return False
+    
+    def _prepare_vectorization(self, item: Dict[str, Any]):
+        """Extrae metadatos y construye el texto a vectorizar del archivo"""
+        item['metadata'] = self._extract_nsdk_metadata(item['file_path'], item['content'])
+        item['text'] = self._create_vectorization_text(item['file_path'], item['content'], item['metadata'])
+    
+    async def _embed_items(self, items: List[Dict[str, Any]]):
+        """Obtiene en una sola llamada por lotes los embeddings de los archivos preparados"""
+        if not items:
+            return
+        logger.info(f"[IA] Obteniendo embeddings para {len(items)} archivos...")
+        try:
+            embeddings = await self.llm_service.get_embeddings([item['text'] for item in items])
+            for item, embedding in zip(items, embeddings):
+                item['embedding'] = embedding
+            logger.info(f"[IA] Embeddings obtenidos exitosamente para {len(embeddings)} archivos")
         except Exception as e:
-            logger.error(f"Error procesando archivo NSDK {file_path}: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e)
+            logger.error(f"Error obteniendo embeddings del lote: {str(e)}")
+            for item in items:
+                item['result'] = {'success': False, 'error': str(e)}
+    
+    def _persist_items(self, items: List[Dict[str, Any]], config_id: str, repo_type: str,
+                       branch: str, vector_embedding_repo):
+        """
+        Guarda los embeddings calculados con un único upsert en bloque y deja el
+        resultado de cada archivo en item['result']
+        """
+        pending = [item for item in items if 'result' not in item]
+        if not pending:
+            return
+        
+        try:
+            # Guardar embeddings en la base de datos si tenemos repositorio
+            if vector_embedding_repo and config_id:
+                now = datetime.utcnow()
+                rows = []
+                for item in pending:
+                    file_path = item['file_path']
+                    existing_embedding = item.get('existing')
+                    rows.append({
+                        'id': existing_embedding.id if existing_embedding else str(uuid.uuid4()),
+                        'file_path': file_path,
+                        'file_name': Path(file_path).name,
+                        'file_type': self._get_file_type(file_path),
+                        'content_hash': item['content_hash'],
+                        'embedding': item['embedding'],
+                        'file_metadata': item['metadata'],
+                        'config_id': config_id,
+                        'repo_type': repo_type or 'source',
+                        'repo_branch': branch,
+                        'vectorization_batch_id': None,  # Se actualizará después si es necesario
+                        'created_at': now,
+                        'updated_at': now
+                    })
+                vector_embedding_repo.upsert_many(rows)
+        except Exception as e:
+            logger.error(f"Error guardando embeddings de {len(pending)} archivos NSDK: {str(e)}")
+            for item in pending:
+                item['result'] = {'success': False, 'error': str(e)}
+            return
+        
+        for item in pending:
+            item['result'] = {
+                'success': True,
+                'metadata': item['metadata'],
+                'embedding': item['embedding'],
+                'content_preview': item['content'][:1000],
+                'cached': False
             }
     
     def _calculate_content_hash(self, content: str) -> str:
@@ -190,17 +275,40 @@ class NSDKVectorizationService(RepositoryVectorizationService):
     
     async def vectorize_repository(self, repo_path: str, batch: VectorizationBatch, 
                                   config_id: str = None, repo_type: str = None, 
-                                  branch: str = 'main', vector_embedding_repo = None) -> VectorizationBatch:
-        """Vectoriza un repositorio NSDK completo con persistencia de embeddings"""
+                                  branch: str = 'main', vector_embedding_repo = None,
+                                  file_paths: Optional[List[str]] = None, job = None) -> VectorizationBatch:
+        """
+        Vectoriza un repositorio NSDK completo con persistencia de embeddings.
+        
+        Los archivos pasan por un pipeline de etapas concurrentes unidas por colas
+        acotadas: lectura+hash (pool de hilos) -> búsqueda de embedding existente y
+        extracción de metadatos -> embeddings por lotes -> persistencia. Solo la etapa
+        de persistencia toca la sesión de BD y los contadores del lote.
+        
+        Si se indica file_paths (vectorización incremental) solo se procesan esos
+        archivos en lugar de recorrer todo el repositorio.
+        
+        Con job (VectorizationJobHandle) se omiten los archivos ya procesados en una
+        ejecución anterior, se persiste el progreso tras cada grupo y el productor
+        deja de encolar archivos en cuanto se solicita la cancelación.
+        """
         try:
             # Descubrir archivos
-            nsdk_files = self.discover_files(repo_path)
+            batch.set_stage('discovering')
+            batch_progress_broker.publish_batch(batch)
+            if file_paths is not None:
+                nsdk_files = [path for path in file_paths if self.is_nsdk_file(Path(path).name)]
+            else:
+                nsdk_files = await asyncio.to_thread(self.discover_files, repo_path)
             
             if not nsdk_files:
                 logger.warning("No se encontraron archivos NSDK para vectorizar")
                 batch.fail_processing("No se encontraron archivos NSDK")
                 return batch
             
+            if job:
+                nsdk_files = job.filter_pending(nsdk_files)
+            
             # Añadir archivos al lote
             for file_path in nsdk_files:
                 file_id = str(hash(file_path))
@@ -208,47 +316,28 @@ class NSDKVectorizationService(RepositoryVectorizationService):
             
             # Procesar archivos
             batch.start_processing()
+            batch.set_stage('processing')
+            batch_progress_broker.publish_batch(batch)
             logger.info(f"Iniciando procesamiento de {len(nsdk_files)} archivos NSDK")
             
-            cached_count = 0
-            new_count = 0
-            
-            for i, file_path in enumerate(nsdk_files):
-                try:
-                    logger.info(f"Procesando archivo {i+1}/{len(nsdk_files)}: {file_path}")
-                    
-                    result = await self.process_file(
-                        file_path, 
-                        config_id=config_id,
-                        repo_type=repo_type,
-                        branch=branch,
-                        vector_embedding_repo=vector_embedding_repo
-                    )
-                    file_id = str(hash(file_path))
-                    
-                    if result['success']:
-                        batch.mark_file_processed(file_id, success=True)
-                        if result.get('cached', False):
-                            cached_count += 1
-                            logger.info(f"Archivo {Path(file_path).name} procesado (cached)")
-                        else:
-                            new_count += 1
-                            logger.info(f"Archivo {Path(file_path).name} procesado exitosamente (nuevo)")
-                    else:
-                        batch.mark_file_processed(file_id, success=False)
-                        logger.error(f"Error procesando {Path(file_path).name}: {result['error']}")
-                        
-                except Exception as e:
-                    logger.error(f"Error procesando archivo {file_path}: {str(e)}")
-                    file_id = str(hash(file_path))
-                    batch.mark_file_processed(file_id, success=False)
+            counters = await self._run_pipeline(
+                nsdk_files, batch,
+                config_id=config_id,
+                repo_type=repo_type,
+                branch=branch,
+                vector_embedding_repo=vector_embedding_repo,
+                job=job
+            )
             
             # Completar lote
-            if batch.failed_files > 0:
+            if job and job.is_cancelled():
+                logger.info(f"Lote cancelado tras procesar {batch.processed_files}/{batch.total_files} archivos")
+                batch.cancel_processing()
+            elif batch.failed_files > 0:
                 logger.warning(f"Fallaron {batch.failed_files} archivos, marcando lote como fallido")
                 batch.fail_processing(f"Fallaron {batch.failed_files} archivos")
             else:
-                logger.info(f"Todos los archivos procesados exitosamente. Cached: {cached_count}, Nuevos: {new_count}")
+                logger.info(f"Todos los archivos procesados exitosamente. Cached: {counters['cached']}, Nuevos: {counters['new']}")
                 batch.complete_processing()
             
             return batch
@@ -258,6 +347,127 @@ class NSDKVectorizationService(RepositoryVectorizationService):
             batch.fail_processing(str(e))
             return batch
     
+    async def _run_pipeline(self, file_paths: List[str], batch: VectorizationBatch, config_id: str = None,
+                            repo_type: str = None, branch: str = 'main',
+                            vector_embedding_repo = None, job = None) -> Dict[str, int]:
+        """
+        Ejecuta el pipeline de vectorización sobre los archivos y actualiza el lote.
+        
+        Returns:
+            Contadores {'cached': n, 'new': n}
+        """
+        stop = object()
+        queue_size = self.PIPELINE_QUEUE_SIZE
+        read_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        prepare_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        persist_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        counters = {'cached': 0, 'new': 0}
+        # Estado persistido de todos los archivos en consultas IN por bloques, no una por archivo
+        existing = self._prefetch_existing_embeddings(file_paths, config_id, vector_embedding_repo)
+        
+        async def run_stage(workers: int, worker, out_queue: asyncio.Queue, downstream_workers: int):
+            """Lanza los workers de una etapa y, al terminar, propaga el fin a la siguiente"""
+            await asyncio.gather(*[worker() for _ in range(workers)])
+            for _ in range(downstream_workers):
+                await out_queue.put(stop)
+        
+        async def produce():
+            for file_path in file_paths:
+                # Cancelación cooperativa: los archivos ya encolados terminan su recorrido
+                if job and job.is_cancelled():
+                    break
+                await read_queue.put({'file_path': file_path})
+            for _ in range(self.READ_CONCURRENCY):
+                await read_queue.put(stop)
+        
+        async def read_worker():
+            # Lectura y hash en el pool de hilos para no bloquear el event loop
+            while (item := await read_queue.get()) is not stop:
+                try:
+                    item['content'], item['content_hash'] = await asyncio.to_thread(self._read_file, item['file_path'])
+                except Exception as e:
+                    logger.error(f"Error leyendo archivo NSDK {item['file_path']}: {str(e)}")
+                    item['result'] = {'success': False, 'error': str(e)}
+                await prepare_queue.put(item)
+        
+        async def prepare_worker():
+            while (item := await prepare_queue.get()) is not stop:
+                if 'result' not in item:
+                    try:
+                        if not self._lookup_existing_embedding(item, existing):
+                            await asyncio.to_thread(self._prepare_vectorization, item)
+                    except Exception as e:
+                        logger.error(f"Error preparando archivo NSDK {item['file_path']}: {str(e)}")
+                        item['result'] = {'success': False, 'error': str(e)}
+                await embed_queue.put(item)
+        
+        async def embed_worker():
+            finished = False
+            while not finished:
+                item = await embed_queue.get()
+                if item is stop:
+                    break
+                group = [item]
+                # Completar el lote con lo que llegue durante una breve espera
+                while len(group) < self.FILES_PER_EMBEDDING_BATCH:
+                    # asyncio.timeout y no wait_for: en Python < 3.12 wait_for puede perder
+                    # el elemento si la espera vence justo cuando llega
+                    try:
+                        async with asyncio.timeout(self.EMBEDDING_BATCH_WAIT):
+                            item = await embed_queue.get()
+                    except TimeoutError:
+                        break
+                    if item is stop:
+                        finished = True
+                        break
+                    group.append(item)
+                
+                await self._embed_items([item for item in group if 'result' not in item])
+                await persist_queue.put(group)
+        
+        async def persist_worker():
+            while (group := await persist_queue.get()) is not stop:
+                self._persist_items(group, config_id, repo_type, branch, vector_embedding_repo)
+                results = []
+                for item in group:
+                    file_path = item['file_path']
+                    file_id = str(hash(file_path))
+                    result = item['result']
+                    
+                    if result['success']:
+                        batch.mark_file_processed(file_id, success=True)
+                        if result.get('cached', False):
+                            counters['cached'] += 1
+                        else:
+                            counters['new'] += 1
+                    else:
+                        batch.mark_file_processed(file_id, success=False)
+                        logger.error(f"Error procesando {Path(file_path).name}: {result['error']}")
+                    results.append((file_path, result['success'], result.get('error')))
+                if job:
+                    await job.on_files_processed(results)
+                batch_progress_broker.publish_batch(batch)
+                logger.info(f"Progreso de vectorización: {batch.processed_files}/{batch.total_files}")
+        
+        tasks = [
+            asyncio.create_task(produce()),
+            asyncio.create_task(run_stage(self.READ_CONCURRENCY, read_worker, prepare_queue, self.METADATA_CONCURRENCY)),
+            asyncio.create_task(run_stage(self.METADATA_CONCURRENCY, prepare_worker, embed_queue, self.EMBEDDING_CONCURRENCY)),
+            asyncio.create_task(run_stage(self.EMBEDDING_CONCURRENCY, embed_worker, persist_queue, 1)),
+            asyncio.create_task(persist_worker())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Si una etapa falla, el resto quedaría bloqueado en sus colas: cancelarlas
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
+        return counters
+    
     def _extract_nsdk_metadata(self, file_path: str, content: str) -> Dict[str, Any]:
         """Extrae metadatos del contenido NSDK"""
         metadata = {}
@@ -372,31 +582,46 @@ class AngularVectorizationService(RepositoryVectorizationService):
     
     async def process_file(self, file_path: str) -> Dict[str, Any]:
         """Procesa un archivo Angular individual"""
-        try:
-            # Leer contenido del archivo
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Extraer metadatos
-            metadata = self._extract_angular_metadata(file_path, content)
-            
-            # Vectorizar contenido
-            vectorization_text = self._create_vectorization_text(file_path, content, metadata)
-            embedding = await self.llm_service.get_embedding(vectorization_text)
-            
-            return {
-                'success': True,
-                'metadata': metadata,
-                'embedding': embedding,
-                'content_preview': content[:1000]  # Primeros 1000 caracteres
-            }
-            
-        except Exception as e:
-            logger.error(f"Error procesando archivo Angular {file_path}: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e)
-            }
+        results = await self.process_files([file_path])
+        return results[0]
+    
+    async def process_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """Procesa un grupo de archivos Angular con una sola llamada de embeddings por lotes"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_paths)
+        pending = []  # (índice, contenido, metadatos, texto a vectorizar)
+        
+        for i, file_path in enumerate(file_paths):
+            try:
+                # Leer contenido del archivo
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+                
+                # Extraer metadatos
+                metadata = self._extract_angular_metadata(file_path, content)
+                vectorization_text = self._create_vectorization_text(file_path, content, metadata)
+                pending.append((i, content, metadata, vectorization_text))
+                
+            except Exception as e:
+                logger.error(f"Error procesando archivo Angular {file_path}: {str(e)}")
+                results[i] = {'success': False, 'error': str(e)}
+        
+        if pending:
+            try:
+                # Vectorizar contenido en lote
+                embeddings = await self.llm_service.get_embeddings([item[3] for item in pending])
+                for (i, content, metadata, _), embedding in zip(pending, embeddings):
+                    results[i] = {
+                        'success': True,
+                        'metadata': metadata,
+                        'embedding': embedding,
+                        'content_preview': content[:1000]  # Primeros 1000 caracteres
+                    }
+            except Exception as e:
+                logger.error(f"Error obteniendo embeddings Angular: {str(e)}")
+                for i, *_ in pending:
+                    results[i] = {'success': False, 'error': str(e)}
+        
+        return results
     
     async def vectorize_repository(self, repo_path: str, batch: VectorizationBatch) -> VectorizationBatch:
         """Vectoriza un repositorio Angular completo"""
@@ -418,11 +643,17 @@ class AngularVectorizationService(RepositoryVectorizationService):
             batch.start_processing()
             logger.info(f"Iniciando procesamiento de {len(angular_files)} archivos Angular")
             
-            for i, file_path in enumerate(angular_files):
+            for start in range(0, len(angular_files), self.FILES_PER_EMBEDDING_BATCH):
+                group = angular_files[start:start + self.FILES_PER_EMBEDDING_BATCH]
+                logger.info(f"Procesando archivos {start+1}-{start+len(group)}/{len(angular_files)}")
+                
                 try:
-                    logger.info(f"Procesando archivo {i+1}/{len(angular_files)}: {file_path}")
-                    
-                    result = await self.process_file(file_path)
+                    results = await self.process_files(group)
+                except Exception as e:
+                    logger.error(f"Error procesando grupo de archivos: {str(e)}")
+                    results = [{'success': False, 'error': str(e)}] * len(group)
+                
+                for file_path, result in zip(group, results):
                     file_id = str(hash(file_path))
                     
                     if result['success']:
@@ -431,11 +662,6 @@ class AngularVectorizationService(RepositoryVectorizationService):
                     else:
                         batch.mark_file_processed(file_id, success=False)
                         logger.error(f"Error procesando {Path(file_path).name}: {result['error']}")
-                        
-                except Exception as e:
-                    logger.error(f"Error procesando archivo {file_path}: {str(e)}")
-                    file_id = str(hash(file_path))
-                    batch.mark_file_processed(file_id, success=False)
             
             # Completar lote
             if batch.failed_files > 0:
@@ -566,31 +792,46 @@ class SpringBootVectorizationService(RepositoryVectorizationService):
     
     async def process_file(self, file_path: str) -> Dict[str, Any]:
         """Procesa un archivo Spring Boot individual"""
-        try:
-            # Leer contenido del archivo
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Extraer metadatos
-            metadata = self._extract_spring_metadata(file_path, content)
-            
-            # Vectorizar contenido
-            vectorization_text = self._create_vectorization_text(file_path, content, metadata)
-            embedding = await self.llm_service.get_embedding(vectorization_text)
-            
-            return {
-                'success': True,
-                'metadata': metadata,
-                'embedding': embedding,
-                'content_preview': content[:1000]  # Primeros 1000 caracteres
-            }
-            
-        except Exception as e:
-            logger.error(f"Error procesando archivo Spring Boot {file_path}: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e)
-            }
+        results = await self.process_files([file_path])
+        return results[0]
+    
+    async def process_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """Procesa un grupo de archivos Spring Boot con una sola llamada de embeddings por lotes"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_paths)
+        pending = []  # (índice, contenido, metadatos, texto a vectorizar)
+        
+        for i, file_path in enumerate(file_paths):
+            try:
+                # Leer contenido del archivo
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+                
+                # Extraer metadatos
+                metadata = self._extract_spring_metadata(file_path, content)
+                vectorization_text = self._create_vectorization_text(file_path, content, metadata)
+                pending.append((i, content, metadata, vectorization_text))
+                
+            except Exception as e:
+                logger.error(f"Error procesando archivo Spring Boot {file_path}: {str(e)}")
+                results[i] = {'success': False, 'error': str(e)}
+        
+        if pending:
+            try:
+                # Vectorizar contenido en lote
+                embeddings = await self.llm_service.get_embeddings([item[3] for item in pending])
+                for (i, content, metadata, _), embedding in zip(pending, embeddings):
+                    results[i] = {
+                        'success': True,
+                        'metadata': metadata,
+                        'embedding': embedding,
+                        'content_preview': content[:1000]  # Primeros 1000 caracteres
+                    }
+            except Exception as e:
+                logger.error(f"Error obteniendo embeddings Spring Boot: {str(e)}")
+                for i, *_ in pending:
+                    results[i] = {'success': False, 'error': str(e)}
+        
+        return results
     
     async def vectorize_repository(self, repo_path: str, batch: VectorizationBatch) -> VectorizationBatch:
         """Vectoriza un repositorio Spring Boot completo"""
@@ -612,11 +853,17 @@ class SpringBootVectorizationService(RepositoryVectorizationService):
             batch.start_processing()
             logger.info(f"Iniciando procesamiento de {len(spring_files)} archivos Spring Boot")
             
-            for i, file_path in enumerate(spring_files):
+            for start in range(0, len(spring_files), self.FILES_PER_EMBEDDING_BATCH):
+                group = spring_files[start:start + self.FILES_PER_EMBEDDING_BATCH]
+                logger.info(f"Procesando archivos {start+1}-{start+len(group)}/{len(spring_files)}")
+                
                 try:
-                    logger.info(f"Procesando archivo {i+1}/{len(spring_files)}: {file_path}")
-                    
-                    result = await self.process_file(file_path)
+                    results = await self.process_files(group)
+                except Exception as e:
+                    logger.error(f"Error procesando grupo de archivos: {str(e)}")
+                    results = [{'success': False, 'error': str(e)}] * len(group)
+                
+                for file_path, result in zip(group, results):
                     file_id = str(hash(file_path))
                     
                     if result['success']:
@@ -625,11 +872,6 @@ class SpringBootVectorizationService(RepositoryVectorizationService):
                     else:
                         batch.mark_file_processed(file_id, success=False)
                         logger.error(f"Error procesando {Path(file_path).name}: {result['error']}")
-                        
-                except Exception as e:
-                    logger.error(f"Error procesando archivo {file_path}: {str(e)}")
-                    file_id = str(hash(file_path))
-                    batch.mark_file_processed(file_id, success=False)
             
             # Completar lote
             if batch.failed_files > 0:
@@ -804,15 +1046,24 @@ class UnifiedVectorizationService:
             raise
     
     async def vectorize_repository(self, config_id: UUID, repo_type: str, 
-                                  branch: str = 'main', force_update: bool = True) -> VectorizationBatch:
+                                  branch: str = 'main', force_update: bool = True,
+                                  full_rescan: bool = False, batch: Optional[VectorizationBatch] = None,
+                                  job = None) -> VectorizationBatch:
         """
         Vectoriza un repositorio detectando automáticamente su tecnología
         
+        Para repositorios NSDK ya vectorizados solo se procesan los archivos que cambian
+        entre el último commit vectorizado y el actual (git diff), y los archivos
+        borrados se eliminan de la BD y del vector store.
+        
         Args:
             config_id: ID de la configuración
             repo_type: Tipo de repositorio ('source', 'frontend', 'backend')
             branch: Rama del repositorio
             force_update: Si es True, fuerza pull del repositorio y limpia vectorización existente
+            full_rescan: Si es True, recorre todo el repositorio aunque haya un commit vectorizado
+            batch: Lote ya creado (trabajos del motor de vectorización en segundo plano)
+            job: VectorizationJobHandle para persistir el progreso y atender la cancelación
             
         Returns:
             VectorizationBatch: Lote de vectorización procesado
@@ -826,13 +1077,14 @@ class UnifiedVectorizationService:
         try:
             # Crear lote de vectorización
             logger.info("1. Creando lote de vectorización...")
-            batch = VectorizationBatch(
-                name=f"Vectorización de {repo_type}",
-                batch_type=VectorizationBatchType.REPOSITORY,
-                config_id=config_id,
-                repo_type=repo_type,
-                source_repo_branch=branch
-            )
+            if batch is None:
+                batch = VectorizationBatch(
+                    name=f"Vectorización de {repo_type}",
+                    batch_type=VectorizationBatchType.REPOSITORY,
+                    config_id=config_id,
+                    repo_type=repo_type,
+                    source_repo_branch=branch
+                )
             logger.info(f"[OK] Lote creado con ID: {batch.id}")
             logger.info(f"[OK] Lote config_id: {batch.config_id}")
             logger.info(f"[OK] Lote repo_type: {batch.repo_type}")
@@ -885,12 +1137,19 @@ class UnifiedVectorizationService:
             repo_token = repo_config.get('token')
             
             # Clonar o actualizar repositorio permanentemente (con pull forzado si force_update)
+            batch.set_stage('cloning')
+            batch_progress_broker.publish_batch(batch)
             logger.info(f"6. Clonando/actualizando repositorio: {repo_url} (branch: {repo_branch}, force_update: {force_update})")
             repo_path = self.repository_manager.clone_repository(
                 repo_url, repo_name, repo_branch, repo_username, repo_token, force_update
             )
             logger.info(f"[OK] Repositorio disponible en: {repo_path}")
             
+            if job and job.is_cancelled():
+                logger.info(f"Lote {batch.id} cancelado antes de vectorizar")
+                batch.cancel_processing()
+                return batch
+            
             # Detectar tecnología del repositorio
             logger.info("7. Detectando tecnología del repositorio...")
             technology = self.technology_detector.detect_technology(str(repo_path))
@@ -912,7 +1171,23 @@ class UnifiedVectorizationService:
                 logger.error(f"[ERROR] Traceback completo: {e}")
                 # Continuar sin repositorio de embeddings para que al menos funcione la vectorización básica
             
-            if technology == 'nsdk':
+            # Último commit vectorizado, para procesar solo los cambios desde entonces
+            head_commit = self.repository_manager.get_head_commit(repo_name)
+            state_repo = None
+            changes = None
+            if technology == 'nsdk' and vector_embedding_repo and head_commit:
+                from ..repositories.vectorization_state_repository import VectorizationStateRepository
+                state_repo = VectorizationStateRepository(vector_embedding_repo.db)
+                if not full_rescan:
+                    changes = self._get_incremental_changes(
+                        state_repo, repo_name, Path(repo_path), str(config_id), repo_type, repo_branch, head_commit
+                    )
+            
+            if technology == 'nsdk' and changes is not None:
+                logger.info("[OK] Usando servicio NSDK para vectorización incremental")
+                await self._vectorize_changes(batch, changes, str(repo_path), str(config_id), repo_type,
+                                              repo_branch, vector_embedding_repo, job=job)
+            elif technology == 'nsdk':
                 logger.info("[OK] Usando servicio NSDK para vectorización")
                 await self.nsdk_service.vectorize_repository(
                     str(repo_path), 
@@ -920,7 +1195,8 @@ class UnifiedVectorizationService:
                     config_id=str(config_id),
                     repo_type=repo_type,
                     branch=repo_branch,
-                    vector_embedding_repo=vector_embedding_repo
+                    vector_embedding_repo=vector_embedding_repo,
+                    job=job
                 )
             elif technology == 'angular':
                 logger.info("[OK] Usando servicio Angular para vectorización")
@@ -933,8 +1209,14 @@ class UnifiedVectorizationService:
                 # Intentar vectorización genérica o fallar
                 batch.fail_processing(f"Tecnología no reconocida: {technology}")
             
+            # Guardar el commit vectorizado solo si el lote terminó bien
+            if state_repo and batch.status == VectorizationBatchStatus.COMPLETED:
+                state_repo.save_last_commit(str(config_id), repo_type, repo_branch, head_commit)
+                logger.info(f"[OK] Commit vectorizado registrado: {head_commit[:8]}")
+            
             # Sincronizar embeddings al Vector Store después de vectorizar
             if vector_embedding_repo:
+                batch.set_stage('syncing')
                 try:
                     from .embedding_sync_service import EmbeddingSyncService
                     sync_service = EmbeddingSyncService(self.vector_store_service)
@@ -950,6 +1232,8 @@ class UnifiedVectorizationService:
                     logger.error(f"[ERROR] Error en sincronización: {str(e)}")
             
             # El lote ya está almacenado, solo actualizar el estado final
+            batch.set_stage(None)
+            batch_progress_broker.publish_batch(batch)
             logger.info(f"[OK] Lote {batch.id} procesado completamente")
             logger.info(f"Estado final del lote: {batch.status}")
             logger.info(f"Total archivos procesados: {batch.total_files}")
@@ -972,6 +1256,7 @@ class UnifiedVectorizationService:
                 batch.fail_processing(str(e))
                 # Almacenar el lote fallido
                 self._batches[batch.id] = batch
+                batch_progress_broker.publish_batch(batch)
                 logger.info(f"[OK] Lote fallido {batch.id} almacenado en memoria")
                 return batch
             else:
@@ -990,8 +1275,70 @@ class UnifiedVectorizationService:
                 logger.info(f"[OK] Lote fallido {batch.id} creado y almacenado en memoria")
                 return batch
     
+    def _get_incremental_changes(self, state_repo, repo_name: str, repo_path: Path, config_id: str,
+                                 repo_type: str, branch: str, head_commit: str) -> Optional[Dict[str, List[str]]]:
+        """
+        Archivos añadidos/modificados/eliminados (rutas absolutas) desde el último
+        commit vectorizado, o None si hay que vectorizar el repositorio completo.
+        """
+        last_commit = state_repo.get_last_commit(config_id, repo_type, branch)
+        if not last_commit:
+            logger.info("Sin commit vectorizado previo, vectorización completa")
+            return None
+        if last_commit == head_commit:
+            logger.info(f"[OK] Sin cambios desde el commit vectorizado {head_commit[:8]}")
+            return {'added': [], 'modified': [], 'deleted': [], 'from_commit': last_commit}
+        
+        changes = self.repository_manager.get_changed_files(repo_name, last_commit, head_commit)
+        if changes is None:
+            return None
+        
+        result = {
+            kind: [str(repo_path / relative_path) for relative_path in paths
+                   if self.nsdk_service.is_nsdk_file(Path(relative_path).name)]
+            for kind, paths in changes.items()
+        }
+        result['from_commit'] = last_commit
+        return result
+    
+    async def _vectorize_changes(self, batch: VectorizationBatch, changes: Dict[str, Any], repo_path: str,
+                                 config_id: str, repo_type: str, branch: str, vector_embedding_repo,
+                                 job = None):
+        """Aplica a la BD solo los cambios del repositorio: borra los eliminados y vectoriza el resto"""
+        to_process = changes['added'] + changes['modified']
+        batch.metadata['incremental'] = {
+            'from_commit': changes['from_commit'],
+            'added': len(changes['added']),
+            'modified': len(changes['modified']),
+            'deleted': len(changes['deleted'])
+        }
+        logger.info(
+            f"Vectorización incremental: {len(changes['added'])} añadidos, "
+            f"{len(changes['modified'])} modificados, {len(changes['deleted'])} eliminados"
+        )
+        
+        if changes['deleted']:
+            # El vector store se actualiza en la sincronización incremental posterior
+            vector_embedding_repo.delete_by_file_paths(config_id, changes['deleted'])
+        
+        if to_process:
+            await self.nsdk_service.vectorize_repository(
+                repo_path,
+                batch,
+                config_id=config_id,
+                repo_type=repo_type,
+                branch=branch,
+                vector_embedding_repo=vector_embedding_repo,
+                file_paths=to_process,
+                job=job
+            )
+        else:
+            batch.start_processing()
+            batch.complete_processing()
+    
     async def vectorize_module(self, config_id: UUID, repo_type: str, module_path: str, 
-                               branch: str = 'main') -> VectorizationBatch:
+                               branch: str = 'main', batch: Optional[VectorizationBatch] = None,
+                               job = None) -> VectorizationBatch:
         """
         Vectoriza un módulo específico de un repositorio
         
@@ -1000,19 +1347,22 @@ class UnifiedVectorizationService:
             repo_type: Tipo de repositorio ('source', 'frontend', 'backend')
             module_path: Ruta del módulo a vectorizar
             branch: Rama del repositorio
+            batch: Lote ya creado (trabajos del motor de vectorización en segundo plano)
+            job: VectorizationJobHandle para persistir el progreso y atender la cancelación
             
         Returns:
             VectorizationBatch: Lote de vectorización del módulo
         """
         try:
             # Crear lote de vectorización
-            batch = VectorizationBatch(
-                name=f"Vectorización del módulo {module_path}",
-                batch_type=VectorizationBatchType.MODULE,
-                config_id=config_id,
-                repo_type=repo_type,
-                source_repo_branch=branch
-            )
+            if batch is None:
+                batch = VectorizationBatch(
+                    name=f"Vectorización del módulo {module_path}",
+                    batch_type=VectorizationBatchType.MODULE,
+                    config_id=config_id,
+                    repo_type=repo_type,
+                    source_repo_branch=branch
+                )
             
             # Obtener configuración de la base de datos
             # TODO: Implementar acceso al repositorio de configuraciones
@@ -1034,6 +1384,8 @@ class UnifiedVectorizationService:
             repo_token = repo_config.get('token')
             
             # Clonar o actualizar repositorio
+            batch.set_stage('cloning')
+            batch_progress_broker.publish_batch(batch)
             logger.info(f"Clonando/actualizando repositorio: {repo_url} (branch: {repo_branch})")
             repo_path = self.repository_manager.clone_repository(
                 repo_url, repo_name, repo_branch, repo_username, repo_token, False
@@ -1048,6 +1400,11 @@ class UnifiedVectorizationService:
                 batch.fail_processing(error_msg)
                 return batch
             
+            if job and job.is_cancelled():
+                logger.info(f"Lote {batch.id} cancelado antes de vectorizar")
+                batch.cancel_processing()
+                return batch
+            
             # Detectar tecnología del repositorio
             technology = self.technology_detector.detect_technology(str(repo_path))
             logger.info(f"Tecnología detectada: {technology}")
@@ -1055,7 +1412,23 @@ class UnifiedVectorizationService:
             # Delegar en el servicio especializado apropiado
             if technology == 'nsdk':
                 logger.info("Usando servicio NSDK para vectorización del módulo")
-                await self.nsdk_service.vectorize_module(str(repo_path), module_path, batch)
+                vector_embedding_repo = None
+                try:
+                    from ...infrastructure.repositories.vector_embedding_repository import VectorEmbeddingRepository
+                    from ...database import get_db
+                    vector_embedding_repo = VectorEmbeddingRepository(next(get_db()))
+                except Exception as e:
+                    logger.error(f"[ERROR] No se pudo inicializar repositorio de embeddings: {str(e)}")
+                # El pipeline NSDK recorre solo el directorio del módulo
+                await self.nsdk_service.vectorize_repository(
+                    str(module_full_path),
+                    batch,
+                    config_id=str(config_id),
+                    repo_type=repo_type,
+                    branch=repo_branch,
+                    vector_embedding_repo=vector_embedding_repo,
+                    job=job
+                )
             elif technology == 'angular':
                 logger.info("Usando servicio Angular para vectorización del módulo")
                 await self.angular_service.vectorize_module(str(repo_path), module_path, batch)
@@ -1068,6 +1441,8 @@ class UnifiedVectorizationService:
                 batch.fail_processing(f"Tecnología no reconocida: {technology}")
             
             # El lote ya está almacenado, solo actualizar el estado final
+            batch.set_stage(None)
+            batch_progress_broker.publish_batch(batch)
             logger.info(f"Lote de módulo {batch.id} procesado completamente")
             
             return batch
@@ -1199,11 +1574,8 @@ class UnifiedVectorizationService:
             if not query_embedding:
                 raise Exception("No se pudo obtener embedding de la consulta")
             
-            # Configuración por defecto para el vector store
-            config = {
-                'type': 'faiss',  # Por defecto FAISS
-                'collectionName': 'nsdk-embeddings'
-            }
+            # Configuración por defecto para el vector store (pgvector si está activo, si no FAISS)
+            config = self.vector_store_service.default_config()
             
             # Buscar en el vector store con threshold más bajo
             results = self.vector_store_service.search_similar(
@@ -1219,6 +1591,27 @@ class UnifiedVectorizationService:
             logger.error(f"Error en búsqueda de código similar: {str(e)}")
             return []
     
+    async def search_similar_code_batch(self, query_embeddings: List[List[float]],
+                                        limit: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Busca código similar para varias consultas ya vectorizadas.
+        
+        La búsqueda (una sola llamada a FAISS con todas las consultas) se ejecuta en
+        un hilo para no bloquear el event loop mientras se hacen otras consultas.
+        """
+        try:
+            config = self.vector_store_service.default_config()
+            return await asyncio.to_thread(
+                self.vector_store_service.search_similar_batch,
+                query_embeddings,
+                config,
+                limit=limit,
+                threshold=0.3  # Mismo threshold que search_similar_code
+            )
+        except Exception as e:
+            logger.error(f"Error en búsqueda de código similar: {str(e)}")
+            return [[] for _ in query_embeddings]
+    
     def get_batch_by_id(self, batch_id: str) -> Optional[VectorizationBatch]:
         """
         Obtiene un lote de vectorización por su ID
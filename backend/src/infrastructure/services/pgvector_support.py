@@ -0,0 +1,78 @@
+import os
+import logging
+from typing import Dict, List
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Tablas con columna embedding que admiten búsqueda en el servidor
+VECTOR_TABLES = ('vector_embeddings', 'nsdk_document_chunks')
+INDEX_METHODS = ('hnsw', 'ivfflat')
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def index_name(table: str, method: str) -> str:
+    return f"idx_{table}_embedding_{method}"
+
+
+def ensure_extension(conn):
+    """Crea la extensión pgvector si no existe"""
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+
+def create_vector_index(conn, table: str, method: str = None) -> str:
+    """
+    Crea el índice de similitud coseno de la columna embedding (HNSW o IVFFlat) y
+    elimina el del otro método si existía.
+
+    Parámetros por entorno: PGVECTOR_INDEX (hnsw | ivfflat), PGVECTOR_HNSW_M,
+    PGVECTOR_EF_CONSTRUCTION y PGVECTOR_IVF_LISTS.
+    """
+    method = (method or os.getenv('PGVECTOR_INDEX', 'hnsw')).lower()
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Método de índice pgvector no soportado: {method}")
+    if table not in VECTOR_TABLES:
+        raise ValueError(f"Tabla sin columna vectorial: {table}")
+
+    for other in INDEX_METHODS:
+        if other != method:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name(table, other)}"))
+
+    if method == 'hnsw':
+        options = (f"m = {_env_int('PGVECTOR_HNSW_M', 16)}, "
+                   f"ef_construction = {_env_int('PGVECTOR_EF_CONSTRUCTION', 64)}")
+    else:
+        # IVFFlat se entrena con los datos existentes: crear después de cargar los embeddings
+        options = f"lists = {_env_int('PGVECTOR_IVF_LISTS', 100)}"
+
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {index_name(table, method)} ON {table} "
+        f"USING {method} (embedding vector_cosine_ops) WITH ({options})"
+    ))
+    logger.info(f"[OK] Índice pgvector {method} disponible en {table}")
+    return index_name(table, method)
+
+
+def get_vector_indexes(conn, table: str) -> List[Dict[str, str]]:
+    """Índices vectoriales existentes sobre la tabla"""
+    rows = conn.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE tablename = :table AND indexdef ILIKE '%vector_cosine_ops%'"
+    ), {'table': table}).fetchall()
+    return [{'name': name, 'definition': definition} for name, definition in rows]
+
+
+def apply_search_params(db):
+    """
+    Ajusta la exhaustividad de la búsqueda aproximada para la transacción actual
+    (PGVECTOR_EF_SEARCH para HNSW, PGVECTOR_PROBES para IVFFlat).
+    """
+    db.execute(text(f"SET LOCAL hnsw.ef_search = {_env_int('PGVECTOR_EF_SEARCH', 40)}"))
+    db.execute(text(f"SET LOCAL ivfflat.probes = {_env_int('PGVECTOR_PROBES', 10)}"))
@@ -1,20 +1,23 @@
 import os
 import shutil
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Any, Optional
 from git import Repo, GitCommandError
 import logging
+from .file_info_cache import FileInfoCache
 
 logger = logging.getLogger(__name__)
 
 class RepositoryManagerService:
     """Servicio para gestionar repositorios clonados permanentemente"""
     
+    # Directorios que no se recorren al buscar ficheros NSDK
+    SCAN_SKIP_DIRS = {'.git'}
+    
     def __init__(self, repositories_dir: str = None):
         # Si no se especifica, usar ruta local para desarrollo
         if repositories_dir is None:
             # Detectar si estamos en Docker o en desarrollo local
-            import os
             if os.name == 'nt':  # Windows
                 # Desarrollo local en Windows
                 repositories_dir = str(Path.cwd() / "repositories")
@@ -27,6 +30,11 @@ class RepositoryManagerService:
         self.repositories_dir = Path(repositories_dir)
         self.repositories_dir.mkdir(parents=True, exist_ok=True)
         logger.info(f"Directorio de repositorios: {self.repositories_dir}")
+        
+        # Metadatos NSDK por fichero, reutilizados mientras no cambien tamaño ni mtime
+        self.file_info_cache = FileInfoCache(
+            os.getenv('FILE_INFO_CACHE_DIR') or self.repositories_dir / '.file_info_cache'
+        )
     
     def get_repository_path(self, repo_name: str) -> Path:
         """Obtiene la ruta del repositorio clonado"""
@@ -125,6 +133,68 @@ class RepositoryManagerService:
             logger.error(f"Error actualizando repositorio {repo_name}: {str(e)}")
             raise Exception(f"Error actualizando repositorio: {str(e)}")
     
+    def get_head_commit(self, repo_name: str) -> Optional[str]:
+        """SHA del commit actual (HEAD) del repositorio clonado"""
+        try:
+            if not self.is_repository_cloned(repo_name):
+                return None
+            return Repo(self.get_repository_path(repo_name)).head.commit.hexsha
+        except Exception as e:
+            logger.error(f"Error obteniendo HEAD del repositorio {repo_name}: {str(e)}")
+            return None
+    
+    def get_changed_files(self, repo_name: str, old_commit: str, new_commit: str = 'HEAD') -> Optional[Dict[str, List[str]]]:
+        """
+        Archivos cambiados entre dos commits (git diff --name-status).
+        
+        Los renombrados se devuelven como borrado de la ruta antigua y alta de la nueva.
+        
+        Returns:
+            {'added': [...], 'modified': [...], 'deleted': [...]} con rutas relativas al
+            repositorio, o None si el commit antiguo ya no está disponible (por ejemplo,
+            clon superficial o historia reescrita) y hay que procesar todo el repositorio
+        """
+        try:
+            repo = Repo(self.get_repository_path(repo_name))
+            try:
+                repo.git.cat_file('-e', f'{old_commit}^{{commit}}')
+            except GitCommandError:
+                logger.info(f"Commit {old_commit[:8]} no disponible en {repo_name}, se requiere vectorización completa")
+                return None
+            
+            changes = {'added': [], 'modified': [], 'deleted': []}
+            # Con -z las rutas no se entrecomillan (espacios, acentos) y los campos se separan con NUL
+            output = repo.git.diff('--name-status', '-M', '-z', f'{old_commit}..{new_commit}')
+            fields = iter(output.split('\0'))
+            for status in fields:
+                status = status[:1]
+                if not status:
+                    continue
+                if status == 'R' or status == 'C':
+                    old_path, new_path = next(fields), next(fields)
+                    if status == 'R':
+                        changes['deleted'].append(old_path)
+                    changes['added'].append(new_path)
+                elif status == 'A':
+                    changes['added'].append(next(fields))
+                elif status == 'M' or status == 'T':
+                    changes['modified'].append(next(fields))
+                elif status == 'D':
+                    changes['deleted'].append(next(fields))
+                else:
+                    next(fields)
+            
+            logger.info(
+                f"Cambios en {repo_name} ({old_commit[:8]}..{new_commit[:8]}): "
+                f"{len(changes['added'])} añadidos, {len(changes['modified'])} modificados, "
+                f"{len(changes['deleted'])} eliminados"
+            )
+            return changes
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo cambios del repositorio {repo_name}: {str(e)}")
+            return None
+    
     def get_repository_info(self, repo_name: str) -> Dict[str, Any]:
         """Obtiene información del repositorio"""
         try:
@@ -178,6 +248,7 @@ class RepositoryManagerService:
             
             logger.info(f"Eliminando repositorio: {repo_path}")
             shutil.rmtree(repo_path)
+            self.file_info_cache.invalidate(repo_name)
             logger.info(f"Repositorio {repo_name} eliminado exitosamente")
             return True
             
@@ -199,51 +270,32 @@ class RepositoryManagerService:
             
             modules = []
             
-            # Buscar archivos .NCL (módulos)
-            ncl_files = list(repo_path.rglob("*.NCL")) + list(repo_path.rglob("*.ncl"))
-            
-            for ncl_file in ncl_files:
-                try:
-                    # Leer contenido del archivo
-                    with open(ncl_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    # Extraer nombre del módulo
-                    module_name = self._extract_module_name(content, ncl_file.name)
-                    
-                    # Calcular estadísticas básicas
-                    lines = content.split('\n')
-                    line_count = len(lines)
-                    char_count = len(content)
-                    
-                    # Buscar funciones
-                    functions = self._extract_functions(content)
-                    
-                    # Crear estructura jerárquica
-                    relative_path = ncl_file.relative_to(repo_path)
-                    path_parts = relative_path.parts
-                    
-                    module_info = {
-                        'name': module_name,
-                        'file_path': str(relative_path),
-                        'file_name': ncl_file.name,
-                        'line_count': line_count,
-                        'char_count': char_count,
-                        'function_count': len(functions),
-                        'functions': functions[:10],  # Solo las primeras 10 funciones
-                        'size_kb': round(os.path.getsize(ncl_file) / 1024, 2),
-                        'path_parts': path_parts,  # Partes de la ruta para construir el árbol
-                        'depth': len(path_parts) - 1,  # Profundidad en el árbol
-                        'is_file': True,
-                        'type': 'module'
-                    }
-                    
-                    modules.append(module_info)
-                    
-                except Exception as e:
-                    logger.warning(f"Error procesando archivo {ncl_file}: {str(e)}")
+            # Buscar archivos .NCL (módulos) en un solo recorrido
+            for entry in self._iter_files(repo_path, ('.ncl',)):
+                info = self._get_cached_file_info(repo_name, repo_path, entry)
+                if not info:
                     continue
-            
+                
+                # Crear estructura jerárquica
+                relative_path = Path(entry.path).relative_to(repo_path)
+                path_parts = relative_path.parts
+                
+                modules.append({
+                    'name': info['module_name'],
+                    'file_path': str(relative_path),
+                    'file_name': entry.name,
+                    'line_count': info['line_count'],
+                    'char_count': info['char_count'],
+                    'function_count': info['function_count'],
+                    'functions': info['functions'],  # Solo las primeras 10 funciones
+                    'size_kb': info['size_kb'],
+                    'path_parts': path_parts,  # Partes de la ruta para construir el árbol
+                    'depth': len(path_parts) - 1,  # Profundidad en el árbol
+                    'is_file': True,
+                    'type': 'module'
+                })
+            
+            self.file_info_cache.save(repo_name)
             logger.info(f"Encontrados {len(modules)} módulos NSDK en {repo_name}")
             return modules
             
@@ -283,7 +335,8 @@ class RepositoryManagerService:
                 return None
             
             # Construir árbol solo para este directorio
-            directory_tree = self._build_tree_for_directory(full_path, directory_path)
+            directory_tree = self._build_tree_for_directory(repository_name, full_path)
+            self.file_info_cache.save(repository_name)
             logger.info(f"Contenido del directorio {directory_path} en {repository_name} cargado")
             return directory_tree
             
@@ -306,33 +359,33 @@ class RepositoryManagerService:
                 'dir_count': 0
             }
             
-            if path.is_dir():
+            if result['is_dir']:
                 # Solo contar archivos y directorios, no cargarlos
                 try:
-                    items = list(path.iterdir())
-                    result['file_count'] = len([item for item in items if item.is_file()])
-                    result['dir_count'] = len([item for item in items if item.is_dir()])
+                    entries = self._scan_directory(path)
+                    directories = [entry for entry in entries if entry.is_dir()]
+                    result['file_count'] = sum(1 for entry in entries if entry.is_file())
+                    result['dir_count'] = len(directories)
                     
                     # Solo agregar directorios como placeholder (sin contenido)
-                    for item in items:
-                        if item.is_dir():
-                            result['children'].append({
-                                'name': item.name,
-                                'path': str(item.relative_to(path.parents[-1])),
-                                'is_file': False,
-                                'is_dir': True,
-                                'depth': 1,
-                                'children': [],  # Vacío, se cargará cuando se expanda
-                                'type': 'directory',
-                                'file_count': 0,  # Se calculará cuando se expanda
-                                'dir_count': 0,   # Se calculará cuando se expanda
-                                'is_placeholder': True  # Marca que es un placeholder
-                            })
+                    for entry in directories:
+                        result['children'].append({
+                            'name': entry.name,
+                            'path': str(Path(entry.path).relative_to(path.parents[-1])),
+                            'is_file': False,
+                            'is_dir': True,
+                            'depth': 1,
+                            'children': [],  # Vacío, se cargará cuando se expanda
+                            'type': 'directory',
+                            'file_count': 0,  # Se calculará cuando se expanda
+                            'dir_count': 0,   # Se calculará cuando se expanda
+                            'is_placeholder': True  # Marca que es un placeholder
+                        })
                 except PermissionError:
                     logger.warning(f"Sin permisos para acceder a {path}")
                     result['children'] = []
                     
-            elif path.is_file():
+            elif result['is_file']:
                 # Para archivos, obtener información básica
                 file_info = self._get_nsdk_file_info(path)
                 result.update(file_info)
@@ -352,74 +405,70 @@ class RepositoryManagerService:
                 'error': str(e)
             }
 
-    def _build_tree_for_directory(self, path: Path, relative_path: str) -> List[Dict[str, Any]]:
-        """Construye el árbol solo para un directorio específico"""
+    def _build_tree_for_directory(self, repository_name: str, path: Path) -> List[Dict[str, Any]]:
+        """
+        Construye el árbol solo para un directorio específico
+        
+        Usa os.scandir, cuyas entradas ya indican si son fichero o directorio sin
+        un stat adicional, y los metadatos NSDK de la caché por fichero.
+        """
+        repo_path = self.get_repository_path(repository_name)
+        
+        def relative(entry_path: str) -> str:
+            try:
+                return str(Path(entry_path).relative_to(repo_path))
+            except ValueError:
+                # Si no se puede calcular la ruta relativa, usar la ruta completa
+                return entry_path
+        
         try:
             children = []
             
             try:
-                items = list(path.iterdir())
-                for item in items:
-                    # Calcular la ruta relativa correctamente
-                    try:
-                        # Usar la ruta del repositorio como base para calcular la ruta relativa
-                        repo_path = self.get_repository_path(path.parts[-2])  # Obtener el nombre del repo
-                        if repo_path and repo_path.exists():
-                            relative_item_path = str(item.relative_to(repo_path))
-                        else:
-                            # Fallback: usar la ruta del directorio actual
-                            relative_item_path = str(item.relative_to(path.parent))
-                    except ValueError:
-                        # Si no se puede calcular la ruta relativa, usar la ruta completa
-                        relative_item_path = str(item)
-                    
+                for entry in self._scan_directory(path):
+                    is_dir = entry.is_dir()
+                    is_file = entry.is_file()
                     child = {
-                        'name': item.name,
-                        'path': relative_item_path,
-                        'is_file': item.is_file(),
-                        'is_dir': item.is_dir(),
+                        'name': entry.name,
+                        'path': relative(entry.path),
+                        'is_file': is_file,
+                        'is_dir': is_dir,
                         'depth': 1,  # Profundidad fija para este nivel
                         'children': [],
-                        'type': self._get_file_type(item),
+                        'type': self._get_file_type(Path(entry.name)),
                         'file_count': 0,
                         'dir_count': 0
                     }
                     
-                    if item.is_dir():
+                    if is_dir:
                         # Para directorios, contar archivos y subdirectorios
                         try:
-                            sub_items = list(item.iterdir())
-                            child['file_count'] = len([sub_item for sub_item in sub_items if sub_item.is_file()])
-                            child['dir_count'] = len([sub_item for sub_item in sub_items if sub_item.is_dir()])
+                            sub_entries = self._scan_directory(Path(entry.path))
+                            sub_directories = [sub_entry for sub_entry in sub_entries if sub_entry.is_dir()]
+                            child['file_count'] = sum(1 for sub_entry in sub_entries if sub_entry.is_file())
+                            child['dir_count'] = len(sub_directories)
                             
                             # Agregar subdirectorios como placeholder
-                            for sub_item in sub_items:
-                                if sub_item.is_dir():
-                                    try:
-                                        sub_relative_path = str(sub_item.relative_to(repo_path)) if repo_path else str(sub_item)
-                                    except ValueError:
-                                        sub_relative_path = str(sub_item)
-                                        
-                                    child['children'].append({
-                                        'name': sub_item.name,
-                                        'path': sub_relative_path,
-                                        'is_file': False,
-                                        'is_dir': True,
-                                        'depth': 2,
-                                        'children': [],
-                                        'type': 'directory',
-                                        'file_count': 0,
-                                        'dir_count': 0,
-                                        'is_placeholder': True
-                                    })
+                            for sub_entry in sub_directories:
+                                child['children'].append({
+                                    'name': sub_entry.name,
+                                    'path': relative(sub_entry.path),
+                                    'is_file': False,
+                                    'is_dir': True,
+                                    'depth': 2,
+                                    'children': [],
+                                    'type': 'directory',
+                                    'file_count': 0,
+                                    'dir_count': 0,
+                                    'is_placeholder': True
+                                })
                         except PermissionError:
-                            logger.warning(f"Sin permisos para acceder a {item}")
+                            logger.warning(f"Sin permisos para acceder a {entry.path}")
                             child['children'] = []
                             
-                    elif item.is_file():
+                    elif is_file:
                         # Para archivos, obtener información NSDK
-                        file_info = self._get_nsdk_file_info(item)
-                        child.update(file_info)
+                        child.update(self._get_cached_file_info(repository_name, repo_path, entry))
                     
                     children.append(child)
                     
@@ -433,6 +482,48 @@ class RepositoryManagerService:
             logger.error(f"Error construyendo árbol para directorio {path}: {str(e)}")
             return []
     
+    @staticmethod
+    def _scan_directory(path: Path) -> List[os.DirEntry]:
+        """Entradas de un directorio con os.scandir"""
+        with os.scandir(path) as entries:
+            return list(entries)
+    
+    def _iter_files(self, root: Path, suffixes: Iterable[str]) -> Iterator[os.DirEntry]:
+        """
+        Recorre el árbol una sola vez con os.scandir y genera los ficheros cuya
+        extensión (sin distinguir mayúsculas) está en `suffixes`
+        """
+        suffixes = {suffix.lower() for suffix in suffixes}
+        pending = [str(root)]
+        while pending:
+            current = pending.pop()
+            try:
+                entries = self._scan_directory(Path(current))
+            except PermissionError:
+                logger.warning(f"Sin permisos para acceder a {current}")
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.SCAN_SKIP_DIRS:
+                        pending.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in suffixes:
+                    yield entry
+    
+    def _get_cached_file_info(self, repo_name: str, repo_path: Path, entry: os.DirEntry) -> Dict[str, Any]:
+        """Información NSDK del fichero, desde la caché si no ha cambiado su tamaño ni su mtime"""
+        try:
+            stat = entry.stat()
+        except OSError as e:
+            logger.warning(f"Error obteniendo información del archivo {entry.path}: {str(e)}")
+            return {}
+        relative_path = os.path.relpath(entry.path, repo_path)
+        info = self.file_info_cache.get(repo_name, relative_path, stat.st_size, stat.st_mtime_ns)
+        if info is None:
+            info = self._get_nsdk_file_info(Path(entry.path), stat.st_size)
+            if info:
+                self.file_info_cache.put(repo_name, relative_path, stat.st_size, stat.st_mtime_ns, info)
+        return info
+    
     def _get_file_type(self, file_path: Path) -> str:
         """Determina el tipo de archivo"""
         suffix = file_path.suffix.lower()
@@ -451,8 +542,8 @@ class RepositoryManagerService:
         else:
             return 'other'
     
-    def _get_nsdk_file_info(self, file_path: Path) -> Dict[str, Any]:
-        """Obtiene información específica de archivos NSDK"""
+    def _get_nsdk_file_info(self, file_path: Path, size: Optional[int] = None) -> Dict[str, Any]:
+        """Obtiene información específica de archivos NSDK (size: tamaño ya conocido, evita otro stat)"""
         try:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
@@ -464,7 +555,7 @@ class RepositoryManagerService:
             info = {
                 'line_count': line_count,
                 'char_count': char_count,
-                'size_kb': round(file_path.stat().st_size / 1024, 2)
+                'size_kb': round((file_path.stat().st_size if size is None else size) / 1024, 2)
             }
             
             # Información específica según el tipo
@@ -600,46 +691,26 @@ class RepositoryManagerService:
             
             screens = []
             
-            # Buscar archivos .SCR (pantallas)
-            scr_files = list(repo_path.rglob("*.SCR")) + list(repo_path.rglob("*.scr"))
-            
-            for scr_file in scr_files:
-                try:
-                    # Leer contenido del archivo
-                    with open(scr_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    # Extraer nombre de la pantalla
-                    screen_name = self._extract_screen_name(content, scr_file.name)
-                    
-                    # Calcular estadísticas básicas
-                    lines = content.split('\n')
-                    line_count = len(lines)
-                    char_count = len(content)
-                    
-                    # Buscar campos y botones
-                    fields = self._extract_fields(content)
-                    buttons = self._extract_buttons(content)
-                    
-                    screen_info = {
-                        'name': screen_name,
-                        'file_path': str(scr_file.relative_to(repo_path)),
-                        'file_name': scr_file.name,
-                        'line_count': line_count,
-                        'char_count': char_count,
-                        'field_count': len(fields),
-                        'fields': fields[:10],  # Solo los primeros 10 campos
-                        'button_count': len(buttons),
-                        'buttons': buttons[:10],  # Solo los primeros 10 botones
-                        'size_kb': round(os.path.getsize(scr_file) / 1024, 2)
-                    }
-                    
-                    screens.append(screen_info)
-                    
-                except Exception as e:
-                    logger.warning(f"Error procesando archivo {scr_file}: {str(e)}")
+            # Buscar archivos .SCR (pantallas) en un solo recorrido
+            for entry in self._iter_files(repo_path, ('.scr',)):
+                info = self._get_cached_file_info(repo_name, repo_path, entry)
+                if not info:
                     continue
-            
+                
+                screens.append({
+                    'name': info['screen_name'],
+                    'file_path': str(Path(entry.path).relative_to(repo_path)),
+                    'file_name': entry.name,
+                    'line_count': info['line_count'],
+                    'char_count': info['char_count'],
+                    'field_count': info['field_count'],
+                    'fields': info['fields'],  # Solo los primeros 10 campos
+                    'button_count': info['button_count'],
+                    'buttons': info['buttons'],  # Solo los primeros 10 botones
+                    'size_kb': info['size_kb']
+                })
+            
+            self.file_info_cache.save(repo_name)
             logger.info(f"Encontradas {len(screens)} pantallas NSDK en {repo_name}")
             return screens
             
@@ -1,16 +1,30 @@
+import os
+import gzip
 import httpx
 import json
 import numpy as np
+from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
+from .http_client_pool import http_client_pool
+from ...database_types import pgvector_enabled
+
 logger = logging.getLogger(__name__)
 
 class VectorStoreServiceImpl:
+    # Versión del formato de los snapshots FAISS en disco
+    FAISS_SNAPSHOT_VERSION = 2
+    # Tipos de índice FAISS soportados (además de 'auto')
+    FAISS_INDEX_TYPES = ('flat', 'hnsw', 'ivf_flat', 'ivf_pq', 'sq8')
+    
     def __init__(self):
         self.collections = {}
         self.faiss_index = None
-        self.faiss_metadata = []
+        self.faiss_metadata: Dict[int, Dict[str, Any]] = {}  # ID FAISS -> metadatos
+        self.faiss_index_dir = os.getenv('FAISS_INDEX_DIR', './vector_store')
+        self.faiss_mmap = os.getenv('FAISS_MMAP', 'true').lower() == 'true'
+        self.faiss_index_mmapped = False
     
     @staticmethod
     def test_connection(config: dict) -> (bool, str):
@@ -38,6 +52,10 @@ class VectorStoreServiceImpl:
         elif tipo == 'faiss':
             # FAISS es local, solo comprobamos el tipo
             return True, 'FAISS configurado (local)'
+        elif tipo == 'pgvector':
+            if not pgvector_enabled():
+                return False, 'pgvector requiere PostgreSQL y PGVECTOR_ENABLED=true'
+            return True, 'pgvector configurado (búsqueda en la base de datos)'
         else:
             return False, 'Tipo de Vector Store no soportado o no especificado'
     
@@ -53,6 +71,8 @@ class VectorStoreServiceImpl:
                 return self._init_chroma_collection(config, collection_name)
             elif tipo == 'faiss':
                 return self._init_faiss_collection(config, collection_name)
+            elif tipo == 'pgvector':
+                return self._init_pgvector_collection(config, collection_name)
             else:
                 logger.error(f"Tipo de vector store no soportado: {tipo}")
                 return False
@@ -75,6 +95,10 @@ class VectorStoreServiceImpl:
                 return self._clear_chroma_collection(config, collection_name)
             elif tipo == 'faiss':
                 return self._clear_faiss_collection(config, collection_name)
+            elif tipo == 'pgvector':
+                # Los vectores son las filas de vector_embeddings: se borran con sus repositorios
+                logger.info("pgvector no mantiene una copia de los embeddings, nada que limpiar")
+                return True
             else:
                 logger.error(f"Tipo de vector store no soportado para limpieza: {tipo}")
                 return False
@@ -98,7 +122,7 @@ class VectorStoreServiceImpl:
                 }
             }
             
-            resp = httpx.post(
+            resp = http_client_pool.get_sync_client('qdrant').post(
                 f'{url}/collections/{collection_name}',
                 json=collection_data,
                 timeout=10
@@ -121,7 +145,7 @@ class VectorStoreServiceImpl:
             url = config.get('connectionString', 'http://localhost:8000')
             
             # Chroma crea colecciones automáticamente
-            resp = httpx.get(f'{url}/api/v1/collections', timeout=5)
+            resp = http_client_pool.get_sync_client('chroma').get(f'{url}/api/v1/collections', timeout=5)
             
             if resp.status_code == 200:
                 logger.info(f"Colección Chroma '{collection_name}' inicializada")
@@ -146,11 +170,20 @@ class VectorStoreServiceImpl:
                 logger.error("FAISS no está instalado. Instala con: pip install faiss-cpu")
                 return False
             
-            # Crear índice FAISS
-            self.faiss_index = faiss.IndexFlatIP(dimension)  # Inner Product para similitud coseno
-            self.faiss_metadata = []
+            # Tipo de índice: explícito en la configuración o automático según el tamaño del corpus
+            settings = self._resolve_faiss_settings(config)
+            expected_size = config.get('expectedSize', 0)
+            if settings['index_type'] == 'auto':
+                settings['index_type'] = self.choose_faiss_index_type(expected_size)
+            
+            # Crear índice FAISS (producto interno para similitud coseno)
+            self.faiss_index = self.build_faiss_index(dimension, settings, expected_size)
+            self.faiss_index_mmapped = False
+            self.faiss_metadata = {}
+            self.collections[collection_name] = {**settings, 'dimension': dimension}
             
-            logger.info(f"Colección FAISS '{collection_name}' inicializada con dimensión {dimension}")
+            logger.info(f"Colección FAISS '{collection_name}' inicializada con dimensión {dimension} "
+                        f"e índice {settings['index_type']}")
             return True
             
         except Exception as e:
@@ -170,6 +203,9 @@ class VectorStoreServiceImpl:
                 return self._add_chroma_embeddings(config, collection_name, embeddings, metadata, ids)
             elif tipo == 'faiss':
                 return self._add_faiss_embeddings(config, collection_name, embeddings, metadata, ids)
+            elif tipo == 'pgvector':
+                # Los embeddings ya están en vector_embeddings, que es la propia colección
+                return True
             else:
                 logger.error(f"Tipo de vector store no soportado: {tipo}")
                 return False
@@ -205,7 +241,7 @@ class VectorStoreServiceImpl:
             for i in range(0, len(points), batch_size):
                 batch = points[i:i + batch_size]
                 
-                resp = httpx.put(
+                resp = http_client_pool.get_sync_client('qdrant').put(
                     f'{url}/collections/{collection_name}/points',
                     json={"points": batch},
                     timeout=30
@@ -243,7 +279,7 @@ class VectorStoreServiceImpl:
             }
             
             # Añadir embeddings
-            resp = httpx.post(
+            resp = http_client_pool.get_sync_client('chroma').post(
                 f'{url}/api/v1/collections/{collection_name}/add',
                 json=chroma_data,
                 timeout=30
@@ -284,7 +320,7 @@ class VectorStoreServiceImpl:
                     logger.warning(f"Embedding con longitud incorrecta: {len(emb)} vs {embedding_length}")
                     # Rellenar o truncar si es necesario
                     if len(emb) < embedding_length:
-                        emb = emb + [0.0] * (embedding_length - len(emb))
+                        emb = list(emb) + [0.0] * (embedding_length - len(emb))
                     else:
                         emb = emb[:embedding_length]
                 normalized_embeddings.append(emb)
@@ -293,19 +329,28 @@ class VectorStoreServiceImpl:
             logger.info(f"Shape del array: {embeddings_array.shape}")
             logger.info(f"Tipo de datos: {embeddings_array.dtype}")
             
+            if not ids:
+                import uuid
+                ids = [str(uuid.uuid4()) for _ in embeddings]
+            faiss_ids = np.array([self._faiss_id(point_id) for point_id in ids], dtype=np.int64)
+            
+            self._ensure_faiss_writable()
+            self._train_faiss_index_if_needed(collection_name, embeddings_array)
+            
+            # Upsert: los IDs que ya están en el índice se sustituyen
+            existing_ids = [faiss_id for faiss_id in faiss_ids.tolist() if faiss_id in self.faiss_metadata]
+            if existing_ids and not self._remove_faiss_ids(existing_ids):
+                return False
+            
             # Añadir al índice FAISS
             logger.info("Añadiendo embeddings al índice FAISS...")
-            self.faiss_index.add(embeddings_array)
+            self.faiss_index.add_with_ids(embeddings_array, faiss_ids)
             logger.info("Embeddings añadidos exitosamente al índice FAISS")
             
             # Añadir metadatos
-            if not ids:
-                import uuid
-                ids = [str(uuid.uuid4()) for _ in embeddings]
-            
-            for meta, point_id in zip(metadata, ids):
+            for meta, point_id, faiss_id in zip(metadata, ids, faiss_ids.tolist()):
                 meta['id'] = point_id
-                self.faiss_metadata.append(meta)
+                self.faiss_metadata[faiss_id] = meta
             
             logger.info(f"Añadidos {len(embeddings)} embeddings a FAISS")
             return True
@@ -329,6 +374,8 @@ class VectorStoreServiceImpl:
                 return self._search_chroma_similar(config, collection_name, query_embedding, limit, threshold)
             elif tipo == 'faiss':
                 return self._search_faiss_similar(config, collection_name, query_embedding, limit, threshold)
+            elif tipo == 'pgvector':
+                return self._search_pgvector_similar(config, query_embedding, limit, threshold)
             else:
                 logger.error(f"Tipo de vector store no soportado: {tipo}")
                 return []
@@ -350,7 +397,7 @@ class VectorStoreServiceImpl:
                 "with_payload": True
             }
             
-            resp = httpx.post(
+            resp = http_client_pool.get_sync_client('qdrant').post(
                 f'{url}/collections/{collection_name}/search',
                 json=search_data,
                 timeout=10
@@ -387,7 +434,7 @@ class VectorStoreServiceImpl:
                 "where_document": {}
             }
             
-            resp = httpx.post(
+            resp = http_client_pool.get_sync_client('chroma').post(
                 f'{url}/api/v1/collections/{collection_name}/query',
                 json=search_data,
                 timeout=10
@@ -411,45 +458,71 @@ class VectorStoreServiceImpl:
             logger.error(f"Error en búsqueda Chroma: {str(e)}")
             return []
     
+    def search_similar_batch(self, query_embeddings: List[List[float]], config: dict,
+                             limit: int = 10, threshold: float = 0.7) -> List[List[Dict[str, Any]]]:
+        """
+        Busca embeddings similares para varias consultas a la vez.
+        
+        En FAISS todas las consultas van en una sola llamada a search (una fila por
+        consulta); en el resto de vector stores se busca consulta a consulta.
+        
+        Returns:
+            Una lista de resultados por consulta, en el mismo orden
+        """
+        if not query_embeddings:
+            return []
+        if config.get('type') == 'faiss':
+            collection_name = config.get('collectionName', 'nsdk-embeddings')
+            return self._search_faiss_similar_batch(config, collection_name, query_embeddings, limit, threshold)
+        return [self.search_similar(query_embedding, config, limit=limit, threshold=threshold)
+                for query_embedding in query_embeddings]
+    
     def _search_faiss_similar(self, config: dict, collection_name: str, 
                               query_embedding: List[float], limit: int, threshold: float) -> List[Dict[str, Any]]:
         """Busca similares en FAISS"""
+        return self._search_faiss_similar_batch(config, collection_name, [query_embedding], limit, threshold)[0]
+    
+    def _search_faiss_similar_batch(self, config: dict, collection_name: str, query_embeddings: List[List[float]],
+                                    limit: int, threshold: float) -> List[List[Dict[str, Any]]]:
+        """Busca similares en FAISS con una matriz de consultas (una fila por consulta)"""
         try:
-            logger.info(f"Buscando en FAISS - Query embedding length: {len(query_embedding)}")
+            logger.info(f"Buscando en FAISS - {len(query_embeddings)} consultas de dimensión {len(query_embeddings[0])}")
             logger.info(f"FAISS index inicializado: {self.faiss_index is not None}")
             logger.info(f"FAISS metadata count: {len(self.faiss_metadata) if self.faiss_metadata else 0}")
             
             if not self.faiss_index or not self.faiss_metadata:
                 logger.error("Índice FAISS no inicializado o sin datos")
-                return []
+                return [[] for _ in query_embeddings]
             
-            # Convertir query a numpy array
-            query_array = np.array([query_embedding], dtype=np.float32)
+            # Convertir las consultas a una matriz numpy
+            query_array = np.array(query_embeddings, dtype=np.float32)
+            
+            # Parámetros de búsqueda de índices aproximados (nprobe / efSearch)
+            self._apply_faiss_search_params(collection_name, config)
             
             # Buscar en FAISS
             logger.info(f"Ejecutando búsqueda FAISS con limit={limit}, threshold={threshold}")
             scores, indices = self.faiss_index.search(query_array, limit)
-            logger.info(f"FAISS search results - scores: {scores[0][:5]}, indices: {indices[0][:5]}")
             
-            results = []
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                logger.info(f"Resultado {i}: score={score}, idx={idx}, threshold={threshold}")
-                if score >= threshold and idx < len(self.faiss_metadata):
-                    metadata = self.faiss_metadata[idx].copy()
-                    metadata['score'] = float(score)
-                    results.append(metadata)
-                    logger.info(f"Añadido resultado: {metadata.get('file_name', 'unknown')}")
-                else:
-                    logger.info(f"Resultado descartado: score={score} < threshold={threshold} o idx={idx} >= {len(self.faiss_metadata)}")
+            all_results = []
+            for row_scores, row_indices in zip(scores, indices):
+                results = []
+                for score, idx in zip(row_scores, row_indices):
+                    # Los índices aproximados devuelven -1 cuando no hay suficientes candidatos
+                    if score >= threshold and int(idx) in self.faiss_metadata:
+                        metadata = self.faiss_metadata[int(idx)].copy()
+                        metadata['score'] = float(score)
+                        results.append(metadata)
+                all_results.append(results)
             
-            logger.info(f"Total resultados finales: {len(results)}")
-            return results
+            logger.info(f"Total resultados finales: {[len(results) for results in all_results]}")
+            return all_results
             
         except Exception as e:
             logger.error(f"Error en búsqueda FAISS: {str(e)}")
             import traceback
             logger.error(f"Traceback completo: {traceback.format_exc()}")
-            return []
+            return [[] for _ in query_embeddings]
     
     def get_collection_stats(self, config: dict, collection_name: str = None) -> Dict[str, Any]:
         """Obtiene estadísticas de la colección"""
@@ -463,6 +536,8 @@ class VectorStoreServiceImpl:
                 return self._get_chroma_stats(config, collection_name)
             elif tipo == 'faiss':
                 return self._get_faiss_stats(config, collection_name)
+            elif tipo == 'pgvector':
+                return self._get_pgvector_stats(collection_name)
             else:
                 return {'error': f'Tipo no soportado: {tipo}'}
                 
@@ -475,7 +550,7 @@ class VectorStoreServiceImpl:
         try:
             url = config.get('connectionString', 'http://localhost:6333')
             
-            resp = httpx.get(f'{url}/collections/{collection_name}', timeout=5)
+            resp = http_client_pool.get_sync_client('qdrant').get(f'{url}/collections/{collection_name}', timeout=5)
             
             if resp.status_code == 200:
                 collection_info = resp.json()['result']
@@ -497,7 +572,7 @@ class VectorStoreServiceImpl:
         try:
             url = config.get('connectionString', 'http://localhost:8000')
             
-            resp = httpx.get(f'{url}/api/v1/collections/{collection_name}/count', timeout=5)
+            resp = http_client_pool.get_sync_client('chroma').get(f'{url}/api/v1/collections/{collection_name}/count', timeout=5)
             
             if resp.status_code == 200:
                 count_info = resp.json()
@@ -523,19 +598,96 @@ class VectorStoreServiceImpl:
                 'name': collection_name,
                 'vectors_count': self.faiss_index.ntotal,
                 'dimension': self.faiss_index.d,
-                'metadata_count': len(self.faiss_metadata)
+                'metadata_count': len(self.faiss_metadata),
+                'index_type': self.collections.get(collection_name, {}).get('index_type', 'unknown')
             }
             
         except Exception as e:
             return {'error': str(e)}
     
+    @staticmethod
+    def default_config() -> Dict[str, Any]:
+        """Vector store de los embeddings de código: pgvector si está activo, si no FAISS"""
+        return {
+            'type': 'pgvector' if pgvector_enabled() else 'faiss',
+            'collectionName': 'nsdk-embeddings'
+        }
+    
+    @staticmethod
+    def _get_db_session():
+        from ...database import SessionLocal
+        return SessionLocal()
+    
+    def _init_pgvector_collection(self, config: dict, collection_name: str) -> bool:
+        """Comprueba la extensión pgvector y crea el índice vectorial de vector_embeddings"""
+        if not pgvector_enabled():
+            logger.error("pgvector requiere PostgreSQL y PGVECTOR_ENABLED=true")
+            return False
+        from .pgvector_support import ensure_extension, create_vector_index
+        from ...database import engine
+        with engine.begin() as conn:
+            ensure_extension(conn)
+            create_vector_index(conn, 'vector_embeddings', config.get('indexMethod'))
+        self.collections[collection_name] = {'index_type': 'pgvector'}
+        return True
+    
+    def _search_pgvector_similar(self, config: dict, query_embedding: List[float],
+                                 limit: int, threshold: float) -> List[Dict[str, Any]]:
+        """Busca similares en PostgreSQL con el operador <=> de pgvector"""
+        from ..repositories.vector_embedding_repository import VectorEmbeddingRepository
+        db = self._get_db_session()
+        try:
+            matches = VectorEmbeddingRepository(db).search_similar(
+                query_embedding, limit=limit, threshold=threshold, config_id=config.get('configId')
+            )
+            results = []
+            for embedding, score in matches:
+                # Mismo formato que los resultados de FAISS
+                results.append({
+                    'id': embedding.id,
+                    'file_path': embedding.file_path,
+                    'file_name': embedding.file_name,
+                    'file_type': embedding.file_type,
+                    'content_hash': embedding.content_hash,
+                    'config_id': embedding.config_id,
+                    'repo_type': embedding.repo_type,
+                    'repo_branch': embedding.repo_branch,
+                    'created_at': embedding.created_at.isoformat() if embedding.created_at else None,
+                    'updated_at': embedding.updated_at.isoformat() if embedding.updated_at else None,
+                    'file_metadata': embedding.file_metadata or {},
+                    'score': float(score)
+                })
+            logger.info(f"Total resultados pgvector: {len(results)}")
+            return results
+        finally:
+            db.close()
+    
+    def _get_pgvector_stats(self, collection_name: str) -> Dict[str, Any]:
+        """Obtiene estadísticas de pgvector"""
+        try:
+            from sqlalchemy import func
+            from .pgvector_support import get_vector_indexes
+            from ...domain.entities.vector_embedding import VectorEmbedding
+            db = self._get_db_session()
+            try:
+                return {
+                    'type': 'pgvector',
+                    'name': collection_name,
+                    'vectors_count': db.query(func.count(VectorEmbedding.id)).scalar() or 0,
+                    'indexes': get_vector_indexes(db, 'vector_embeddings')
+                }
+            finally:
+                db.close()
+        except Exception as e:
+            return {'error': str(e)}
+    
     def _clear_qdrant_collection(self, config: dict, collection_name: str) -> bool:
         """Limpia completamente una colección de Qdrant"""
         try:
             url = config.get('connectionString', 'http://localhost:6333')
             
             # Eliminar todos los puntos de la colección
-            resp = httpx.post(
+            resp = http_client_pool.get_sync_client('qdrant').post(
                 f'{url}/collections/{collection_name}/points/delete',
                 json={"filter": {}},  # Filtro vacío = eliminar todo
                 timeout=10
@@ -558,7 +710,7 @@ class VectorStoreServiceImpl:
             url = config.get('connectionString', 'http://localhost:8000')
             
             # Eliminar todos los documentos de la colección
-            resp = httpx.delete(
+            resp = http_client_pool.get_sync_client('chroma').delete(
                 f'{url}/api/v1/collections/{collection_name}/delete',
                 timeout=10
             )
@@ -579,11 +731,304 @@ class VectorStoreServiceImpl:
         try:
             # Reinicializar índices y metadatos
             self.faiss_index = None
-            self.faiss_metadata = []
+            self.faiss_metadata = {}
+            self.delete_faiss_snapshot(collection_name)
             
             logger.info(f"Colección FAISS '{collection_name}' limpiada exitosamente")
             return True
             
         except Exception as e:
             logger.error(f"Error limpiando colección FAISS: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _resolve_faiss_settings(self, config: dict) -> Dict[str, Any]:
+        """
+        Combina los ajustes del índice FAISS de la configuración de la colección con
+        los valores por defecto (variables de entorno FAISS_*).
+        """
+        index_type = str(config.get('indexType', os.getenv('FAISS_INDEX_TYPE', 'auto'))).lower()
+        if index_type != 'auto' and index_type not in self.FAISS_INDEX_TYPES:
+            logger.warning(f"Tipo de índice FAISS desconocido '{index_type}', usando 'auto'")
+            index_type = 'auto'
+        return {
+            'index_type': index_type,
+            'nlist': config.get('nlist'),
+            'nprobe': int(config.get('nprobe', os.getenv('FAISS_NPROBE', 16))),
+            'hnsw_m': int(config.get('hnswM', os.getenv('FAISS_HNSW_M', 32))),
+            'ef_construction': int(config.get('efConstruction', os.getenv('FAISS_EF_CONSTRUCTION', 80))),
+            'ef_search': int(config.get('efSearch', os.getenv('FAISS_EF_SEARCH', 64))),
+            'pq_m': config.get('pqM'),
+            'pq_bits': int(config.get('pqBits', 8))
+        }
+    
+    @staticmethod
+    def choose_faiss_index_type(expected_size: int) -> str:
+        """
+        Elige el tipo de índice según el tamaño del corpus:
+        exacto para colecciones pequeñas, IVF-Flat hasta ~1M e IVF-PQ por
+        encima (memoria acotada). No elige HNSW porque no admite remove_ids y
+        la sincronización incremental tendría que reconstruir el índice entero
+        cada vez que se modifica o elimina un fichero.
+        """
+        if expected_size < 10000:
+            return 'flat'
+        if expected_size < 1000000:
+            return 'ivf_flat'
+        return 'ivf_pq'
+    
+    @staticmethod
+    def _default_nlist(expected_size: int) -> int:
+        """Número de listas IVF: ~4*sqrt(n), con al menos 39 vectores de entrenamiento por lista"""
+        import math
+        if expected_size < 39:
+            return 1
+        return max(1, min(int(4 * math.sqrt(expected_size)), expected_size // 39))
+    
+    @staticmethod
+    def _default_pq_m(dimension: int) -> int:
+        """Número de subcuantizadores PQ: el mayor divisor razonable de la dimensión"""
+        for m in (64, 48, 32, 16, 8, 4, 2):
+            if dimension % m == 0:
+                return m
+        return 1
+    
+    def build_faiss_index(self, dimension: int, settings: Dict[str, Any], expected_size: int = 0):
+        """
+        Construye un índice FAISS vacío del tipo indicado en settings['index_type']
+        ('flat', 'hnsw', 'ivf_flat', 'ivf_pq', 'sq8'), siempre con producto interno
+        y envuelto en IndexIDMap2 (los vectores se añaden con add_with_ids).
+        """
+        import faiss
+        
+        index_type = settings.get('index_type', 'flat')
+        nlist = settings.get('nlist') or self._default_nlist(expected_size)
+        
+        if index_type == 'hnsw':
+            description = f"HNSW{settings.get('hnsw_m', 32)},Flat"
+        elif index_type == 'ivf_flat':
+            description = f"IVF{nlist},Flat"
+        elif index_type == 'ivf_pq':
+            pq_m = settings.get('pq_m') or self._default_pq_m(dimension)
+            description = f"IVF{nlist},PQ{pq_m}x{settings.get('pq_bits', 8)}"
+        elif index_type == 'sq8':
+            description = "SQ8"
+        else:
+            description = "Flat"
+        
+        base_index = faiss.index_factory(dimension, description, faiss.METRIC_INNER_PRODUCT)
+        if index_type == 'hnsw':
+            faiss.downcast_index(base_index).hnsw.efConstruction = settings.get('ef_construction', 80)
+        
+        # IndexIDMap2 asocia cada vector al ID del embedding en BD, lo que permite
+        # actualizar y eliminar vectores concretos en la sincronización incremental
+        index = faiss.IndexIDMap2(base_index)
+        
+        logger.info(f"Índice FAISS creado: IDMap2,{description} (dimensión {dimension})")
+        return index
+    
+    def _train_faiss_index_if_needed(self, collection_name: str, vectors: np.ndarray):
+        """
+        Entrena los índices que lo requieren (IVF, PQ, SQ) con los vectores a añadir.
+        Si no hay suficientes vectores para entrenar, se sustituye por un índice exacto.
+        """
+        if self.faiss_index.is_trained:
+            return
+        
+        settings = self.collections.get(collection_name, {})
+        index_type = settings.get('index_type', 'flat')
+        min_vectors = 1
+        if index_type in ('ivf_flat', 'ivf_pq'):
+            import faiss
+            min_vectors = faiss.extract_index_ivf(self.faiss_index).nlist
+        if index_type == 'ivf_pq':
+            min_vectors = max(min_vectors, 2 ** settings.get('pq_bits', 8))
+        
+        if len(vectors) < min_vectors:
+            logger.warning(f"Vectores insuficientes para entrenar índice {index_type} "
+                           f"({len(vectors)} < {min_vectors}), usando índice exacto")
+            settings = {**settings, 'index_type': 'flat'}
+            self.faiss_index = self.build_faiss_index(vectors.shape[1], settings)
+            self.collections[collection_name] = settings
+            return
+        
+        logger.info(f"Entrenando índice FAISS {index_type} con {len(vectors)} vectores...")
+        self.faiss_index.train(vectors)
+    
+    def _apply_faiss_search_params(self, collection_name: str, config: dict):
+        """Aplica nprobe (IVF) o efSearch (HNSW) antes de buscar"""
+        settings = self.collections.get(collection_name, {})
+        index_type = settings.get('index_type')
+        if index_type not in ('hnsw', 'ivf_flat', 'ivf_pq'):
+            return
+        
+        import faiss
+        params = faiss.ParameterSpace()
+        if index_type == 'hnsw':
+            params.set_index_parameter(self.faiss_index, 'efSearch',
+                                       int(config.get('efSearch', settings.get('ef_search', 64))))
+        else:
+            params.set_index_parameter(self.faiss_index, 'nprobe',
+                                       int(config.get('nprobe', settings.get('nprobe', 16))))
+    
+    def remove_embeddings(self, config: dict, ids: List[str]) -> bool:
+        """
+        Elimina embeddings concretos del vector store por ID.
+        
+        Returns:
+            False si el tipo de vector store o de índice no permite borrados
+            (por ejemplo HNSW); en ese caso hay que reconstruir la colección.
+        """
+        try:
+            tipo = config.get('type')
+            if not ids:
+                return True
+            if tipo == 'faiss':
+                if not self.faiss_index:
+                    return False
+                self._ensure_faiss_writable()
+                return self._remove_faiss_ids([self._faiss_id(point_id) for point_id in ids])
+            else:
+                logger.warning(f"Eliminación por ID no soportada para vector store {tipo}")
+                return False
+        except Exception as e:
+            logger.error(f"Error eliminando embeddings: {str(e)}")
+            return False
+    
+    def _remove_faiss_ids(self, faiss_ids: List[int]) -> bool:
+        """Elimina vectores del índice FAISS y sus metadatos"""
+        try:
+            self.faiss_index.remove_ids(np.array(faiss_ids, dtype=np.int64))
+        except RuntimeError as e:
+            logger.warning(f"El índice FAISS no admite borrados: {str(e)}")
+            return False
+        for faiss_id in faiss_ids:
+            self.faiss_metadata.pop(faiss_id, None)
+        return True
+    
+    def get_faiss_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Metadatos de los vectores del índice FAISS indexados por ID de embedding"""
+        return {meta['id']: meta for meta in self.faiss_metadata.values()}
+    
+    @staticmethod
+    def _faiss_id(point_id: str) -> int:
+        """Convierte el ID (UUID) de un embedding en un ID entero de 63 bits para FAISS"""
+        import uuid
+        try:
+            return uuid.UUID(str(point_id)).int & ((1 << 63) - 1)
+        except ValueError:
+            import hashlib
+            return int.from_bytes(hashlib.sha1(str(point_id).encode('utf-8')).digest()[:8], 'big') & ((1 << 63) - 1)
+    
+    def _ensure_faiss_writable(self):
+        """Un índice cargado con mmap es de solo lectura: copiarlo a memoria antes de modificarlo"""
+        if self.faiss_index is not None and self.faiss_index_mmapped:
+            import faiss
+            self.faiss_index = faiss.deserialize_index(faiss.serialize_index(self.faiss_index))
+            self.faiss_index_mmapped = False
+    
+    def _faiss_snapshot_paths(self, collection_name: str) -> Tuple[Path, Path]:
+        """Rutas del índice FAISS persistido y de su fichero de metadatos"""
+        base_dir = Path(self.faiss_index_dir)
+        return base_dir / f"{collection_name}.faiss", base_dir / f"{collection_name}.meta.json.gz"
+    
+    def save_faiss_snapshot(self, collection_name: str, watermark: Dict[str, Any]) -> bool:
+        """
+        Persiste el índice FAISS (faiss.write_index) y sus metadatos en un fichero
+        comprimido junto con la marca de versión de la BD que representa.
+        
+        Los ficheros se escriben primero con extensión temporal y se renombran al
+        final para que un arranque nunca lea un snapshot a medio escribir.
+        """
+        try:
+            if not self.faiss_index:
+                logger.warning("No hay índice FAISS que persistir")
+                return False
+            
+            import faiss
+            
+            index_path, meta_path = self._faiss_snapshot_paths(collection_name)
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            tmp_index_path = index_path.with_suffix('.faiss.tmp')
+            tmp_meta_path = meta_path.with_suffix('.gz.tmp')
+            
+            faiss.write_index(self.faiss_index, str(tmp_index_path))
+            with gzip.open(tmp_meta_path, 'wt', encoding='utf-8') as f:
+                json.dump({
+                    'format_version': self.FAISS_SNAPSHOT_VERSION,
+                    'watermark': watermark,
+                    'settings': self.collections.get(collection_name, {}),
+                    'metadata': list(self.faiss_metadata.values())
+                }, f, separators=(',', ':'), default=str)
+            
+            os.replace(tmp_index_path, index_path)
+            os.replace(tmp_meta_path, meta_path)
+            
+            logger.info(f"[OK] Snapshot FAISS guardado: {self.faiss_index.ntotal} vectores en {index_path}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error guardando snapshot FAISS: {str(e)}")
+            return False
+    
+    def load_faiss_snapshot(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Carga el índice FAISS persistido (memory-mapped cuando FAISS lo permite).
+        
+        Returns:
+            La marca de versión guardada con el snapshot, o None si no hay snapshot válido
+        """
+        try:
+            index_path, meta_path = self._faiss_snapshot_paths(collection_name)
+            if not index_path.exists() or not meta_path.exists():
+                logger.info(f"No hay snapshot FAISS para '{collection_name}'")
+                return None
+            
+            import faiss
+            
+            with gzip.open(meta_path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            
+            if snapshot.get('format_version') != self.FAISS_SNAPSHOT_VERSION:
+                logger.info("Snapshot FAISS con formato antiguo, se descarta")
+                return None
+            
+            if self.faiss_mmap:
+                try:
+                    index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP)
+                    mmapped = True
+                except Exception as e:
+                    # No todos los tipos de índice admiten mmap
+                    logger.info(f"Índice FAISS no mapeable en memoria ({str(e)}), leyendo completo")
+                    index = faiss.read_index(str(index_path))
+                    mmapped = False
+            else:
+                index = faiss.read_index(str(index_path))
+                mmapped = False
+            
+            if index.ntotal != len(snapshot['metadata']):
+                logger.warning("Snapshot FAISS inconsistente (vectores != metadatos), se descarta")
+                return None
+            
+            self.faiss_index = index
+            self.faiss_index_mmapped = mmapped
+            self.faiss_metadata = {self._faiss_id(meta['id']): meta for meta in snapshot['metadata']}
+            self.collections[collection_name] = snapshot.get('settings') or {'index_type': 'flat'}
+            
+            logger.info(f"[OK] Snapshot FAISS cargado: {index.ntotal} vectores desde {index_path}")
+            return snapshot.get('watermark') or {}
+            
+        except Exception as e:
+            logger.error(f"Error cargando snapshot FAISS: {str(e)}")
+            return None
+    
+    def delete_faiss_snapshot(self, collection_name: str) -> bool:
+        """Elimina el snapshot FAISS persistido de una colección"""
+        try:
+            for path in self._faiss_snapshot_paths(collection_name):
+                if path.exists():
+                    path.unlink()
+            return True
+        except Exception as e:
+            logger.error(f"Error eliminando snapshot FAISS: {str(e)}")
+            return False
@@ -0,0 +1,256 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Set, Tuple
+from uuid import UUID
+
+from ...domain.entities.vectorization_batch import VectorizationBatch, VectorizationBatchType
+from ..repositories.vectorization_job_repository import VectorizationJobRepository
+from .batch_progress_broker import batch_progress_broker
+
+logger = logging.getLogger(__name__)
+
+
+class VectorizationJobHandle:
+    """
+    Estado de un trabajo en ejecución que se pasa al pipeline de vectorización.
+
+    Persiste el progreso por archivo después de cada grupo confirmado en BD y
+    expone la cancelación cooperativa, que el pipeline consulta entre etapas.
+    """
+
+    def __init__(self, batch: VectorizationBatch, job_repo: VectorizationJobRepository,
+                 completed_files: Optional[Set[str]] = None):
+        self.batch = batch
+        self.job_repo = job_repo
+        self.completed_files: Set[str] = completed_files or set()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def filter_pending(self, file_paths: List[str]) -> List[str]:
+        """
+        Descarta los archivos ya procesados en una ejecución anterior del trabajo.
+
+        Los contadores del lote conservan ese progreso, así que el total se reinicia
+        a lo ya procesado y el pipeline le suma los archivos pendientes.
+        """
+        if not self.completed_files:
+            return file_paths
+        pending = [path for path in file_paths if path not in self.completed_files]
+        self.batch.total_files = self.batch.processed_files
+        logger.info(f"[OK] Reanudando lote {self.batch.id}: {len(file_paths) - len(pending)} archivos ya procesados, "
+                    f"{len(pending)} pendientes")
+        return pending
+
+    async def on_files_processed(self, results: List[Tuple[str, bool, Optional[str]]]):
+        """Registra un grupo de archivos ya persistido y refresca la cancelación desde la BD"""
+        self.job_repo.add_file_results(self.batch.id, results)
+        self.completed_files.update(path for path, _, _ in results)
+        self.job_repo.save_batch(self.batch)
+        if not self._cancelled and self.job_repo.is_cancel_requested(self.batch.id):
+            logger.info(f"Cancelación solicitada para el lote {self.batch.id}")
+            self._cancelled = True
+
+
+class VectorizationJobEngine:
+    """
+    Ejecuta los lotes de vectorización en workers de fondo.
+
+    Los endpoints encolan el trabajo y responden en el acto con el ID del lote; el
+    estado del VectorizationBatch y el progreso por archivo se guardan en
+    vectorization_jobs / vectorization_job_files, de modo que el estado puede
+    consultarse tras un reinicio y los trabajos interrumpidos se reanudan al
+    arrancar desde el último archivo confirmado.
+
+    Número de workers: VECTORIZATION_JOB_WORKERS (por defecto 1, los lotes se
+    ejecutan en orden de llegada).
+    """
+
+    def __init__(self, unified_vectorization_service, session_factory=None, workers: Optional[int] = None):
+        self.unified_vectorization_service = unified_vectorization_service
+        if session_factory is None:
+            from ...database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.workers = workers or int(os.getenv('VECTORIZATION_JOB_WORKERS', 1))
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._params: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, VectorizationJobHandle] = {}
+        self._cancelled: Set[str] = set()
+
+    async def start(self):
+        """Reanuda los trabajos pendientes o interrumpidos y lanza los workers"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+
+        db = self.session_factory()
+        try:
+            job_repo = VectorizationJobRepository(db)
+            for job in job_repo.get_resumable():
+                batch = job_repo.to_batch(job)
+                batch.set_stage('queued')
+                self._params[batch.id] = dict(job.params or {})
+                self.unified_vectorization_service._batches[batch.id] = batch
+                self._queue.put_nowait(batch.id)
+                logger.info(f"[OK] Lote de vectorización {batch.id} reanudado ({batch.processed_files}/{batch.total_files})")
+        finally:
+            db.close()
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"[OK] Motor de vectorización iniciado con {self.workers} workers")
+
+    async def stop(self):
+        """Detiene los workers; los trabajos en curso se reanudarán en el siguiente arranque"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> VectorizationBatch:
+        """
+        Encola un trabajo de vectorización
+
+        Args:
+            kind: 'repository' o 'module'
+            params: config_id, repo_type, branch y, según el tipo, force_update,
+                    full_rescan o module_path
+
+        Returns:
+            VectorizationBatch: Lote en estado pendiente
+        """
+        if kind == 'module':
+            batch = VectorizationBatch(
+                name=f"Vectorización del módulo {params['module_path']}",
+                batch_type=VectorizationBatchType.MODULE,
+                config_id=UUID(params['config_id']),
+                repo_type=params['repo_type'],
+                source_repo_branch=params.get('branch', 'main')
+            )
+        else:
+            batch = VectorizationBatch(
+                name=f"Vectorización de {params['repo_type']}",
+                batch_type=VectorizationBatchType.REPOSITORY,
+                config_id=UUID(params['config_id']),
+                repo_type=params['repo_type'],
+                source_repo_branch=params.get('branch', 'main')
+            )
+
+        db = self.session_factory()
+        try:
+            VectorizationJobRepository(db).save_batch(batch, params)
+        finally:
+            db.close()
+
+        batch.set_stage('queued')
+        self._params[batch.id] = params
+        self.unified_vectorization_service._batches[batch.id] = batch
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._queue.put_nowait(batch.id)
+        logger.info(f"[OK] Lote de vectorización {batch.id} encolado")
+        return batch
+
+    def cancel(self, batch_id: str) -> bool:
+        """Solicita la cancelación de un lote pendiente o en curso"""
+        db = self.session_factory()
+        try:
+            requested = VectorizationJobRepository(db).request_cancel(batch_id)
+        finally:
+            db.close()
+
+        handle = self._running.get(batch_id)
+        if handle:
+            handle.cancel()
+            requested = True
+        elif requested:
+            # Aún en la cola: el worker lo descartará al sacarlo
+            self._cancelled.add(batch_id)
+        return requested
+
+    def load_batch(self, batch_id: str) -> Optional[VectorizationBatch]:
+        """Lote persistido (p. ej. de una ejecución anterior del proceso)"""
+        db = self.session_factory()
+        try:
+            job_repo = VectorizationJobRepository(db)
+            job = job_repo.get(batch_id)
+            return job_repo.to_batch(job) if job else None
+        finally:
+            db.close()
+
+    async def _worker(self):
+        while True:
+            batch_id = await self._queue.get()
+            try:
+                await self._run_job(batch_id)
+            except Exception as e:
+                logger.error(f"[ERROR] Error ejecutando el lote de vectorización {batch_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, batch_id: str):
+        batch = self.unified_vectorization_service._batches.get(batch_id)
+        params = self._params.pop(batch_id, {})
+        db = self.session_factory()
+        try:
+            job_repo = VectorizationJobRepository(db)
+            if batch is None:
+                job = job_repo.get(batch_id)
+                if job is None:
+                    return
+                batch = job_repo.to_batch(job)
+                params = dict(job.params or {})
+
+            if batch_id in self._cancelled or job_repo.is_cancel_requested(batch_id):
+                self._cancelled.discard(batch_id)
+                batch.cancel_processing()
+                job_repo.save_batch(batch)
+                batch_progress_broker.publish_batch(batch)
+                logger.info(f"Lote {batch_id} cancelado antes de empezar")
+                return
+
+            handle = VectorizationJobHandle(batch, job_repo, job_repo.get_processed_files(batch_id))
+            self._running[batch_id] = handle
+            try:
+                if batch.batch_type == VectorizationBatchType.MODULE:
+                    await self.unified_vectorization_service.vectorize_module(
+                        config_id=batch.config_id,
+                        repo_type=batch.repo_type,
+                        module_path=params['module_path'],
+                        branch=batch.source_repo_branch,
+                        batch=batch,
+                        job=handle
+                    )
+                else:
+                    await self.unified_vectorization_service.vectorize_repository(
+                        config_id=batch.config_id,
+                        repo_type=batch.repo_type,
+                        branch=batch.source_repo_branch,
+                        force_update=params.get('force_update', True),
+                        full_rescan=params.get('full_rescan', False),
+                        batch=batch,
+                        job=handle
+                    )
+            except asyncio.CancelledError:
+                # Parada del proceso: el trabajo queda en curso para reanudarlo
+                job_repo.save_batch(batch)
+                raise
+            except Exception as e:
+                batch.fail_processing(str(e))
+            finally:
+                self._running.pop(batch_id, None)
+
+            if not batch.is_completed():
+                batch.fail_processing("El lote terminó sin estado final")
+            job_repo.save_batch(batch)
+            job_repo.clear_file_results(batch_id)
+            batch_progress_broker.publish_batch(batch)
+            logger.info(f"[OK] Lote {batch_id} terminado con estado {batch.status.value}")
+        finally:
+            db.close()
@@ -1,7 +1,9 @@
 import logging
-from fastapi import FastAPI, HTTPException, Depends, Body
+import asyncio
+from fastapi import FastAPI, HTTPException, Depends, Body, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .domain.entities.configuration import Configuration
 from .application.dto.configuration_dto import ConfigurationDTO, CreateConfigurationDTO, UpdateConfigurationDTO
 from .infrastructure.repositories.configuration_repository_impl import ConfigurationRepositoryImpl
@@ -14,6 +16,7 @@ from .infrastructure.services.repository_manager_service import RepositoryManage
 from .infrastructure.services.nsdk_analysis_sync_service import NSDKAnalysisSyncService
 from .infrastructure.repositories.nsdk_file_analysis_repository import NSDKFileAnalysisRepository
 from pathlib import Path
+from datetime import datetime
 
 # Configurar logging
 logging.basicConfig(
@@ -293,6 +296,9 @@ from .application.use_cases.vectorization_use_case import VectorizationUseCase
 from .infrastructure.services.nsdk_vectorization_service import UnifiedVectorizationService
 from .infrastructure.services.vector_store_service_impl import VectorStoreServiceImpl
 from .infrastructure.services.llm_service_impl import LLMServiceImpl
+from .infrastructure.services.http_client_pool import http_client_pool
+from .infrastructure.services.vectorization_job_engine import VectorizationJobEngine
+from .infrastructure.services.batch_progress_broker import batch_progress_broker
 
 # Instanciar servicios
 vector_store_service = VectorStoreServiceImpl()
@@ -336,12 +342,17 @@ async def initialize_llm_service():
         return False
 
 unified_vectorization_service = UnifiedVectorizationService(vector_store_service, llm_service, repo_manager, config_repo)
-vectorization_use_case = VectorizationUseCase(unified_vectorization_service)
+vectorization_job_engine = VectorizationJobEngine(unified_vectorization_service)
+vectorization_use_case = VectorizationUseCase(unified_vectorization_service, vectorization_job_engine)
+
+from .application.services.bulk_analysis_service import BulkAnalysisService
+bulk_analysis_service = BulkAnalysisService(vectorization_use_case, llm_service)
 
 class VectorizeRepositoryRequest(BaseModel):
     config_id: str  # ID de la configuración
     repo_type: str  # Tipo de repositorio: 'source', 'frontend', 'backend'
     branch: str = 'main'
+    full_rescan: bool = False  # Ignorar el último commit vectorizado y recorrer todo el repositorio
 
 class VectorizeModuleRequest(BaseModel):
     config_id: str  # ID de la configuración
@@ -353,6 +364,11 @@ class SearchCodeRequest(BaseModel):
     query: str
     limit: int = 10
 
+class GenerateCodeBatchRequest(BaseModel):
+    file_ids: List[str]
+    branch_name: Optional[str] = None
+    branch_per_module: bool = False
+
 @app.post("/vectorize/repository", tags=["Vectorización"])
 async def vectorize_repository(request: VectorizeRepositoryRequest):
     """Vectorizar un repositorio completo detectando automáticamente su tecnología"""
@@ -367,19 +383,20 @@ async def vectorize_repository(request: VectorizeRepositoryRequest):
     logger.info(f"Branch: {request.branch}")
     
     try:
-        print("Llamando a vectorization_use_case.vectorize_repository...")
-        logger.info("Llamando a vectorization_use_case.vectorize_repository...")
-        batch = await vectorization_use_case.vectorize_repository(
+        # El lote se ejecuta en segundo plano; el progreso se consulta en /vectorize/batch/{batch_id}
+        logger.info("Encolando vectorización en el motor de trabajos...")
+        batch = vectorization_use_case.submit_repository_vectorization(
             config_id=request.config_id,
             repo_type=request.repo_type,
-            branch=request.branch
+            branch=request.branch,
+            full_rescan=request.full_rescan
         )
-        print(f"Vectorización iniciada exitosamente. Batch ID: {batch.id}")
         logger.info(f"Vectorización iniciada exitosamente. Batch ID: {batch.id}")
         return {
             "status": "started",
             "batch_id": batch.id,
             "batch_name": batch.name,
+            "batch_status": batch.status.value,
             "total_files": batch.total_files
         }
     except Exception as e:
@@ -408,10 +425,11 @@ async def vectorize_all_repositories(request: VectorizeRepositoryRequest):
         
         for repo_type in repo_types:
             try:
-                batch = await vectorization_use_case.vectorize_repository(
+                batch = vectorization_use_case.submit_repository_vectorization(
                     config_id=request.config_id,
                     repo_type=repo_type,
-                    branch=request.branch
+                    branch=request.branch,
+                    full_rescan=request.full_rescan
                 )
                 batches.append({
                     "repo_type": repo_type,
@@ -442,7 +460,7 @@ async def vectorize_all_repositories(request: VectorizeRepositoryRequest):
 async def vectorize_module(request: VectorizeModuleRequest):
     """Vectorizar un módulo específico"""
     try:
-        batch = await vectorization_use_case.vectorize_module(
+        batch = vectorization_use_case.submit_module_vectorization(
             config_id=request.config_id,
             repo_type=request.repo_type,
             module_path=request.module_path,
@@ -452,6 +470,7 @@ async def vectorize_module(request: VectorizeModuleRequest):
             "status": "started",
             "batch_id": batch.id,
             "batch_name": batch.name,
+            "batch_status": batch.status.value,
             "total_files": batch.total_files
         }
     except Exception as e:
@@ -488,10 +507,10 @@ async def search_similar_code(request: SearchCodeRequest):
         raise HTTPException(status_code=500, detail=f"Error en búsqueda: {str(e)}")
 
 @app.get("/vectorize/batch/{batch_id}", tags=["Vectorización"])
-def get_batch_status(batch_id: str):
-    """Obtener estado de un lote de vectorización"""
+def get_batch_status(batch_id: str, include_files: bool = False):
+    """Obtener estado de un lote de vectorización (file_ids solo con include_files=true)"""
     try:
-        batch_status = vectorization_use_case.get_batch_status(batch_id)
+        batch_status = vectorization_use_case.get_batch_status(batch_id, include_files=include_files)
         if batch_status:
             return batch_status
         else:
@@ -501,6 +520,28 @@ def get_batch_status(batch_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo estado del lote: {str(e)}")
 
+@app.get("/vectorize/batch/{batch_id}/status", tags=["Vectorización"])
+def get_batch_progress(batch_id: str):
+    """Progreso compacto de un lote: contadores, etapa, rendimiento y tiempo estimado"""
+    progress = vectorization_use_case.get_batch_progress(batch_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return progress
+
+@app.get("/vectorize/batch/{batch_id}/events", tags=["Vectorización"])
+async def stream_batch_progress(batch_id: str, request: Request):
+    """Server-Sent Events con el progreso del lote hasta que termina"""
+    progress = vectorization_use_case.get_batch_progress(batch_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return StreamingResponse(
+        batch_progress_broker.stream(
+            batch_id, lambda: vectorization_use_case.get_batch_progress(batch_id), request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/vectorize/batch/{batch_id}/cancel", tags=["Vectorización"])
 def cancel_batch(batch_id: str):
     """Cancelar un lote de vectorización"""
@@ -824,11 +865,16 @@ def cleanup_orphaned_analyses(
 async def analyze_file_with_ai(
     repo_name: str,
     file_id: str,
+    force: bool = Body(False, embed=True, description="Repetir el análisis aunque haya uno en caché"),
     analysis_repo: NSDKFileAnalysisRepository = Depends(get_analysis_repository),
     ai_analysis_repo = Depends(get_ai_analysis_repository),
     db: Session = Depends(get_db)
 ):
-    """Analiza un fichero .SCR con IA para migración a Angular/Spring Boot"""
+    """
+    Analiza un fichero .SCR con IA para migración a Angular/Spring Boot.
+    Reutiliza el análisis guardado si no han cambiado el contenido, el modelo, el
+    prompt ni el contexto recuperado (salvo con force).
+    """
     try:
         # Obtener el fichero de la BD
         file_analysis = analysis_repo.get_by_id(file_id)
@@ -864,29 +910,22 @@ async def analyze_file_with_ai(
         from .application.services.nsdk_query_service import NSDKQueryService
         
         # Crear instancia del servicio de consulta NSDK
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         
         # Crear instancia del servicio de análisis IA con todos los servicios
-        ai_service = AIAnalysisService(vectorization_use_case, llm_service, nsdk_query_service)
+        ai_service = AIAnalysisService(vectorization_use_case, llm_service, nsdk_query_service, ai_analysis_repo)
         
         try:
             # Realizar análisis con IA
             analysis_result = await ai_service.analyze_scr_file(
                 file_path=str(file_path),
                 file_content=file_content,
-                file_name=file_analysis.file_name
+                file_name=file_analysis.file_name,
+                force=force
             )
             
             # Guardar resultado del análisis en BD
-            from .domain.entities.ai_analysis_result import AIAnalysisResult
-            
-            ai_result = AIAnalysisResult(
-                file_analysis_id=file_id,
-                analysis_data=analysis_result,
-                raw_response=str(analysis_result)
-            )
-            
-            saved_ai_result = ai_analysis_repo.create(ai_result)
+            analysis_id = ai_service.save_analysis_result(file_id, analysis_result)
             
             # Actualizar estado en BD
             file_analysis.analysis_status = "analyzed"
@@ -900,7 +939,8 @@ async def analyze_file_with_ai(
                 "status": "analyzed",
                 "message": f"Análisis IA completado para {file_analysis.file_name}",
                 "analysis_result": analysis_result,
-                "analysis_id": saved_ai_result.id,
+                "analysis_id": analysis_id,
+                "cached": analysis_result.get('cached', False),
                 "content_length": len(file_content)
             }
             
@@ -922,6 +962,135 @@ async def analyze_file_with_ai(
         logger.error(f"Error en análisis IA para {file_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error en análisis IA: {str(e)}")
 
+@app.get("/repositories/{repo_name}/files/{file_id}/analyze-ai/stream", tags=["Análisis IA"])
+async def stream_file_analysis_with_ai(
+    repo_name: str,
+    file_id: str,
+    force: bool = False,
+    analysis_repo: NSDKFileAnalysisRepository = Depends(get_analysis_repository),
+    ai_analysis_repo = Depends(get_ai_analysis_repository),
+    db: Session = Depends(get_db)
+):
+    """
+    Analiza un fichero .SCR con IA enviando el resultado por Server-Sent Events.
+    Emite un evento 'field' por cada campo del análisis según lo escribe la IA y
+    un evento 'done' con el análisis guardado; si la respuesta se trunca se emite
+    'error' (truncated=true) y no se guarda nada.
+    """
+    file_analysis = analysis_repo.get_by_id(file_id)
+    if not file_analysis:
+        raise HTTPException(status_code=404, detail=f"Fichero {file_id} no encontrado")
+    if not file_analysis.file_name.upper().endswith('.SCR'):
+        raise HTTPException(status_code=400, detail="Solo se pueden analizar ficheros .SCR")
+    file_path = Path(file_analysis.file_path)
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="Fichero no encontrado en disco")
+    try:
+        file_content = file_path.read_text(encoding="utf-8", errors="ignore")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error leyendo fichero: {str(e)}")
+    
+    await initialize_llm_service()
+    from .application.services.ai_analysis_service import AIAnalysisService
+    from .application.services.nsdk_query_service import NSDKQueryService
+    ai_service = AIAnalysisService(vectorization_use_case, llm_service, NSDKQueryService(db, llm_service), ai_analysis_repo)
+    
+    async def analysis_events():
+        file_analysis.analysis_status = "analyzing"
+        analysis_repo.update(file_analysis)
+        yield batch_progress_broker.format_event({"file_id": file_id, "file_name": file_analysis.file_name}, 'started')
+        try:
+            async for event in ai_service.stream_scr_analysis(file_content, file_analysis.file_name, force=force):
+                if event['type'] == 'field':
+                    yield batch_progress_broker.format_event({"key": event['key'], "value": event['value']}, 'field')
+                elif event['type'] == 'error':
+                    file_analysis.analysis_status = "error"
+                    analysis_repo.update(file_analysis)
+                    yield batch_progress_broker.format_event(event, 'error')
+                else:
+                    analysis_result = event['analysis']
+                    analysis_id = ai_service.save_analysis_result(file_id, analysis_result)
+                    file_analysis.analysis_status = "analyzed"
+                    analysis_repo.update(file_analysis)
+                    logger.info(f"Análisis IA en streaming completado y guardado para {file_analysis.file_name}")
+                    yield batch_progress_broker.format_event({
+                        "file_id": file_id,
+                        "status": "analyzed",
+                        "analysis_id": analysis_id,
+                        "analysis_result": analysis_result,
+                        "cached": analysis_result.get('cached', False),
+                        "time_to_first_field": event.get('time_to_first_field')
+                    }, 'done')
+        except asyncio.CancelledError:
+            # El cliente se desconectó: la pantalla vuelve a quedar pendiente
+            file_analysis.analysis_status = "pending"
+            analysis_repo.update(file_analysis)
+            raise
+        except Exception as e:
+            logger.error(f"Error en análisis IA en streaming de {file_analysis.file_name}: {str(e)}")
+            file_analysis.analysis_status = "error"
+            analysis_repo.update(file_analysis)
+            yield batch_progress_broker.format_event({"message": str(e), "truncated": False}, 'error')
+    
+    return StreamingResponse(
+        analysis_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/repositories/{repo_name}/analyze-ai/bulk", tags=["Análisis IA"])
+async def analyze_repository_with_ai(
+    repo_name: str,
+    force: bool = Body(False, embed=True, description="Repetir los análisis aunque haya uno en caché")
+):
+    """Lanza en segundo plano el análisis IA de todas las pantallas pendientes del repositorio"""
+    try:
+        await initialize_llm_service()
+        active_config = await config_repo.find_active()
+        if not active_config:
+            raise HTTPException(status_code=400, detail="No hay configuración activa")
+        
+        batch = bulk_analysis_service.start(repo_name, active_config.id, force=force)
+        return {
+            "status": "started",
+            "batch_id": batch.id,
+            "repository_name": repo_name,
+            "total_files": batch.total_files,
+            "message": f"Análisis IA de {batch.total_files} pantallas iniciado en segundo plano"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error iniciando análisis IA masivo de {repo_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error iniciando análisis masivo: {str(e)}")
+
+@app.get("/analysis/bulk/{batch_id}/status", tags=["Análisis IA"])
+def get_bulk_analysis_status(batch_id: str):
+    """Progreso de un análisis masivo: contadores, pantallas desde caché, ritmo y ETA"""
+    status = bulk_analysis_service.get_status(batch_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return status
+
+@app.get("/analysis/bulk/{batch_id}/events", tags=["Análisis IA"])
+async def stream_bulk_analysis_progress(batch_id: str, request: Request):
+    """Server-Sent Events con el progreso del análisis masivo hasta que termina"""
+    batch = bulk_analysis_service.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return StreamingResponse(
+        batch_progress_broker.stream(batch_id, batch.get_progress, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/analysis/bulk/{batch_id}/cancel", tags=["Análisis IA"])
+def cancel_bulk_analysis(batch_id: str):
+    """Cancelar un análisis masivo (los análisis en curso terminan y se guardan)"""
+    if bulk_analysis_service.cancel(batch_id):
+        return {"status": "cancelled", "batch_id": batch_id}
+    return {"status": "not_cancelled", "message": "No se pudo cancelar el lote"}
+
 @app.get("/repositories/{repo_name}/files/{file_id}/ai-analysis", tags=["Análisis IA"])
 def get_ai_analysis_result(
     repo_name: str,
@@ -1193,7 +1362,10 @@ def get_embeddings_stats(
 ):
     """Obtener estadísticas de embeddings vectorizados"""
     try:
+        from .infrastructure.services.embedding_cache import embedding_cache
+        
         stats = vector_embedding_repo.get_stats()
+        stats['embedding_cache'] = embedding_cache.get_stats()
         return {
             "status": "success",
             "stats": stats
@@ -1318,14 +1490,35 @@ async def startup_event():
     """Evento que se ejecuta al arrancar la aplicación"""
     logger.info("=== INICIANDO APLICACIÓN ===")
     
+    # Crear clientes HTTP compartidos (pool de conexiones por proveedor)
+    http_client_pool.startup()
+    
     # Inicializar LLM service
     await initialize_llm_service()
     
     # Inicializar embeddings
     await initialize_embeddings_on_startup()
     
+    # Lanzar los workers de vectorización (reanuda los lotes interrumpidos)
+    await vectorization_job_engine.start()
+    
     logger.info("=== APLICACIÓN INICIADA EXITOSAMENTE ===") 
 
+# Evento de apagado de la aplicación
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento que se ejecuta al detener la aplicación"""
+    logger.info("=== DETENIENDO APLICACIÓN ===")
+    
+    # Detener los workers de vectorización; los lotes en curso se reanudan al arrancar
+    await vectorization_job_engine.stop()
+    
+    # Interrumpir los análisis masivos; las pantallas sin analizar quedan pendientes
+    await bulk_analysis_service.stop()
+    
+    # Cerrar clientes HTTP compartidos
+    await http_client_pool.aclose()
+
 @app.post("/test/search", tags=["Test"])
 async def test_semantic_search(
     query: str,
@@ -1346,11 +1539,8 @@ async def test_semantic_search(
         query_embedding = await llm_service.get_embedding(query)
         logger.info(f"Embedding obtenido, longitud: {len(query_embedding)}")
         
-        # Buscar similares
-        config = {
-            'type': 'faiss',
-            'collectionName': 'nsdk-embeddings'
-        }
+        # Buscar similares (pgvector si está activo, si no FAISS)
+        config = vector_store_service.default_config()
         
         results = vector_store_service.search_similar(
             query_embedding=query_embedding,
@@ -1383,7 +1573,7 @@ async def upload_nsdk_document(
     try:
         from .application.services.nsdk_pdf_processor import NSDKPDFProcessor
         
-        processor = NSDKPDFProcessor(db)
+        processor = NSDKPDFProcessor(db, llm_service)
         document_id = await processor.process_nsdk_document(file_path, document_name)
         
         return {
@@ -1423,7 +1613,7 @@ async def process_existing_nsdk_document(
         if not pdf_file:
             raise HTTPException(status_code=404, detail=f"Archivo PDF con nombre '{document_name}' no encontrado")
         
-        processor = NSDKPDFProcessor(db)
+        processor = NSDKPDFProcessor(db, llm_service)
         document_id = await processor.process_nsdk_document(pdf_file, document_name)
         
         return {
@@ -1441,6 +1631,40 @@ async def process_existing_nsdk_document(
         raise HTTPException(status_code=500, detail=f"Error procesando documento: {str(e)}")
 
 
+@app.post("/nsdk-documents/ingest-all", tags=["NSDK Documentation"])
+async def ingest_all_nsdk_documents(
+    force: bool = Body(False, embed=True, description="Reprocesar también los PDFs sin cambios"),
+    db: Session = Depends(get_db)
+):
+    """Indexa todos los PDFs de la carpeta NSDK-DOCS omitiendo los que no han cambiado"""
+    try:
+        import os
+        from .application.services.nsdk_pdf_processor import NSDKPDFProcessor
+        
+        nsdk_docs_path = "../NSDK-DOCS"
+        if not os.path.exists(nsdk_docs_path):
+            raise HTTPException(status_code=404, detail="Carpeta NSDK-DOCS no encontrada")
+        
+        # Sin LLM se usarían embeddings simplificados y los PDFs quedarían marcados como sin cambios
+        if not await initialize_llm_service():
+            raise HTTPException(status_code=400, detail="Configuración LLM no encontrada")
+        
+        processor = NSDKPDFProcessor(db, llm_service)
+        summary = await processor.ingest_directory(nsdk_docs_path, force=force)
+        
+        return {
+            "status": "success" if not summary['failed'] else "partial",
+            "message": f"{len(summary['processed'])} documentos procesados, {len(summary['skipped'])} sin cambios",
+            **summary
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en la ingesta de NSDK-DOCS: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en la ingesta: {str(e)}")
+
+
 @app.get("/nsdk-documents/{document_id}/status", tags=["NSDK Documentation"])
 async def get_document_status(document_id: str, db: Session = Depends(get_db)):
     """Obtiene el estado de procesamiento de un documento"""
@@ -1494,7 +1718,7 @@ async def query_nsdk_documentation(
     try:
         from .application.services.nsdk_query_service import NSDKQueryService
         
-        query_service = NSDKQueryService(db)
+        query_service = NSDKQueryService(db, llm_service)
         result = await query_service.query_documentation(query, context)
         
         return {
@@ -1514,7 +1738,7 @@ async def get_documentation_stats(db: Session = Depends(get_db)):
     try:
         from .application.services.nsdk_query_service import NSDKQueryService
         
-        query_service = NSDKQueryService(db)
+        query_service = NSDKQueryService(db, llm_service)
         stats = await query_service.get_documentation_stats()
         
         return {
@@ -1533,7 +1757,7 @@ async def test_document_indexing(db: Session = Depends(get_db)):
     try:
         from .application.services.nsdk_query_service import NSDKQueryService
         
-        query_service = NSDKQueryService(db)
+        query_service = NSDKQueryService(db, llm_service)
         results = await query_service.test_document_indexing()
         
         return {
@@ -1606,7 +1830,7 @@ async def test_ai_analysis_with_vectorization(
         # 2. Probar consulta de documentación NSDK
         logger.info("2. Probando consulta de documentación NSDK...")
         from .application.services.nsdk_query_service import NSDKQueryService
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         nsdk_context = await nsdk_query_service.query_documentation(query)
         logger.info(f"Contexto NSDK obtenido: {len(nsdk_context)} caracteres")
         
@@ -1672,7 +1896,7 @@ async def test_ai_analysis_detailed(
         from .application.services.ai_analysis_service import AIAnalysisService
         from .application.services.nsdk_query_service import NSDKQueryService
         
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         ai_service = AIAnalysisService(vectorization_use_case, llm_service, nsdk_query_service)
         
         # Realizar análisis completo con logs detallados
@@ -1732,7 +1956,7 @@ async def test_ai_analysis_gpt5(
         from .application.services.ai_analysis_service import AIAnalysisService
         from .application.services.nsdk_query_service import NSDKQueryService
         
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         ai_service = AIAnalysisService(vectorization_use_case, gpt5_llm_service, nsdk_query_service)
         
         # Realizar análisis con GPT-5
@@ -1838,6 +2062,72 @@ async def update_model_to_gpt4():
         logger.error(f"Error al actualizar modelo a GPT-4: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error al actualizar modelo: {str(e)}")
 
+def get_generation_repository_paths(config_data: Dict[str, Any]) -> Tuple[str, str]:
+    """Rutas locales de los repositorios frontend y backend de la configuración (los clona si no existen)"""
+    frontend_repo_url = config_data.get('frontendRepo', {}).get('url', '')
+    backend_repo_url = config_data.get('backendRepo', {}).get('url', '')
+    
+    if not frontend_repo_url or not backend_repo_url:
+        raise HTTPException(status_code=400, detail="URLs de repositorios no configuradas")
+    
+    # Obtener rutas locales de los repositorios usando RepositoryManagerService
+    from .infrastructure.services.repository_manager_service import RepositoryManagerService
+    repo_manager = RepositoryManagerService()
+    
+    # Extraer nombres de repositorios de las URLs
+    def extract_repo_name_from_url(url: str) -> str:
+        """Extrae el nombre del repositorio de una URL Git"""
+        import re
+        # Patrón para extraer el nombre del repo de URLs como:
+        # https://repo.plexus.services/jose.diosotero/poc-nsdk-new-front.git
+        # https://github.com/user/repo.git
+        match = re.search(r'/([^/]+)\.git$', url)
+        if match:
+            return match.group(1)
+        # Si no termina en .git, tomar la última parte
+        match = re.search(r'/([^/]+)/?$', url)
+        if match:
+            return match.group(1)
+        return url.split('/')[-1]  # Fallback
+    
+    frontend_repo_name = extract_repo_name_from_url(frontend_repo_url)
+    backend_repo_name = extract_repo_name_from_url(backend_repo_url)
+    
+    # Verificar y clonar repositorios si no existen
+    # Frontend
+    if not repo_manager.is_repository_cloned(frontend_repo_name):
+        logger.info(f"Repositorio frontend {frontend_repo_name} no existe, clonando automáticamente...")
+        try:
+            frontend_repo_path = repo_manager.clone_repository(
+                frontend_repo_url, 
+                frontend_repo_name, 
+                branch='main'
+            )
+            logger.info(f"Repositorio frontend clonado exitosamente en: {frontend_repo_path}")
+        except Exception as e:
+            logger.error(f"Error clonando repositorio frontend: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error clonando repositorio frontend: {str(e)}")
+    else:
+        frontend_repo_path = repo_manager.get_repository_path(frontend_repo_name)
+    
+    # Backend
+    if not repo_manager.is_repository_cloned(backend_repo_name):
+        logger.info(f"Repositorio backend {backend_repo_name} no existe, clonando automáticamente...")
+        try:
+            backend_repo_path = repo_manager.clone_repository(
+                backend_repo_url, 
+                backend_repo_name, 
+                branch='main'
+            )
+            logger.info(f"Repositorio backend clonado exitosamente en: {backend_repo_path}")
+        except Exception as e:
+            logger.error(f"Error clonando repositorio backend: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error clonando repositorio backend: {str(e)}")
+    else:
+        backend_repo_path = repo_manager.get_repository_path(backend_repo_name)
+    
+    return frontend_repo_path, backend_repo_path
+
 @app.post("/repositories/{repo_name}/files/{file_id}/generate-code", tags=["Generación de Código"])
 async def generate_code_from_analysis(
     repo_name: str,
@@ -1867,67 +2157,7 @@ async def generate_code_from_analysis(
             raise HTTPException(status_code=404, detail="No hay configuración activa")
         
         config_data = active_config.config_data
-        frontend_repo_url = config_data.get('frontendRepo', {}).get('url', '')
-        backend_repo_url = config_data.get('backendRepo', {}).get('url', '')
-        
-        if not frontend_repo_url or not backend_repo_url:
-            raise HTTPException(status_code=400, detail="URLs de repositorios no configuradas")
-        
-        # Obtener rutas locales de los repositorios usando RepositoryManagerService
-        from .infrastructure.services.repository_manager_service import RepositoryManagerService
-        repo_manager = RepositoryManagerService()
-        
-        # Extraer nombres de repositorios de las URLs
-        def extract_repo_name_from_url(url: str) -> str:
-            """Extrae el nombre del repositorio de una URL Git"""
-            import re
-            # Patrón para extraer el nombre del repo de URLs como:
-            # https://repo.plexus.services/jose.diosotero/poc-nsdk-new-front.git
-            # https://github.com/user/repo.git
-            match = re.search(r'/([^/]+)\.git$', url)
-            if match:
-                return match.group(1)
-            # Si no termina en .git, tomar la última parte
-            match = re.search(r'/([^/]+)/?$', url)
-            if match:
-                return match.group(1)
-            return url.split('/')[-1]  # Fallback
-        
-        frontend_repo_name = extract_repo_name_from_url(frontend_repo_url)
-        backend_repo_name = extract_repo_name_from_url(backend_repo_url)
-        
-        # Verificar y clonar repositorios si no existen
-        # Frontend
-        if not repo_manager.is_repository_cloned(frontend_repo_name):
-            logger.info(f"Repositorio frontend {frontend_repo_name} no existe, clonando automáticamente...")
-            try:
-                frontend_repo_path = repo_manager.clone_repository(
-                    frontend_repo_url, 
-                    frontend_repo_name, 
-                    branch='main'
-                )
-                logger.info(f"Repositorio frontend clonado exitosamente en: {frontend_repo_path}")
-            except Exception as e:
-                logger.error(f"Error clonando repositorio frontend: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Error clonando repositorio frontend: {str(e)}")
-        else:
-            frontend_repo_path = repo_manager.get_repository_path(frontend_repo_name)
-        
-        # Backend
-        if not repo_manager.is_repository_cloned(backend_repo_name):
-            logger.info(f"Repositorio backend {backend_repo_name} no existe, clonando automáticamente...")
-            try:
-                backend_repo_path = repo_manager.clone_repository(
-                    backend_repo_url, 
-                    backend_repo_name, 
-                    branch='main'
-                )
-                logger.info(f"Repositorio backend clonado exitosamente en: {backend_repo_path}")
-            except Exception as e:
-                logger.error(f"Error clonando repositorio backend: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Error clonando repositorio backend: {str(e)}")
-        else:
-            backend_repo_path = repo_manager.get_repository_path(backend_repo_name)
+        frontend_repo_path, backend_repo_path = get_generation_repository_paths(config_data)
         
         # Usar servicios ya inicializados
         # vectorization_use_case ya está inicializado globalmente
@@ -1957,7 +2187,7 @@ async def generate_code_from_analysis(
         
         # Crear instancia del servicio de consulta NSDK
         from .application.services.nsdk_query_service import NSDKQueryService
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         
         # Crear instancia del servicio de generación de código
         from .application.services.code_generation_service import CodeGenerationService
@@ -1981,6 +2211,74 @@ async def generate_code_from_analysis(
         logger.error(f"Error generando código para {file_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generando código: {str(e)}")
 
+@app.post("/repositories/{repo_name}/generate-code/batch", tags=["Generación de Código"])
+async def generate_code_batch(
+    repo_name: str,
+    request: GenerateCodeBatchRequest,
+    analysis_repo: NSDKFileAnalysisRepository = Depends(get_analysis_repository),
+    ai_analysis_repo = Depends(get_ai_analysis_repository),
+    db: Session = Depends(get_db)
+):
+    """
+    Genera el código de varias pantallas analizadas en paralelo y lo sube con un
+    único commit y push por repositorio: en una rama común o, con
+    branch_per_module, en una rama por módulo (feature/<módulo>)
+    """
+    try:
+        if not request.file_ids:
+            raise HTTPException(status_code=400, detail="No se indicaron ficheros")
+        
+        # Reunir los análisis IA de las pantallas, agrupados por rama
+        groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        missing = []
+        default_branch = request.branch_name or f"feature/lote-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        for file_id in request.file_ids:
+            file_analysis = analysis_repo.get_by_id(file_id)
+            latest_analysis = ai_analysis_repo.get_by_file_analysis_id(file_id) if file_analysis else None
+            if not latest_analysis:
+                missing.append(file_id)
+                continue
+            if request.branch_per_module:
+                module = (file_analysis.module_name or 'sin-modulo').replace('_', '-').replace(' ', '-').lower()
+                branch_name = f"feature/{module}"
+            else:
+                branch_name = default_branch
+            groups.setdefault(branch_name, []).append((file_analysis.file_name, latest_analysis.to_dict()))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Ficheros sin análisis IA disponible: {', '.join(missing)}")
+        
+        active_config = await config_repo.find_active()
+        if not active_config:
+            raise HTTPException(status_code=404, detail="No hay configuración activa")
+        frontend_repo_path, backend_repo_path = get_generation_repository_paths(active_config.config_data)
+        
+        if not await initialize_llm_service():
+            raise HTTPException(status_code=400, detail="Configuración LLM no encontrada")
+        from .application.services.nsdk_query_service import NSDKQueryService
+        from .application.services.code_generation_service import CodeGenerationService
+        code_generation_service = CodeGenerationService(vectorization_use_case, llm_service, NSDKQueryService(db, llm_service))
+        
+        # Una rama cada vez: dentro de cada una las pantallas se generan en paralelo
+        results = []
+        for branch_name, screens in groups.items():
+            results.append(await code_generation_service.generate_code_batch(
+                screens, frontend_repo_path, backend_repo_path, branch_name
+            ))
+        
+        logger.info(f"Generación de código por lotes completada para {len(request.file_ids)} ficheros de {repo_name}")
+        return {
+            "success": all(result["success"] for result in results),
+            "total_screens": len(request.file_ids),
+            "successful_screens": sum(result["successful_screens"] for result in results),
+            "branches": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en la generación de código por lotes de {repo_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generando código: {str(e)}")
+
 @app.post("/repositories/{repo_name}/files/{file_id}/generate-frontend", tags=["Generación de Código"])
 async def generate_frontend_code(
     repo_name: str,
@@ -2076,7 +2374,7 @@ async def generate_frontend_code(
         
         # Crear instancia del servicio de consulta NSDK
         from .application.services.nsdk_query_service import NSDKQueryService
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         
         # Crear instancia del servicio de generación de código
         from .application.services.code_generation_service import CodeGenerationService
@@ -2183,7 +2481,7 @@ async def generate_backend_code(
         
         # Crear instancia del servicio de consulta NSDK
         from .application.services.nsdk_query_service import NSDKQueryService
-        nsdk_query_service = NSDKQueryService(db)
+        nsdk_query_service = NSDKQueryService(db, llm_service)
         
         # Crear instancia del servicio de generación de código
         from .application.services.code_generation_service import CodeGenerationService
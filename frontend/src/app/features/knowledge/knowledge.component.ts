@@ -486,7 +486,7 @@ export class KnowledgeComponent implements OnInit {
 
           console.log(`DEBUG: repositoryProgress después de updateOverallProgress:`, this.repositoryProgress);
 
-          if (batch.status === 'in_progress') {
+          if (batch.status === 'in_progress' || batch.status === 'pending') {
             // Mostrar progreso detallado
             const repoProgress = this.repositoryProgress[repoType];
             console.log(`DEBUG: repoProgress obtenido para ${repoType}:`, repoProgress);
@@ -509,7 +509,7 @@ export class KnowledgeComponent implements OnInit {
             setTimeout(() => {
               resolve(batch);
             }, 2000);
-          } else if (batch.status === 'failed') {
+          } else if (batch.status === 'failed' || batch.status === 'cancelled') {
             console.error(`DEBUG: Vectorización fallida para ${repoName} (${repoType})`);
             reject(new Error(`Vectorización fallida para ${repoName}`));
           }
@@ -521,7 +521,33 @@ export class KnowledgeComponent implements OnInit {
       });
     };
 
-    checkProgress();
+    // Progreso por SSE; si el stream falla se vuelve al sondeo
+    let finished = false;
+    this.knowledgeService.streamBatchProgress(batchId).subscribe({
+      next: (batch: VectorizationBatch) => {
+        this.updateOverallProgress(batch, repoType);
+
+        if (batch.status === 'in_progress' || batch.status === 'pending') {
+          const repoProgress = this.repositoryProgress[repoType];
+          this.vectorizationStatus = repoProgress
+            ? `📊 Vectorizando ${repoName}: ${repoProgress.processed}/${repoProgress.total} archivos (${repoProgress.progress}%)`
+            : `📊 Vectorizando ${repoName}...`;
+        } else if (batch.status === 'completed') {
+          finished = true;
+          this.vectorizationStatus = `${repoName} vectorizado exitosamente`;
+          setTimeout(() => resolve(batch), 2000);
+        } else {
+          finished = true;
+          reject(new Error(`Vectorización ${batch.status === 'cancelled' ? 'cancelada' : 'fallida'} para ${repoName}`));
+        }
+      },
+      error: () => {
+        if (!finished) {
+          console.warn(`Stream de progreso no disponible para ${repoName}, usando sondeo`);
+          checkProgress();
+        }
+      }
+    });
   }
 
   private updateOverallProgress(batch: VectorizationBatch, repoType: string) {
@@ -47,6 +47,10 @@ export interface VectorizationBatch {
     status: string;
     processed_files: number;
     total_files: number;
+    failed_files?: number;
+    stage?: string | null;
+    throughput?: number | null;
+    eta_seconds?: number | null;
 }
 
 export interface VectorizationStats {
@@ -157,6 +161,28 @@ export class KnowledgeService {
         return this.http.get<VectorizationBatch>(`${this.apiUrl}/vectorize/batch/${batchId}/status`);
     }
 
+    /**
+     * Progreso de un batch por Server-Sent Events; el stream se cierra al terminar el batch
+     */
+    streamBatchProgress(batchId: string): Observable<VectorizationBatch> {
+        return new Observable<VectorizationBatch>(observer => {
+            const source = new EventSource(`${this.apiUrl}/vectorize/batch/${batchId}/events`);
+            source.addEventListener('progress', (event: MessageEvent) => {
+                const batch = JSON.parse(event.data) as VectorizationBatch;
+                observer.next(batch);
+                if (['completed', 'failed', 'cancelled'].includes(batch.status)) {
+                    source.close();
+                    observer.complete();
+                }
+            });
+            source.onerror = (error) => {
+                source.close();
+                observer.error(error);
+            };
+            return () => source.close();
+        });
+    }
+
     /**
      * Obtiene estadísticas de vectorización
      */
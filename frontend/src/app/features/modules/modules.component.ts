@@ -77,6 +77,7 @@ interface FlatNode {
   button_count?: number;
   buttons?: string[];
   isLoading?: boolean;
+  streamedFields?: string[];  // Campos del análisis IA recibidos hasta ahora (streaming)
 }
 
 interface AnalysisData {
@@ -1088,12 +1089,21 @@ export class ModulesComponent implements OnInit {
 
     console.log(`Iniciando análisis IA para: ${node.name}`);
     node.status = 'analyzing';
+    node.streamedFields = [];
 
     const repoName = 'nsdk-sources';
-    this.modulesService.analyzeFileWithAI(repoName, node.id).subscribe({
-      next: (response: any) => {
+    this.modulesService.streamFileAnalysisWithAI(repoName, node.id).subscribe({
+      next: (event) => {
+        if (event.type === 'field') {
+          // Cada campo se muestra en cuanto la IA termina de escribirlo
+          node.streamedFields = [...(node.streamedFields || []), event.data.key];
+          return;
+        }
+
+        const response = event.data;
         console.log('Análisis IA completado:', response);
         node.status = 'analyzed';
+        node.streamedFields = undefined;
 
         // Actualizar la lista de análisis
         const existingIndex = this.nsdkAnalyses.findIndex(a => a.id === node.id);
@@ -1109,7 +1119,9 @@ export class ModulesComponent implements OnInit {
         }
 
         this.snackBar.open(
-          `Análisis IA completado para ${node.name}`,
+          response.cached
+            ? `Análisis IA de ${node.name} recuperado de caché`
+            : `Análisis IA completado para ${node.name}`,
           'Cerrar',
           { duration: 3000 }
         );
@@ -1117,8 +1129,12 @@ export class ModulesComponent implements OnInit {
       error: (error: any) => {
         console.error('Error en análisis IA:', error);
         node.status = 'error';
+        node.streamedFields = undefined;
+        const detail = error?.truncated
+          ? 'la respuesta de la IA se ha truncado'
+          : error?.message || 'conexión interrumpida';
         this.snackBar.open(
-          `Error en análisis IA: ${error.error?.detail || error.message}`,
+          `Error en análisis IA: ${detail}`,
           'Cerrar',
           { duration: 5000 }
         );
@@ -295,9 +295,36 @@ export class ModulesService {
 
   /**
    * Inicia análisis con IA de un fichero .SCR
+   * (con force se ignora el análisis en caché del mismo contenido)
    */
-  analyzeFileWithAI(repoName: string, fileId: string): Observable<any> {
-    return this.http.post(`${this.apiUrl}/repositories/${repoName}/files/${fileId}/analyze-ai`, {});
+  analyzeFileWithAI(repoName: string, fileId: string, force = false): Observable<any> {
+    return this.http.post(`${this.apiUrl}/repositories/${repoName}/files/${fileId}/analyze-ai`, { force });
+  }
+
+  /**
+   * Análisis IA de un fichero .SCR por Server-Sent Events: emite cada campo del
+   * análisis según llega ('field') y el análisis guardado al final ('done')
+   */
+  streamFileAnalysisWithAI(repoName: string, fileId: string, force = false): Observable<{ type: 'field' | 'done'; data: any }> {
+    return new Observable<{ type: 'field' | 'done'; data: any }>(observer => {
+      const source = new EventSource(
+        `${this.apiUrl}/repositories/${repoName}/files/${fileId}/analyze-ai/stream?force=${force}`
+      );
+      source.addEventListener('field', (event: MessageEvent) => {
+        observer.next({ type: 'field', data: JSON.parse(event.data) });
+      });
+      source.addEventListener('done', (event: MessageEvent) => {
+        observer.next({ type: 'done', data: JSON.parse(event.data) });
+        source.close();
+        observer.complete();
+      });
+      source.addEventListener('error', (event: Event) => {
+        source.close();
+        const data = (event as MessageEvent).data;
+        observer.error(data ? JSON.parse(data) : event);
+      });
+      return () => source.close();
+    });
   }
 
   /**